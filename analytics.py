@@ -0,0 +1,256 @@
+import itertools
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+
+# Shared by every worker on the host: each one appends to the same event log
+DEFAULT_ANALYTICS_DIR = os.path.join(tempfile.gettempdir(), "lucidus-analytics")
+EVENTS_FILENAME = "events.jsonl"
+SNAPSHOT_FILENAME = "aggregates.json"
+
+# Upper bounds (seconds) of the step 3 latency histogram buckets; the last one is open
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 40, 80]
+# Trending counts lose half their weight over this many seconds
+TREND_HALF_LIFE = 7 * 24 * 3600
+# Careers of a result counted per event, in result order
+EVENT_CAREERS = 6
+
+
+# One completed result set as it goes into the event log
+def make_event(tenant, catalog_version, source, seconds, interests, skills, sdg_ids, careers, error=False):
+    return {
+        "ts": time.time(),
+        "tenant": tenant,
+        "catalog_version": catalog_version,
+        "source": source,
+        "seconds": round(seconds, 3),
+        "interests": list(interests),
+        "skills": list(skills),
+        "sdgs": [int(sdg_id) for sdg_id in sdg_ids],
+        "careers": [{"id": career_id, "title": title} for career_id, title in careers[:EVENT_CAREERS]],
+        "error": bool(error)
+    }
+
+
+def event_tags(event):
+    return sorted(
+        {f"interest:{interest}" for interest in event["interests"]}
+        | {f"skill:{skill}" for skill in event["skills"]}
+        | {f"sdg:{sdg_id}" for sdg_id in event["sdgs"]}
+    )
+
+
+def latency_bucket(seconds):
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if seconds <= bound:
+            return i
+    return len(LATENCY_BUCKETS)
+
+
+# Counters kept up to date one event at a time. A profile has at most nine
+# tags and a result six careers, so applying an event touches a bounded number
+# of counters however many events came before it. Trending counts decay
+# exponentially and are only brought forward to the current time when touched.
+class Aggregates:
+    def __init__(self, half_life=TREND_HALF_LIFE):
+        self.half_life = half_life
+        self.events = 0
+        self.errors = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.counts = {"career": {}, "top_career": {}, "tag": {}, "pair": {}, "source": {}, "tenant": {}}
+        self.trending = {"career": {}, "tag": {}}
+        # Per source: bucket counts, plus the total seconds for the mean
+        self.latency = {}
+
+    def _count(self, name, key):
+        counts = self.counts[name]
+        counts[key] = counts.get(key, 0) + 1
+
+    def _trend(self, name, key, ts):
+        value, last = self.trending[name].get(key, (0.0, ts))
+        self.trending[name][key] = (self._decay(value, ts - last) + 1.0, ts)
+
+    def _decay(self, value, elapsed):
+        return value * math.pow(0.5, max(elapsed, 0) / self.half_life)
+
+    def apply(self, event):
+        ts = event["ts"]
+        self.events += 1
+        self.errors += int(event.get("error", False))
+        self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        self._count("source", event["source"])
+        self._count("tenant", event["tenant"])
+
+        for position, career in enumerate(event["careers"]):
+            self._count("career", career["title"])
+            self._trend("career", career["title"], ts)
+            if position == 0:
+                self._count("top_career", career["title"])
+
+        tags = event_tags(event)
+        for tag in tags:
+            self._count("tag", tag)
+            self._trend("tag", tag, ts)
+        for a, b in itertools.combinations(tags, 2):
+            self._count("pair", f"{a}|{b}")
+
+        latency = self.latency.setdefault(event["source"], {"buckets": [0] * (len(LATENCY_BUCKETS) + 1), "seconds": 0.0})
+        latency["buckets"][latency_bucket(event["seconds"])] += 1
+        latency["seconds"] += event["seconds"]
+
+    # The n largest counters of one kind, optionally only keys with a prefix such as "sdg:"
+    def top(self, name, n=10, prefix=""):
+        items = [(key, count) for key, count in self.counts[name].items() if key.startswith(prefix)]
+        return sorted(items, key=lambda item: (-item[1], item[0]))[:n]
+
+    # The n keys with the highest decayed counts at time now
+    def trending_top(self, name, now=None, n=10, prefix=""):
+        now = time.time() if now is None else now
+        items = [
+            (key, self._decay(value, now - last))
+            for key, (value, last) in self.trending[name].items()
+            if key.startswith(prefix)
+        ]
+        return sorted(items, key=lambda item: (-item[1], item[0]))[:n]
+
+    def to_dict(self):
+        return {
+            "half_life": self.half_life,
+            "events": self.events,
+            "errors": self.errors,
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "counts": self.counts,
+            "trending": {name: {key: list(value) for key, value in items.items()} for name, items in self.trending.items()},
+            "latency": self.latency
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregates = cls(half_life=data["half_life"])
+        aggregates.events = data["events"]
+        aggregates.errors = data["errors"]
+        aggregates.first_ts = data["first_ts"]
+        aggregates.last_ts = data["last_ts"]
+        aggregates.counts.update(data["counts"])
+        aggregates.trending = {name: {key: tuple(value) for key, value in items.items()} for name, items in data["trending"].items()}
+        aggregates.latency = data["latency"]
+        return aggregates
+
+
+# The aggregates as last persisted in directory, with the log offset they
+# cover, or (None, 0) if nothing has been persisted yet. Read by the dashboard.
+def load_snapshot(directory=DEFAULT_ANALYTICS_DIR):
+    try:
+        with open(os.path.join(directory, SNAPSHOT_FILENAME)) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None, 0
+    return Aggregates.from_dict(data["aggregates"]), data["offset"]
+
+
+# Write the aggregates and the log offset they cover atomically, so readers only ever see a complete file
+def write_snapshot(directory, aggregates, offset):
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump({"offset": offset, "saved_at": time.time(), "aggregates": aggregates.to_dict()}, f)
+        os.replace(tmp_path, os.path.join(directory, SNAPSHOT_FILENAME))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Append-only log of completed result sets plus the aggregates over it. Every
+# event is written as one JSON line with a single append, so the workers on a
+# host can share one log. A daemon thread folds new lines into the aggregates
+# every flush_seconds (the events of the other workers included) and persists
+# them together with the log offset they cover; after a restart the snapshot is
+# loaded and only the lines after that offset are replayed.
+class AnalyticsRecorder:
+    def __init__(self, directory=DEFAULT_ANALYTICS_DIR, flush_seconds=30.0, half_life=TREND_HALF_LIFE):
+        self.directory = directory
+        self.events_path = os.path.join(directory, EVENTS_FILENAME)
+        self.flush_seconds = flush_seconds
+        self.half_life = half_life
+        self.aggregates = Aggregates(half_life)
+        self.offset = 0
+        self.stats = {"recorded": 0, "applied": 0, "skipped": 0, "flushes": 0, "last_error": None}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Append one event to the log; it reaches the aggregates on the next refresh
+    def record(self, event):
+        line = (json.dumps(event) + "\n").encode("utf-8")
+        fd = os.open(self.events_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        with self._lock:
+            self.stats["recorded"] += 1
+
+    # Fold the log lines written since the last refresh into the aggregates
+    def refresh(self):
+        with self._lock:
+            try:
+                with open(self.events_path, "rb") as f:
+                    f.seek(self.offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return 0
+            # A line still being appended is left for the next refresh
+            end = data.rfind(b"\n") + 1
+            applied = 0
+            for line in data[:end].splitlines():
+                try:
+                    self.aggregates.apply(json.loads(line))
+                    applied += 1
+                except (ValueError, KeyError, TypeError):
+                    self.stats["skipped"] += 1
+            self.offset += end
+            self.stats["applied"] += applied
+            return applied
+
+    def flush(self):
+        self.refresh()
+        with self._lock:
+            write_snapshot(self.directory, self.aggregates, self.offset)
+            self.stats["flushes"] += 1
+
+    # Load the last snapshot, catch up with the log and start the flush thread
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        aggregates, offset = load_snapshot(self.directory)
+        try:
+            log_size = os.path.getsize(self.events_path)
+        except OSError:
+            log_size = 0
+        # A snapshot ahead of the log belongs to a log that has been removed
+        if aggregates is not None and offset <= log_size:
+            with self._lock:
+                self.aggregates = aggregates
+                self.offset = offset
+        self.refresh()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="analytics-flush", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+                self.stats["last_error"] = None
+            except Exception as e:
+                self.stats["last_error"] = str(e)
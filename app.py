@@ -1,11 +1,44 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import json
-import openai
+import logging
+import os
 import time
 import random
+import sqlite3
+import sys
+import uuid
 from openai import OpenAI
+from catalog import (
+    CSV_FILENAME,
+    FALLBACK_CAREERS,
+    INTEREST_CATEGORIES,
+    SDG_NAMES,
+    SDGS,
+    SKILL_CATEGORIES,
+    DEFAULT_STORE_DIR,
+    CompactCatalog
+)
+from catalog_manager import CatalogError
+from matching import PARTITION_MIN_ROWS, IncrementalScorer, PartitionedMatcher, RankingCursor, compact_matches, resolve_matches
+from pipeline import (
+    ResultCache,
+    canonical_profile,
+    enrich_explanations,
+    make_result_entry,
+    profile_key,
+    run_matching_pipeline
+)
+from jobs import JobRunner
+from slo import MAX_AGE_SECONDS, LatencyTracker, plan_route, route_signature
+from warmer import CacheWarmer
+from cards import judge_card_html, manual_card_html
+from snapshots import DEFAULT_SNAPSHOT_DB, SnapshotStore
+from tenants import DEFAULT_TENANT, TenantCatalogs, TenantError
+from reuse import SimilarProfileIndex, reuse_entry
+from fusion import evidence_matches, merge_explanations
+from llm import judge_explanations
+from analytics import DEFAULT_ANALYTICS_DIR, AnalyticsRecorder, make_event
+from profiler import DEFAULT_PROFILE_DIR, SamplingProfiler, set_stage, stage
+from logs import correlation_id, get_logger, setup_logging
 
 # Set page configuration
 st.set_page_config(
@@ -15,6 +48,66 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Read an optional deployment setting from Streamlit secrets
+def get_setting(name, default):
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        return default
+
+# On/off settings: TOML booleans as well as strings such as "false" or "0" from
+# environment-style secrets, which bool() would all read as on
+def get_flag(name, default):
+    return str(get_setting(name, default)).strip().lower() in {"1", "true", "yes", "on"}
+
+# Opt-in sampling profiler: PROFILE_RATE of the script reruns and step 3 pipeline
+# runs (e.g. 0.01; 0 turns it off) are sampled every PROFILE_INTERVAL_MS and written
+# to PROFILE_DIR as wall and CPU flamegraph files, keeping at most PROFILE_MAX_MB.
+# Read before anything else so the whole rerun can be profiled.
+PROFILE_RATE = float(get_setting("PROFILE_RATE", 0))
+PROFILE_INTERVAL_MS = float(get_setting("PROFILE_INTERVAL_MS", 5))
+PROFILE_DIR = get_setting("PROFILE_DIR", DEFAULT_PROFILE_DIR)
+PROFILE_MAX_MB = float(get_setting("PROFILE_MAX_MB", 50))
+
+@st.cache_resource
+def get_profiler():
+    return SamplingProfiler(
+        PROFILE_DIR,
+        rate=PROFILE_RATE,
+        interval=PROFILE_INTERVAL_MS / 1000,
+        max_bytes=int(PROFILE_MAX_MB * 1024 * 1024)
+    )
+
+# Profile this rerun up to the end of the script, or until st.rerun()/st.stop() leaves it
+rerun_profile = get_profiler().maybe_start("rerun", root=sys._getframe())
+set_stage("css")
+
+# Structured logs on stderr: LOG_LEVEL ("DEBUG", "INFO", ...), LOG_FORMAT "json" or
+# "text". Diagnostics go to the log; they are only rendered in the page as well when
+# DEBUG_UI is on, so students do not pay for output they never see.
+LOG_LEVEL = get_setting("LOG_LEVEL", "INFO")
+LOG_FORMAT = get_setting("LOG_FORMAT", "json")
+DEBUG_UI = get_flag("DEBUG_UI", False)
+
+# One queue-based log pipeline per process
+@st.cache_resource
+def get_log_listener():
+    return setup_logging(LOG_LEVEL, LOG_FORMAT)
+
+get_log_listener()
+logger = get_logger("app")
+
+# Correlation id of a script run: the session's id and the number of the run, e.g.
+# "3f2a9c1b-12". Jobs started by the run log under the same id.
+def set_correlation_id(run):
+    correlation_id.set(f"{st.session_state.log_session_id}-{run}")
+
+if 'log_session_id' not in st.session_state:
+    st.session_state.log_session_id = uuid.uuid4().hex[:8]
+    st.session_state.log_runs = 0
+st.session_state.log_runs += 1
+set_correlation_id(st.session_state.log_runs)
+
 # Add custom CSS for styling
 st.markdown("""
 <style>
@@ -181,74 +274,86 @@ progress_messages = {
     ]
 }
 
-# Career data with mappings to interests, skills, and SDGs
-@st.cache_data
-def load_career_data():
-    csv_filename = "lucidus_career_mapping_all_125_corrected.csv"
+# Process-wide cache of finished AI + judge results, shared by all sessions
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(max_entries=RESULT_CACHE_SIZE)
+
+# Store of completed result sets behind the ?result=<id> links
+@st.cache_resource
+def get_snapshot_store():
+    return SnapshotStore(SNAPSHOT_DB)
+
+# Process-wide cache of rendered result cards, keyed by (result set, source, card index)
+@st.cache_resource
+def get_card_cache():
+    return ResultCache(max_entries=CARD_CACHE_SIZE)
+
+# Process-wide catalogs of all tenants. Each tenant's catalog manager loads the compiled,
+# memory-mapped catalog (shared by every worker on the host) on first use and hot-reloads
+# it in the background when the CSV changes; idle tenants are evicted under CATALOG_MEMORY_MB.
+@st.cache_resource
+def get_tenant_catalogs():
+    result_cache = get_result_cache()
+    card_cache = get_card_cache()
+    
+    # Results computed against the old catalog can no longer be served
+    def add_listeners(tenant, manager):
+        manager.add_listener(lambda old, new: old is not None and result_cache.invalidate_catalog(old.version))
+        manager.add_listener(lambda old, new: old is not None and card_cache.invalidate_catalog(old.version))
+    
+    # An evicted tenant's results leave memory with its catalog (the shared SQLite tier keeps them)
+    def drop_results(tenant, manager):
+        snapshot = manager.current()
+        if snapshot is not None:
+            result_cache.invalidate_catalog(snapshot.version)
+            card_cache.invalidate_catalog(snapshot.version)
     
+    return TenantCatalogs(
+        CSV_FILENAME,
+        CATALOG_STORE_DIR,
+        tenant_csvs=TENANTS,
+        tenants_dir=TENANTS_DIR,
+        memory_budget=int(CATALOG_MEMORY_MB * 1024 * 1024),
+        poll_interval=CATALOG_POLL_SECONDS,
+        on_load=add_listeners,
+        on_evict=drop_results
+    )
+
+# Catalog manager of the session's tenant
+def get_catalog_manager():
+    return get_tenant_catalogs().get(st.session_state.tenant)
+
+# Minimal set of careers to allow the app to function without the CSV
+@st.cache_resource
+def load_fallback_catalog():
+    return CompactCatalog.from_records(FALLBACK_CAREERS)
+
+# Career data with mappings to interests, skills, and SDGs, compiled into a CompactCatalog.
+# Returns the current catalog snapshot; the whole script run keeps using it even if a
+# newer one is swapped in meanwhile.
+def load_career_data():
     try:
-        # Read the CSV file
-        df = pd.read_csv(csv_filename)
-        
-        # Check if required columns exist
-        required_columns = ["career", "subjects", "skill_tags", "sdg_tags"]
-        for col in required_columns:
-            if col not in df.columns:
-                st.error(f"Required column '{col}' not found in CSV file. Please check your CSV format.")
-                return []
-        
-        # Log success message (will only show in debug mode)
-        st.write(f"CSV file loaded successfully. Found {len(df)} career entries.")
-        
-        # Convert the DataFrame to the required format
-        careers = []
-        for _, row in df.iterrows():
-            career_title = row["career"]
-            
-            # Use career title as description if none provided
-            description = f"A professional role in {career_title}."
-            
-            # Parse interests (subjects)
-            interests = []
-            if pd.notna(row["subjects"]) and row["subjects"]:
-                interests = [s.strip() for s in row["subjects"].split(",")]
-            
-            # Parse skills
-            skills = []
-            if pd.notna(row["skill_tags"]) and row["skill_tags"]:
-                skills = [s.strip() for s in row["skill_tags"].split(",")]
-            
-            # Parse SDGs
-            sdgs = []
-            if pd.notna(row["sdg_tags"]) and row["sdg_tags"]:
-                # Try to extract numbers from the SDG tags
-                for sdg_tag in row["sdg_tags"].split(","):
-                    sdg_tag = sdg_tag.strip()
-                    # Extract digits, handling formats like "SDG 1" or just "1"
-                    digits = ''.join(c for c in sdg_tag if c.isdigit())
-                    if digits and int(digits) >= 1 and int(digits) <= 17:
-                        sdgs.append(int(digits))
-            
-            career = {
-                "id": len(careers) + 1,  # Generate sequential IDs
-                "title": career_title,
-                "description": description,
-                "interests": interests,
-                "skills": skills,
-                "sdgs": sdgs
-            }
-            careers.append(career)
-        
-        if not careers:
-            st.error("No career data was loaded from the CSV. Please check your CSV file.")
-            return []
-            
-        return careers
-    except FileNotFoundError:
+        manager = get_catalog_manager()
+    except TenantError as e:
+        logger.warning("unknown tenant", extra={"tenant": st.session_state.tenant})
+        st.error(f"{str(e)} Showing the default career list instead.")
+        st.session_state.tenant = DEFAULT_TENANT
+        manager = get_catalog_manager()
+    csv_filename = manager.csv_path
+    snapshot = manager.current()
+    error = manager.last_error
+    
+    if snapshot is not None:
+        if error is not None:
+            st.warning(f"The updated career CSV could not be loaded, still using the previous version: {str(error)}")
+        return snapshot.catalog
+    
+    logger.error("no catalog available", exc_info=error, extra={"csv": csv_filename})
+    if isinstance(error, FileNotFoundError):
         st.error(f"CSV file '{csv_filename}' not found in the application directory.")
         
         # For Streamlit Cloud: Display the current directory and its contents
-        import os
         current_dir = os.getcwd()
         files_in_dir = os.listdir(current_dir)
         
@@ -265,156 +370,55 @@ def load_career_data():
         st.warning("Using limited fallback data (28 careers) until CSV is properly loaded.")
         
         # Return a minimal set of careers to allow the app to function
-        return [
-            {
-                "id": 1,
-                "title": "Microfinance Specialist",
-                "description": "Designs small loans and savings programs to support underserved communities.",
-                "interests": ["Economics", "Business Studies / Entrepreneurship", "Global Politics / Civics"],
-                "skills": ["Strategic thinking", "Data analysis", "Helping people", "Understanding cultures"],
-                "sdgs": [1, 8, 10]
-            },
-            # Additional fallback careers would be here
-            {
-                "id": 28,
-                "title": "UX Designer",
-                "description": "Designs interfaces that make tech easy, ethical, and human-centered.",
-                "interests": ["Psychology", "Graphic Design / Digital Media", "Computer Science / Programming"],
-                "skills": ["Creative thinking", "Designing digitally", "Listening well", "Problem solving"],
-                "sdgs": [9, 10, 4]
-            }
-        ]
-    except Exception as e:
-        st.error(f"Error loading CSV data: {str(e)}")
-        import traceback
-        st.error(f"Detailed error: {traceback.format_exc()}")
-        return []
+        return load_fallback_catalog()
+    elif isinstance(error, CatalogError):
+        st.error(str(error))
+    else:
+        st.error(f"Error loading CSV data: {str(error)}")
+        st.error(f"Detailed error: {manager.last_traceback}")
+    return CompactCatalog.from_records([])
+
+# Recent latencies of the AI stages, shared by all sessions to steer the step 3 route
+@st.cache_resource
+def get_latency_tracker():
+    return LatencyTracker(max_age=SLO_WINDOW_SECONDS)
+
+# Process-wide pool running the AI pipeline off the script threads, shared by all sessions
+@st.cache_resource
+def get_job_runner():
+    return JobRunner(max_workers=JOB_WORKERS)
+
+# Index of finished AI results by profile selections, for approximate reuse
+@st.cache_resource
+def get_similar_index():
+    return SimilarProfileIndex(threshold=REUSE_THRESHOLD, min_coverage=REUSE_MIN_COVERAGE, max_entries=REUSE_INDEX_SIZE)
+
+# Manual matching, partitioned over a thread pool once the catalog is large enough
+@st.cache_resource
+def get_matcher():
+    return PartitionedMatcher(workers=SCORING_THREADS, min_rows=PARTITION_ROWS)
+
+# Event log of completed result sets with the aggregates the analytics page reads
+@st.cache_resource
+def get_analytics():
+    return AnalyticsRecorder(ANALYTICS_DIR, flush_seconds=ANALYTICS_FLUSH_SECONDS).start()
 
 # Interests data structured by category
 @st.cache_data
 def load_interest_categories():
-    interest_categories = {
-        "Humanities & Social Sciences": [
-            "English Literature / Language Arts",
-            "World Languages (e.g., French, Spanish, Mandarin, Hindi)",
-            "History",
-            "Geography",
-            "Global Politics / Civics",
-            "Philosophy",
-            "Psychology",
-            "Social & Cultural Anthropology",
-            "Economics",
-            "Business Studies / Entrepreneurship",
-            "Ethics / TOK (Theory of Knowledge)"
-        ],
-        "Sciences": [
-            "Biology",
-            "Chemistry",
-            "Physics",
-            "Environmental Systems & Societies / Environmental Science",
-            "General Science / Integrated Science",
-            "Sports, Exercise & Health Science",
-            "Food Science / Food Technology"
-        ],
-        "Math & Technology": [
-            "Mathematics",
-            "Computer Science / Programming",
-            "Design & Technology / Engineering"
-        ],
-        "Arts & Creativity": [
-            "Visual Arts (drawing, painting, sculpture)",
-            "Graphic Design / Digital Media",
-            "Film / Media Studies",
-            "Drama / Theatre",
-            "Music",
-            "Dance"
-        ],
-        "Applied & Vocational": [
-            "Architecture / Interior Design",
-            "Product Design / Industrial Design",
-            "Health Science / Pre-Med",
-            "Agriculture / Sustainable Farming",
-            "Hospitality / Culinary Arts",
-            "Engineering (General or Applied)"
-        ],
-        "Lifestyle & Physical Education": [
-            "Physical Education / Sports Science",
-            "Coaching & Athletics"
-        ]
-    }
-    return interest_categories
+    return INTEREST_CATEGORIES
 
 # Skills data structured by category
 @st.cache_data
 def load_skill_categories():
-    skill_categories = {
-        "Thinking & Solving": [
-            "Creative thinking",
-            "Problem solving",
-            "Strategic thinking",
-            "Data analysis",
-            "Decision-making"
-        ],
-        "People & Communication": [
-            "Teamwork",
-            "Leading others",
-            "Explaining ideas",
-            "Listening well",
-            "Resolving conflict"
-        ],
-        "Hands-On": [
-            "Building or fixing",
-            "Cooking or crafting",
-            "Working outdoors",
-            "Using tools/machines"
-        ],
-        "Digital Skills": [
-            "Coding",
-            "Designing digitally",
-            "Editing videos",
-            "Working with data",
-            "Troubleshooting tech"
-        ],
-        "Creative Skills": [
-            "Drawing or painting",
-            "Writing or storytelling",
-            "Performing",
-            "Music or audio",
-            "Photography or video"
-        ],
-        "Purpose & Values": [
-            "Helping people",
-            "Supporting the planet",
-            "Standing up for causes",
-            "Understanding cultures",
-            "Working with animals"
-        ]
-    }
-    return skill_categories
+    return SKILL_CATEGORIES
 
 # SDGs data
 @st.cache_data
 def load_sdgs():
-    sdgs = [
-        {"id": 1, "name": "No Poverty"},
-        {"id": 2, "name": "Zero Hunger"},
-        {"id": 3, "name": "Good Health & Well-Being"},
-        {"id": 4, "name": "Quality Education"},
-        {"id": 5, "name": "Gender Equality"},
-        {"id": 6, "name": "Clean Water & Sanitation"},
-        {"id": 7, "name": "Affordable & Clean Energy"},
-        {"id": 8, "name": "Decent Work & Economic Growth"},
-        {"id": 9, "name": "Industry, Innovation & Infrastructure"},
-        {"id": 10, "name": "Reduced Inequalities"},
-        {"id": 11, "name": "Sustainable Cities & Communities"},
-        {"id": 12, "name": "Responsible Consumption & Production"},
-        {"id": 13, "name": "Climate Action"},
-        {"id": 14, "name": "Life Below Water"},
-        {"id": 15, "name": "Life on Land"},
-        {"id": 16, "name": "Peace, Justice & Strong Institutions"},
-        {"id": 17, "name": "Partnerships for the Goals"}
-    ]
-    return sdgs
+    return SDGS
+
+set_stage("session")
 
 # Initialize session state variables if they don't exist
 if 'step' not in st.session_state:
@@ -425,16 +429,59 @@ if 'current_skills' not in st.session_state:
     st.session_state.current_skills = []
 if 'selected_sdgs' not in st.session_state:
     st.session_state.selected_sdgs = []
-if 'manual_career_matches' not in st.session_state:
-    st.session_state.manual_career_matches = []
-if 'ai_career_matches' not in st.session_state:
-    st.session_state.ai_career_matches = []
-if 'judge_career_matches' not in st.session_state:
-    st.session_state.judge_career_matches = []
+# Results are kept as compact records: (career id, score) pairs for the manual
+# matches and a reference to the shared result-cache entry for the AI output
+if 'manual_results' not in st.session_state:
+    st.session_state.manual_results = []
+# Catalog version the records above (and the "Show more" pages) were scored against;
+# their career ids only mean the same careers in that version
+if 'results_version' not in st.session_state:
+    st.session_state.results_version = None
+if 'result_entry' not in st.session_state:
+    st.session_state.result_entry = None
+# Result-cache key the entry was computed under, including the route of a degraded
+# result; None for a reused entry, which belongs to no key of its own
+if 'result_key' not in st.session_state:
+    st.session_state.result_key = None
 if 'active_tab' not in st.session_state:
     st.session_state.active_tab = "judge"  # Default to judge tab
 if 'has_api_key' not in st.session_state:
     st.session_state.has_api_key = False
+if 'judge_enrichment_pending' not in st.session_state:
+    st.session_state.judge_enrichment_pending = False
+if 'result_set_id' not in st.session_state:
+    st.session_state.result_set_id = None
+if 'result_id' not in st.session_state:
+    st.session_state.result_id = None
+# Background job (and its kind, "matching" or "explanations") this session is waiting for
+if 'job_id' not in st.session_state:
+    st.session_state.job_id = None
+if 'job_kind' not in st.session_state:
+    st.session_state.job_kind = None
+# Whether step 4 shows the manual matches while the AI pipeline is still running
+if 'manual_first' not in st.session_state:
+    st.session_state.manual_first = False
+# AI pipeline job started speculatively on step 3, and how many this session has started
+if 'speculative_job_id' not in st.session_state:
+    st.session_state.speculative_job_id = None
+if 'speculations' not in st.session_state:
+    st.session_state.speculations = 0
+# When step 3 was submitted and where its results came from, for the analytics event
+if 'step3_started' not in st.session_state:
+    st.session_state.step3_started = None
+if 'result_source' not in st.session_state:
+    st.session_state.result_source = None
+# "Show more matches": pages of (career id, score) past the first results, the cursor
+# into the manual ranking they come from, AI Judge explanations per viewed page and
+# the pages still waiting for theirs
+if 'more_pages' not in st.session_state:
+    st.session_state.more_pages = []
+if 'ranking_cursor' not in st.session_state:
+    st.session_state.ranking_cursor = None
+if 'page_explanations' not in st.session_state:
+    st.session_state.page_explanations = {}
+if 'pending_pages' not in st.session_state:
+    st.session_state.pending_pages = []
 
 # Try to get OpenAI API key
 try:
@@ -444,11 +491,93 @@ except Exception as e:
     openai_api_key = None
     st.session_state.has_api_key = False
 
+# How the final list is produced:
+#   "two_call" - AI matching, then the AI Judge re-ranks both lists
+#   "fusion"   - AI matching, then local rank fusion; the AI Judge only writes the explanations
+#   "combined" - a single request that matches and judges at once
+PIPELINE_MODE = get_setting("PIPELINE_MODE", "two_call")
+# In fusion mode, whether the AI Judge should rewrite the explanations after the cards are shown
+JUDGE_ENRICHMENT = get_flag("JUDGE_ENRICHMENT", True)
+# Directory for the compiled, memory-mapped catalog shared by all workers on the host
+CATALOG_STORE_DIR = get_setting("CATALOG_STORE_DIR", DEFAULT_STORE_DIR)
+# Seconds between checks of the career CSV for edits
+CATALOG_POLL_SECONDS = float(get_setting("CATALOG_POLL_SECONDS", 5.0))
+# Most AI + judge results kept in memory per worker
+RESULT_CACHE_SIZE = int(get_setting("RESULT_CACHE_SIZE", 1000))
+# Careers in the live "top matches so far" panel during steps 1-3 (0 turns it off)
+LIVE_PREVIEW_SIZE = int(get_setting("LIVE_PREVIEW_SIZE", 5))
+# Most rendered result cards kept in memory per worker
+CARD_CACHE_SIZE = int(get_setting("CARD_CACHE_SIZE", 5000))
+# SQLite file with the completed result sets, shared by all workers on the host
+SNAPSHOT_DB = get_setting("SNAPSHOT_DB", DEFAULT_SNAPSHOT_DB)
+# Background threads for the AI pipeline per worker, and how often a waiting page checks on its job
+JOB_WORKERS = int(get_setting("JOB_WORKERS", 8))
+JOB_POLL_SECONDS = float(get_setting("JOB_POLL_SECONDS", 1.0))
+# End-to-end latency target for step 3 in seconds (0 turns it off). When recent
+# latencies put it at risk, step 3 switches to SLO_FAST_MODEL, sends only
+# SLO_SHORTLIST_SIZE careers, uses fusion instead of the judge, and finally shows
+# the manual matches first and upgrades them when the AI output arrives.
+SLO_SECONDS = float(get_setting("SLO_SECONDS", 12.0))
+SLO_FAST_MODEL = get_setting("SLO_FAST_MODEL", "gpt-4.1-nano")
+SLO_SHORTLIST_SIZE = int(get_setting("SLO_SHORTLIST_SIZE", 40))
+# How long a stage latency counts towards the estimates; after a spike, the full
+# route is tried again once the slow samples are this old
+SLO_WINDOW_SECONDS = float(get_setting("SLO_WINDOW_SECONDS", MAX_AGE_SECONDS))
+# Cache warming at deploy and after every catalog change: how many of the most
+# common profiles (from past result sets, or WARM_PROFILES_FILE) to precompute,
+# and how many OpenAI requests the warmer may have in flight (0 profiles turns it off)
+WARM_TOP_N = int(get_setting("WARM_TOP_N", 50))
+WARM_CONCURRENCY = int(get_setting("WARM_CONCURRENCY", 2))
+WARM_PROFILES_FILE = get_setting("WARM_PROFILES_FILE", None)
+# Threads that score shards of a large catalog in parallel (0 means one per CPU),
+# and the catalog size from which manual matching is partitioned at all
+SCORING_THREADS = int(get_setting("SCORING_THREADS", 0))
+PARTITION_ROWS = int(get_setting("PARTITION_ROWS", PARTITION_MIN_ROWS))
+# Tenants (schools, regions) with their own career lists. A session picks one with
+# ?tenant=<id>, otherwise it gets TENANT. Each tenant's CSV comes from the TENANTS
+# table (tenant = "path.csv") or TENANTS_DIR/<tenant>.csv; "default" is the bundled CSV.
+# Loaded catalogs are evicted, least recently used first, beyond CATALOG_MEMORY_MB.
+TENANT = get_setting("TENANT", DEFAULT_TENANT)
+TENANTS = dict(get_setting("TENANTS", {}))
+TENANTS_DIR = get_setting("TENANTS_DIR", None)
+CATALOG_MEMORY_MB = float(get_setting("CATALOG_MEMORY_MB", 512))
+# Approximate reuse: the AI result of a cached profile at least REUSE_THRESHOLD similar
+# (weighted overlap of the selections; 0 turns reuse off) whose careers cover
+# REUSE_MIN_COVERAGE of the new manual matches is re-ranked locally instead of calling
+# OpenAI. REUSE_SHADOW_RATE of the reused results are also computed fresh in the
+# background, to measure how well reuse agrees with the real thing.
+REUSE_THRESHOLD = float(get_setting("REUSE_THRESHOLD", 0.8))
+REUSE_MIN_COVERAGE = float(get_setting("REUSE_MIN_COVERAGE", 0.67))
+REUSE_SHADOW_RATE = float(get_setting("REUSE_SHADOW_RATE", 0.05))
+REUSE_INDEX_SIZE = int(get_setting("REUSE_INDEX_SIZE", 5000))
+# Careers per "Show more matches" page
+MORE_MATCHES_PAGE_SIZE = int(get_setting("MORE_MATCHES_PAGE_SIZE", 6))
+# Alternative OpenAI-compatible endpoint, e.g. the stub backend of load_test.py
+OPENAI_BASE_URL = get_setting("OPENAI_BASE_URL", None)
+# Most AI pipeline runs a session may start speculatively on step 3, before the
+# student asks for the results (0 turns speculative prefetch off)
+PREFETCH_LIMIT = int(get_setting("PREFETCH_LIMIT", 1))
+# Append completed result sets to the analytics event log shared by the workers on
+# the host; the aggregates over it are persisted every ANALYTICS_FLUSH_SECONDS
+ANALYTICS = get_flag("ANALYTICS", True)
+ANALYTICS_DIR = get_setting("ANALYTICS_DIR", DEFAULT_ANALYTICS_DIR)
+ANALYTICS_FLUSH_SECONDS = float(get_setting("ANALYTICS_FLUSH_SECONDS", 30))
+
+def make_openai_client():
+    return OpenAI(api_key=openai_api_key, base_url=OPENAI_BASE_URL)
+
+# A session serves one tenant for its whole lifetime
+if 'tenant' not in st.session_state:
+    st.session_state.tenant = st.query_params.get("tenant") or TENANT
+
 # Load data
+set_stage("data")
 careers = load_career_data()
+catalog_version = careers.version
 interest_categories = load_interest_categories()
 skill_categories = load_skill_categories()
 sdgs = load_sdgs()
+sdg_names_by_id = SDG_NAMES
 
 # Helper functions for selections
 def handle_interest_select(interest):
@@ -457,6 +586,7 @@ def handle_interest_select(interest):
     else:
         if len(st.session_state.selected_interests) < 3:
             st.session_state.selected_interests.append(interest)
+    get_live_scorer()
 
 def handle_current_skill_select(skill):
     if skill in st.session_state.current_skills:
@@ -464,6 +594,7 @@ def handle_current_skill_select(skill):
     else:
         if len(st.session_state.current_skills) < 3:
             st.session_state.current_skills.append(skill)
+    get_live_scorer()
 
 def handle_sdg_select(sdg_id):
     if sdg_id in st.session_state.selected_sdgs:
@@ -471,408 +602,741 @@ def handle_sdg_select(sdg_id):
     else:
         if len(st.session_state.selected_sdgs) < 3:
             st.session_state.selected_sdgs.append(sdg_id)
+    get_live_scorer()
+    speculate()
 
-def get_sdg_names(sdg_ids):
-    return [sdg["name"] for sdg in sdgs if sdg["id"] in sdg_ids]
+# Per-session live scores, updated with a delta for whatever changed since the last call
+def get_live_scorer():
+    scorer = st.session_state.get("live_scorer")
+    if scorer is None:
+        scorer = IncrementalScorer(careers)
+        st.session_state.live_scorer = scorer
+    scorer.sync(
+        careers,
+        st.session_state.selected_interests,
+        st.session_state.current_skills,
+        st.session_state.selected_sdgs
+    )
+    return scorer
 
-# Manual career matching algorithm
-def match_careers_manually():
-    # Score each career based on matches
-    scored_careers = []
-    
-    # Log the total number of careers being processed
-    st.write(f"Processing {len(careers)} careers for manual matching...")
+# Live preview of the best manual matches for the selections made so far
+def render_live_preview():
+    if not LIVE_PREVIEW_SIZE:
+        return
+    st.markdown("#### Top matches so far")
+    top_matches = get_live_scorer().top_matches(careers, k=LIVE_PREVIEW_SIZE)
+    if not top_matches:
+        st.caption("Careers that match your selections will appear here.")
+        return
+    for match in top_matches:
+        st.markdown(f"- **{match['title']}** · {match['match_score']}% match")
+
+# Rendered HTML for one step 4 card. Built once per result set and card, then
+# served from the card cache on every rerun while the student scrolls the results.
+def get_card_html(source, index, match):
+    build = judge_card_html if source.startswith("judge") else manual_card_html
+    result_set_id = st.session_state.result_set_id
+    if result_set_id is None:
+        return build(match, top=index == 0)
     
-    for career in careers:
-        score = 0
-        match_details = {
-            "interest_matches": [],
-            "skill_matches": {
-                "current": []
-            },
-            "sdg_matches": []
-        }
-        
-        # Score for matching interests (highest weight)
-        for interest in st.session_state.selected_interests:
-            if interest in career["interests"]:
-                score += 3
-                match_details["interest_matches"].append(interest)
-        
-        # Score for matching current skills
-        for skill in st.session_state.current_skills:
-            if skill in career["skills"]:
-                score += 2
-                match_details["skill_matches"]["current"].append(skill)
-        
-        # Score for matching SDGs (high weight - values are important)
-        for sdg_id in st.session_state.selected_sdgs:
-            if sdg_id in career["sdgs"]:
-                score += 3
-                match_details["sdg_matches"].append(sdg_id)
+    key = (result_set_id, source, index)
+    card_cache = get_card_cache()
+    parts = card_cache.get(key)
+    if parts is None:
+        parts = build(match, top=index == 0)
+        card_cache.put(key, catalog_version, parts)
+    return parts
+
+# Display objects for the session's results, resolved only when needed
+def get_manual_matches():
+    return resolve_matches(
+        careers,
+        st.session_state.manual_results,
+        st.session_state.selected_interests,
+        st.session_state.current_skills,
+        st.session_state.selected_sdgs
+    )
+
+# Scored career dicts of one "Show more matches" page
+def resolve_page(page_index):
+    return resolve_matches(
+        careers,
+        st.session_state.more_pages[page_index],
+        st.session_state.selected_interests,
+        st.session_state.current_skills,
+        st.session_state.selected_sdgs
+    )
+
+# One page in the judge's card format, with the AI Judge explanations once they are in
+def get_page_matches(page_index, explained=True):
+    matches = evidence_matches(resolve_page(page_index), sdg_names_by_id)
+    explanations = st.session_state.page_explanations.get(page_index)
+    if explained and explanations:
+        matches = merge_explanations(matches, explanations)
+    return matches
+
+# Careers on screen in the current view, which the next pages leave out
+def displayed_ids():
+    judge_matches = get_judge_matches()
+    if st.session_state.has_api_key and judge_matches:
+        return [match.get("id") for match in judge_matches]
+    return [career_id for career_id, _ in st.session_state.manual_results]
+
+# "Show more matches": take the next page from the session's ranking cursor. The
+# live scorer already holds this profile's scores, so the catalog is not rescored.
+def show_more_matches():
+    if st.session_state.ranking_cursor is None:
+        st.session_state.ranking_cursor = RankingCursor(exclude_ids=displayed_ids())
+    scores = get_live_scorer().scores
+    rows = st.session_state.ranking_cursor.next_page(careers, scores, MORE_MATCHES_PAGE_SIZE)
+    if rows:
+        st.session_state.more_pages.append([(careers.career_id(i), int(scores[i])) for i in rows])
+        if st.session_state.has_api_key:
+            st.session_state.pending_pages.append(len(st.session_state.more_pages) - 1)
+
+def reset_more_matches():
+    st.session_state.more_pages = []
+    st.session_state.ranking_cursor = None
+    st.session_state.page_explanations = {}
+    st.session_state.pending_pages = []
+
+# The pages opened so far, below the first results, and the button for the next one
+def render_more_matches(source):
+    shown = set(displayed_ids())
+    for page_index in range(len(st.session_state.more_pages)):
+        if source == "judge":
+            matches = get_page_matches(page_index)
+            explained = page_index in st.session_state.page_explanations
+            page_source = f"judge-page-{page_index}{'-explained' if explained else ''}"
+        else:
+            matches = resolve_page(page_index)
+            page_source = f"manual-page-{page_index}"
+        # The view may have switched from the manual to the AI results since the page
+        # was taken; positions stay those of the page so cached cards still line up
+        cards = [(position, match) for position, match in enumerate(matches, 1) if match["id"] not in shown]
         
-        career_with_score = career.copy()
-        career_with_score["score"] = score
-        career_with_score["match_details"] = match_details
-        # Calculate match percentage (max score would be 3*3 + 3*2 + 3*1 + 3*3 = 27)
-        career_with_score["match_score"] = int((score / 27) * 100)
-        scored_careers.append(career_with_score)
+        for i in range(0, len(cards), 2):
+            cols = st.columns(2)
+            for j in range(2):
+                if i + j < len(cards):
+                    card_html = get_card_html(page_source, *cards[i + j])
+                    with cols[j]:
+                        st.markdown(card_html["card"], unsafe_allow_html=True)
+                        if source == "judge":
+                            st.markdown(card_html["counts"], unsafe_allow_html=True)
+    
+    cursor = st.session_state.ranking_cursor
+    if cursor is None or not cursor.exhausted:
+        st.button("Show more matches", on_click=show_more_matches)
+
+def get_judge_matches():
+    entry = st.session_state.result_entry
+    return entry["judge_matches"] if entry else []
+
+# Manual career matching algorithm
+def match_careers_manually():
+    logger.debug("manual matching started", extra={"careers": len(careers)})
+    if DEBUG_UI:
+        st.write(f"Processing {len(careers)} careers for manual matching...")
     
-    # First check if we have any matches with score > 0
-    matches_with_score = [c for c in scored_careers if c["score"] > 0]
+    top_matches = get_matcher().match(
+        careers,
+        st.session_state.selected_interests,
+        st.session_state.current_skills,
+        st.session_state.selected_sdgs
+    )
     
-    # If we have fewer than 6 matches with score > 0, include some with score = 0
+    matches_with_score = [c for c in top_matches if c["score"] > 0]
     if len(matches_with_score) < 6:
         st.warning(f"Only found {len(matches_with_score)} careers with matching criteria. Including some additional options.")
-        
-        # Add careers with score 0 until we have 6 or run out of careers
-        zero_score_careers = [c for c in scored_careers if c["score"] == 0]
-        additional_needed = min(6 - len(matches_with_score), len(zero_score_careers))
-        
-        # Take a random selection of zero-score careers
-        import random
-        random.shuffle(zero_score_careers)
-        matches_with_score.extend(zero_score_careers[:additional_needed])
     
-    # Sort by score and take top 6
-    top_matches = sorted(
-        matches_with_score,
-        key=lambda x: x["score"],
-        reverse=True
-    )[:6]
-    
-    # Log the top matches for debugging
-    st.write(f"Found {len(top_matches)} top career matches")
-    for match in top_matches:
-        st.write(f"- {match['title']} (Score: {match['match_score']}%)")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("manual matching finished", extra={
+            "with_score": len(matches_with_score),
+            "top": [(match["id"], match["match_score"]) for match in top_matches]
+        })
+    if DEBUG_UI:
+        st.write(f"Found {len(top_matches)} top career matches")
+        for match in top_matches:
+            st.write(f"- {match['title']} (Score: {match['match_score']}%)")
     
     return top_matches
 
-# AI-based career matching using OpenAI
-def get_ai_career_matches():
-    if not st.session_state.has_api_key:
-        st.error("OpenAI API key not found in secrets. Please add it to your Streamlit secrets.toml file.")
-        return []
-    
-    try:
-        # Create the client
-        client = OpenAI(api_key=openai_api_key)
-        
-        # Format interests, skills, and SDGs
-        interests_str = ", ".join(st.session_state.selected_interests)
-        current_skills_str = ", ".join(st.session_state.current_skills)
-        sdgs_str = ", ".join([f"SDG {sdg_id}: {[s['name'] for s in sdgs if s['id'] == sdg_id][0]}" for sdg_id in st.session_state.selected_sdgs])
-        
-        # Log the total number of careers being processed
-        st.write(f"Processing {len(careers)} careers for AI matching...")
-        
-        # Construct the career data - ONLY include title (as requested)
-        career_data = []
-        for career in careers:
-            career_info = {
-                "id": career["id"],
-                "title": career["title"],
-                # Only use career title for AI matching as requested
-            }
-            career_data.append(career_info)
-        
-        # Check if we have too many careers for a single API call
-        if len(career_data) > 100:
-            st.warning(f"Large dataset detected ({len(career_data)} careers). Processing in batches.")
-            # Process in batches to avoid token limits
-            batches = [career_data[i:i+100] for i in range(0, len(career_data), 100)]
-            all_results = []
-            
-            for batch_index, batch in enumerate(batches):
-                st.write(f"Processing batch {batch_index+1}/{len(batches)}...")
-                batch_json = json.dumps(batch)
-                # Process this batch and collect results
-                # Code for processing batch will be added here
-                # For now, just add to all_results
-                # We'll implement batch processing in the next update
-            
-            # For now, just use the first batch to avoid complexity
-            career_data = batches[0]
-            career_data_json = json.dumps(career_data)
-            st.warning("Using only the first 100 careers for this demo. Full batch processing will be implemented soon.")
-        else:
-            career_data_json = json.dumps(career_data)
-        
-        # Construct the prompt for OpenAI
-        system_prompt = f"""You are a career counselor AI that helps students find the best career matches based on their interests, skills, and values.
-
-        You'll be given:
-        1. A student's interests, skills, and values (UN SDGs they care about)
-        2. A list of potential careers (only career titles)
-
-        Your task is to:
-        1. Analyze the student's profile
-        2. Find the 6 best career matches from the provided list
-        3. Return a JSON response with these matches, including explanations for why each match is good
-
-        For each career match, include:
-        - Career title
-        - Detailed explanation of why this is a good match based on interests, skills, and SDGs
-        - Key interests, skills, and SDGs that align with this career
-        - A "match_score" between 1-100 indicating how good the match is (highest score first)
-        """
-
-        user_prompt = f"""
-        Here is the student's profile:
-
-        Interests: {interests_str}
-        Current Skills: {current_skills_str}
-        Values (SDGs): {sdgs_str}
-
-        Here are the available careers to match from:
-        {career_data_json}
-
-        Return a JSON object with exactly 6 career matches in this format:
-        {{
-          "career_matches": [
-            {{
-              "id": career_id,
-              "title": "Career Title",
-              "description": "A professional role in this field.",
-              "match_score": score_between_1_and_100,
-              "explanation": "Detailed explanation of why this is a good match",
-              "matching_interests": ["interest1", "interest2", "interest3"],
-              "matching_skills": {{"current": ["skill1", "skill2", "skill3"]}},
-              "matching_sdgs": ["SDG1: Name", "SDG2: Name", "SDG3: Name"]
-            }},
-            ...
-          ]
-        }}
-
-        Ensure each career has a different match_score and sort by match_score in descending order.
-        """
-
-        # Get completion from OpenAI
-        try:
-            completion = client.chat.completions.create(
-                model="gpt-4o-mini",  # Using gpt-4o-mini for AI scoring
-                response_format={"type": "json_object"},
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.5  # Lower temperature for more consistent results
-            )
-            
-            # Extract and parse the JSON response
-            response_content = completion.choices[0].message.content
-            
-            try:
-                parsed_response = json.loads(response_content)
-                return parsed_response["career_matches"]
-            except json.JSONDecodeError:
-                st.error("Failed to parse AI response. Please try again.")
-                return []
-                
-        except Exception as e:
-            st.error(f"Error connecting to OpenAI API: {str(e)}")
-            return []
-    except Exception as e:
-        st.error(f"Error: {str(e)}")
-        return []
-
-# AI Judge function to evaluate and combine both methods
-def get_ai_judge_career_matches(manual_matches, ai_matches):
-    if not st.session_state.has_api_key:
-        st.error("OpenAI API key not found in secrets. Please add it to your Streamlit secrets.toml file.")
-        return []
-        
-    try:
-        # Create the client
-        client = OpenAI(api_key=openai_api_key)
-        
-        # Format interests, skills, and SDGs for context
-        interests_str = ", ".join(st.session_state.selected_interests)
-        current_skills_str = ", ".join(st.session_state.current_skills)
-        sdgs_str = ", ".join([f"SDG {sdg_id}: {[s['name'] for s in sdgs if s['id'] == sdg_id][0]}" for sdg_id in st.session_state.selected_sdgs])
-        
-        # Prepare manual matches for the prompt
-        manual_matches_json = json.dumps(manual_matches)
-        
-        # Prepare AI matches for the prompt  
-        ai_matches_json = json.dumps(ai_matches)
-        
-        # Construct the prompt for OpenAI Judge
-        system_prompt = f"""You are an expert AI career counselor who evaluates career recommendations.
-
-        You'll be given:
-        1. A student's profile (interests, skills, and values)
-        2. Two sets of career recommendations:
-           - One set from a manual algorithm that uses weighted scoring
-           - One set from an AI system that uses more advanced matching
-
-        Your task is to:
-        1. Don't look at their scores but look at their matches and come with a more accurate response - ACT LIKE AN EXPERIENCED CAREER COUNSELLOR 
-        2. Analyze both sets of recommendations and suggest why you picking one over the other
-        3. Create a refined set of 6 career suggestions that represents the best matches by combining insights from both methods
-        4. Provide a brief explanation of why each career made your final list
-        5. Assign a match score to each career (1-100) and sort by descending score
-
-        Your response should be more accurate than either method alone by leveraging the strengths of both approaches.
-        """
-
-        user_prompt = f"""
-        Here is the student's profile:
-
-        Interests: {interests_str}
-        Current Skills: {current_skills_str}
-        Values (SDGs): {sdgs_str}
-
-        Here are the career matches from the manual algorithm:
-        {manual_matches_json}
-
-        Here are the career matches from the AI algorithm:
-        {ai_matches_json}
-
-        Provide your expert judgment on the best 6 career matches in this JSON format:
-        {{
-          "career_matches": [
-            {{
-              "id": career_id,
-              "title": "Career Title",
-              "description": "Career description",
-              "match_score": score_between_1_and_100,
-              "explanation": "Your expert reasoning on why this is a good match",
-              "analysis": "Brief comparison of how this career was ranked in both systems, dont show the score but explain it was handpicked and then AI analysed",
-              "matching_interests": ["interest1", "interest2", "interes3"],
-              "matching_skills": {{"current": ["skill1", "skill2", "skill3"]}},
-              "matching_sdgs": ["SDG1: Name", "SDG2: Name", "SDG3: Name"]
-            }},
-            ...
-          ]
-        }}
-
-        Make sure each career has a unique match score and sort them by match_score in descending order.
-        """
-
-        # Get completion from OpenAI
+# Bump whenever the prompts or models in llm.py change so coalesced results never mix versions
+PROMPT_VERSION = "3"
+
+# Prompt version namespaced by tenant, so tenants never share cached results
+def tenant_prompt_version(tenant):
+    return PROMPT_VERSION if tenant == DEFAULT_TENANT else f"{tenant}/{PROMPT_VERSION}"
+
+# Key shared by every session with the same profile, catalog and pipeline configuration
+def current_profile_key():
+    profile = current_profile()
+    return profile_key(profile, catalog_version, f"{tenant_prompt_version(st.session_state.tenant)}/{PIPELINE_MODE}")
+
+# Finished AI output for a result-cache key, from this worker or the shared SQLite tier
+def find_cached_result(key):
+    result_cache = get_result_cache()
+    cached = result_cache.get(key)
+    if cached is None:
+        # Computed by another worker on this host (or by the cache warmer)
         try:
-            completion = client.chat.completions.create(
-                model="gpt-4.1-mini",  # Using a more powerful model for the judge
-                response_format={"type": "json_object"},
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3  # Lower temperature for more consistent results
-            )
-            
-            # Extract and parse the JSON response
-            response_content = completion.choices[0].message.content
-            
-            try:
-                parsed_response = json.loads(response_content)
-                return parsed_response["career_matches"]
-            except json.JSONDecodeError:
-                st.error("Failed to parse AI Judge response. Please try again.")
-                return []
-                
-        except Exception as e:
-            st.error(f"Error connecting to OpenAI API: {str(e)}")
-            return []
-    except Exception as e:
-        st.error(f"Error: {str(e)}")
-        return []
+            cached = get_snapshot_store().get_result(key)
+        except sqlite3.Error:
+            cached = None
+        if cached is not None:
+            result_cache.put(key, catalog_version, cached)
+    return cached
+
+# Result-cache key for the current selections, the route to compute them with and
+# the finished result if there is one
+def plan_matching():
+    key = current_profile_key()
+    cached = find_cached_result(key)
+    route = None
+    if cached is None:
+        # Pick the route that fits the latency budget; degraded results are
+        # cached apart from the full ones
+        route = plan_route(get_latency_tracker(), PIPELINE_MODE, SLO_SECONDS, SLO_FAST_MODEL, SLO_SHORTLIST_SIZE)
+        if route_signature(route):
+            key = f"{key}:{route_signature(route)}"
+            cached = get_result_cache().get(key)
+    return key, route, cached
+
+# Speculative prefetch: once step 3 has a complete profile (all three SDGs picked),
+# start the AI pipeline for it while the student is still looking at the SDGs, so
+# the results button usually picks up a running or finished job. Partial SDG
+# selections are never speculated on, since each toggle would start a full
+# pipeline run that is most likely thrown away. When the selections change
+# the old speculation is withdrawn; the runner drops it if it has not started
+# yet, and a running one still ends up in the result cache. Speculation never
+# queues behind real work on a busy worker.
+def speculate():
+    # From an on_click callback, which runs before the script sets the id of its run
+    if correlation_id.get() == "-":
+        set_correlation_id(st.session_state.log_runs + 1)
+    runner = get_job_runner()
+    previous = runner.get(st.session_state.speculative_job_id)
+    st.session_state.speculative_job_id = None
+    complete = (
+        len(st.session_state.selected_interests) == 3
+        and len(st.session_state.current_skills) == 3
+        and len(st.session_state.selected_sdgs) == 3
+    )
+    if not (st.session_state.has_api_key and complete and PREFETCH_LIMIT > 0):
+        if previous is not None:
+            runner.cancel(previous.id)
+        return
+    
+    key, route, cached = plan_matching()
+    if previous is not None and previous.key == key and previous.status not in ("failed", "cancelled"):
+        st.session_state.speculative_job_id = previous.id
+        return
+    if previous is not None:
+        runner.cancel(previous.id)
+    if cached is not None or st.session_state.speculations >= PREFETCH_LIMIT or runner.pending() >= JOB_WORKERS:
+        return
+    
+    manual_matches = get_matcher().match(
+        careers,
+        st.session_state.selected_interests,
+        st.session_state.current_skills,
+        st.session_state.selected_sdgs
+    )
+    if REUSE_THRESHOLD > 0:
+        index = get_similar_index()
+        if index.reusable(index.nearest(reuse_scope(), current_profile(), matched_ids(manual_matches))):
+            return
+    st.session_state.speculations += 1
+    st.session_state.speculative_job_id = submit_matching_job(manual_matches, route, key)
+
+def current_profile():
+    return canonical_profile(
+        st.session_state.selected_interests,
+        st.session_state.current_skills,
+        st.session_state.selected_sdgs
+    )
+
+# Profiles are only compared within one catalog version, tenant and pipeline mode
+def reuse_scope():
+    return f"{catalog_version}/{tenant_prompt_version(st.session_state.tenant)}/{PIPELINE_MODE}"
+
+# Manual matches with a positive score, i.e. without the random zero-score padding
+def matched_ids(manual_matches):
+    return [match["id"] for match in manual_matches if match["score"] > 0]
+
+# Approximate reuse for step 3. Returns the entry built from a similar profile's AI
+# matches (None if none is close enough), and what reuse gave or would have given
+# (None unless a hit or a near miss) to compare with the fresh result.
+def find_similar_result(manual_matches):
+    if REUSE_THRESHOLD <= 0:
+        return None, None
+    index = get_similar_index()
+    match = index.nearest(reuse_scope(), current_profile(), matched_ids(manual_matches))
+    hit = index.reusable(match)
+    index.record_lookup(hit)
+    if not (hit or index.near_miss(match)):
+        return None, None
+    
+    entry = reuse_entry(
+        match["ai_matches"],
+        careers,
+        manual_matches,
+        st.session_state.selected_interests,
+        st.session_state.current_skills,
+        st.session_state.selected_sdgs,
+        sdg_names_by_id
+    )
+    shadow = {"similarity": match["similarity"], "ids": [m.get("id") for m in entry["judge_matches"]], "reused": hit}
+    return (entry if hit else None), shadow
+
+# Withdraw the session's speculative job, if any
+def discard_speculation():
+    if st.session_state.speculative_job_id is not None:
+        get_job_runner().cancel(st.session_state.speculative_job_id)
+        st.session_state.speculative_job_id = None
 
 def go_to_next_step():
     if st.session_state.step == 1 and len(st.session_state.selected_interests) == 3:
         st.session_state.step = 2
     elif st.session_state.step == 2 and len(st.session_state.current_skills) == 3:
         st.session_state.step = 3
+        # SDGs may still be selected from an earlier visit to step 3
+        speculate()
     elif st.session_state.step == 3 and len(st.session_state.selected_sdgs) > 0:
+        st.session_state.step3_started = time.time()
+        st.session_state.result_source = "ai" if st.session_state.has_api_key else "manual"
         # Generate career matches using all methods
+        logger.info("step 3 submitted", extra={
+            "tenant": st.session_state.tenant,
+            "catalog_version": catalog_version,
+            "careers": len(careers),
+            "sdgs": len(st.session_state.selected_sdgs)
+        })
         with st.spinner("Finding your ideal career matches..."):
             # Create a container for debug information
             debug_container = st.container()
             
-            with debug_container:
-                st.write("### Debug Information")
-                st.write("This information will help diagnose any issues with career matching.")
-                # Display total number of careers loaded
-                st.write(f"Total careers loaded from CSV: {len(careers)}")
-                
-                # Display a sample of careers to verify data loading
-                st.write("Sample of careers loaded:")
-                for i, career in enumerate(careers[:5]):
-                    st.write(f"{i+1}. {career['title']}")
-                if len(careers) > 5:
-                    st.write(f"... and {len(careers)-5} more")
+            if DEBUG_UI:
+                with debug_container:
+                    st.write("### Debug Information")
+                    st.write("This information will help diagnose any issues with career matching.")
+                    # Display total number of careers loaded
+                    st.write(f"Total careers loaded from CSV: {len(careers)}")
+                    
+                    # Display a sample of careers to verify data loading
+                    st.write("Sample of careers loaded:")
+                    for i in range(min(5, len(careers))):
+                        st.write(f"{i+1}. {careers.title(i)}")
+                    if len(careers) > 5:
+                        st.write(f"... and {len(careers)-5} more")
             
             # Set up progress bar for career matching
             progress_bar = st.progress(0)
             progress_text = st.empty()
             
-            # First phase: analyze profile
-            progress_text.markdown(f"<div style='text-align: center; font-style: italic;'>{random.choice(progress_messages['analyzing'])}</div>", unsafe_allow_html=True)
-            for i in range(20):
-                progress_bar.progress(i)
-                time.sleep(0.05)
-                
             # Get manual matches
-            with debug_container:
-                st.write("### Manual Matching Process")
-            st.session_state.manual_career_matches = match_careers_manually()
+            if DEBUG_UI:
+                with debug_container:
+                    st.write("### Manual Matching Process")
+            with stage("scoring"):
+                manual_matches = match_careers_manually()
+            st.session_state.manual_results = compact_matches(manual_matches)
+            st.session_state.results_version = catalog_version
             
             if st.session_state.has_api_key:
-                # Second phase: matching careers
-                progress_text.markdown(f"<div style='text-align: center; font-style: italic;'>{random.choice(progress_messages['matching'])}</div>", unsafe_allow_html=True)
-                for i in range(20, 50):
-                    progress_bar.progress(i)
-                    time.sleep(0.05)
-                
-                # Get AI matches
-                with debug_container:
-                    st.write("### AI Matching Process")
-                st.session_state.ai_career_matches = get_ai_career_matches()
-                
-                # Third phase: AI Judge evaluation
-                progress_text.markdown(f"<div style='text-align: center; font-style: italic;'>{random.choice(progress_messages['judging'])}</div>", unsafe_allow_html=True)
-                for i in range(50, 100):
-                    progress_bar.progress(i)
-                    time.sleep(0.05)
-                
-                # Get AI Judge matches if both other methods have results
-                if st.session_state.manual_career_matches and st.session_state.ai_career_matches:
-                    with debug_container:
-                        st.write("### AI Judge Evaluation Process")
-                        st.write(f"Manual matches: {len(st.session_state.manual_career_matches)}")
-                        st.write(f"AI matches: {len(st.session_state.ai_career_matches)}")
-                    
-                    st.session_state.judge_career_matches = get_ai_judge_career_matches(
-                        st.session_state.manual_career_matches, 
-                        st.session_state.ai_career_matches
-                    )
+                # AI matching and the AI Judge run as a background job so this script thread
+                # is not held for the OpenAI latency; step 4 polls the job and shows the
+                # results when it finishes. Reuse a finished result for this profile and
+                # catalog version if we have one.
+                key, route, cached = plan_matching()
+                st.session_state.result_key = key
+                speculative = get_job_runner().get(st.session_state.speculative_job_id)
+                st.session_state.speculative_job_id = None
+                if cached is not None:
+                    st.session_state.result_entry = cached
+                    # A speculation that finished before the click left its result in the cache
+                    if speculative is not None and speculative.key == key and speculative.status == "done":
+                        st.session_state.result_source = "speculative"
+                    else:
+                        st.session_state.result_source = "cached"
+                elif speculative is not None and speculative.key == key and speculative.status not in ("failed", "cancelled"):
+                    # Already started on step 3: wait for that job instead of a new one
+                    start_job("matching", speculative.id)
+                    st.session_state.result_source = "speculative"
+                    st.session_state.manual_first = route["manual_first"]
+                else:
+                    reused, shadow = find_similar_result(manual_matches)
+                    if reused is not None:
+                        # Close enough to a profile computed before: re-ranked locally, no OpenAI call
+                        st.session_state.result_entry = reused
+                        st.session_state.result_key = None
+                        st.session_state.result_source = "reused"
+                        if random.random() < REUSE_SHADOW_RATE:
+                            submit_matching_job(manual_matches, route, key, shadow=shadow)
+                    else:
+                        start_job("matching", submit_matching_job(manual_matches, route, key, shadow=shadow))
+                        st.session_state.manual_first = route["manual_first"]
+                if speculative is not None and speculative.id != st.session_state.job_id:
+                    get_job_runner().cancel(speculative.id)
             else:
                 # If no API key, just animate progress for manual matching
-                for i in range(20, 100):
+                progress_text.markdown(f"<div style='text-align: center; font-style: italic;'>{random.choice(progress_messages['analyzing'])}</div>", unsafe_allow_html=True)
+                for i in range(100):
                     progress_bar.progress(i)
                     time.sleep(0.02)
-            
-            # Finish the progress bar
-            progress_bar.progress(100)
-            time.sleep(0.5)
+                
+                # Finish the progress bar
+                progress_bar.progress(100)
+                time.sleep(0.5)
             
             # Hide debug information in final view
             debug_container.empty()
             
+        reset_more_matches()
+        if st.session_state.job_id is None:
+            finish_results()
         st.session_state.step = 4
 
+# Whether a fusion-mode (or reused) entry still needs the AI Judge explanations
+def needs_enrichment(entry):
+    fused = PIPELINE_MODE == "fusion" or bool(entry and entry.get("reused"))
+    return fused and JUDGE_ENRICHMENT and bool(entry and entry["judge_matches"]) and not entry["explained"]
+
+# The session's results are complete: prepare step 4 and persist them
+def finish_results():
+    st.session_state.manual_first = False
+    st.session_state.judge_enrichment_pending = needs_enrichment(st.session_state.result_entry)
+    st.session_state.result_set_id = uuid.uuid4().hex
+    if st.session_state.step3_started is not None:
+        entry = st.session_state.result_entry
+        logger.info("results ready", extra={
+            "source": st.session_state.result_source,
+            "seconds": round(time.time() - st.session_state.step3_started, 3),
+            "ai_matches": len(entry["ai_matches"]) if entry else 0,
+            "judge_matches": len(entry["judge_matches"]) if entry else 0,
+            "messages": [level for level, _ in entry["messages"]] if entry else []
+        })
+    save_result_snapshot()
+    record_result_event()
+
+# Append the finished result set to the analytics event log. Analytics must never
+# get in the way of the results, so a failed write is only counted.
+def record_result_event():
+    if not ANALYTICS or st.session_state.step3_started is None:
+        return
+    entry = st.session_state.result_entry
+    if entry and entry["judge_matches"]:
+        matches = entry["judge_matches"]
+    else:
+        matches = get_manual_matches()
+    event = make_event(
+        st.session_state.tenant,
+        catalog_version,
+        st.session_state.result_source,
+        time.time() - st.session_state.step3_started,
+        st.session_state.selected_interests,
+        st.session_state.current_skills,
+        st.session_state.selected_sdgs,
+        [(match.get("id"), match.get("title")) for match in matches],
+        error=bool(entry and any(level == "error" for level, _ in entry["messages"]))
+    )
+    try:
+        get_analytics().record(event)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning("analytics event not recorded", exc_info=e)
+    st.session_state.step3_started = None
+
+# Start the AI matching (+ judge) pipeline on the job runner. Everything the
+# worker thread needs is captured here, it never touches st.* itself.
+def submit_matching_job(manual_matches, route, key, shadow=None):
+    client = make_openai_client()
+    result_cache = get_result_cache()
+    store = get_snapshot_store()
+    tracker = get_latency_tracker()
+    index = get_similar_index()
+    profiler = get_profiler()
+    tenant = st.session_state.tenant
+    scope = reuse_scope()
+    profile = current_profile()
+    manual_ids = matched_ids(manual_matches)
+    catalog = careers
+    version = catalog_version
+    interests = list(st.session_state.selected_interests)
+    skills = list(st.session_state.current_skills)
+    sdg_ids = list(st.session_state.selected_sdgs)
+    # The live scorer keeps updating its array as the student toggles, so the job gets a copy
+    scores = get_live_scorer().scores.copy()
+    
+    def run(job):
+        with profiler.sampled("pipeline"):
+            entry = run_matching_pipeline(
+                client, PIPELINE_MODE, catalog, manual_matches, interests, skills, sdg_ids, sdg_names_by_id,
+                progress=job.report,
+                route=route,
+                tracker=tracker,
+                scores=scores
+            )
+        if route is not None and route_signature(route):
+            # Degraded: restored or explained copies go back under the same suffixed key
+            entry["degraded"] = route_signature(route)
+        if entry["judge_matches"]:
+            result_cache.put(key, version, entry)
+            try:
+                store.put_result(key, version, entry, tenant)
+            except sqlite3.Error as e:
+                logger.warning("result not shared with other workers", exc_info=e)
+            index.add(key, scope, profile, manual_ids, entry["ai_matches"])
+            if shadow is not None:
+                index.record_shadow(shadow["similarity"], shadow["ids"], [m.get("id") for m in entry["judge_matches"]], shadow["reused"])
+        return entry
+    return get_job_runner().submit(key, run)
+
+# Fusion mode: the cards are already on screen, now let the AI Judge write its
+# explanations in the background and swap them in
+def submit_enrichment_job(key):
+    client = make_openai_client()
+    result_cache = get_result_cache()
+    version = catalog_version
+    entry = st.session_state.result_entry
+    manual_matches = get_manual_matches()
+    interests = list(st.session_state.selected_interests)
+    skills = list(st.session_state.current_skills)
+    sdg_ids = list(st.session_state.selected_sdgs)
+    
+    def run(job):
+        job.report("judging", 50)
+        enriched = enrich_explanations(client, entry, manual_matches, interests, skills, sdg_ids, sdg_names_by_id)
+        # Written back under the key the entry came from, so a degraded result never
+        # replaces a full one. A reused entry was borrowed from another profile and
+        # has no key: it must never be served as this profile's own AI result.
+        if key is not None and not enriched.get("reused"):
+            result_cache.put(key, version, enriched)
+        return enriched
+    job_key = key if key is not None else f"{current_profile_key()}:reused"
+    return get_job_runner().submit(job_key + ":explanations", run)
+
+# AI Judge explanations for one "Show more matches" page, written only once the
+# student has opened it. Shared with every session that opens the same page.
+def submit_page_job(page_index):
+    matches = get_page_matches(page_index, explained=False)
+    key = f"{current_profile_key()}:page:{','.join(str(m['id']) for m in matches)}"
+    client = make_openai_client()
+    result_cache = get_result_cache()
+    version = catalog_version
+    manual_matches = resolve_page(page_index)
+    interests = list(st.session_state.selected_interests)
+    skills = list(st.session_state.current_skills)
+    sdg_ids = list(st.session_state.selected_sdgs)
+    
+    def run(job):
+        explanations = result_cache.get(key)
+        if explanations is None:
+            job.report("judging", 50)
+            explanations = judge_explanations(client, matches, manual_matches, [], interests, skills, sdg_ids, sdg_names_by_id)
+            result_cache.put(key, version, explanations)
+        return {"page": page_index, "explanations": explanations}
+    return get_job_runner().submit(key, run)
+
+def start_job(kind, job_id):
+    st.session_state.job_id = job_id
+    st.session_state.job_kind = kind
+
+# Take over the result of the session's finished (or lost) job
+def adopt_job(job):
+    kind = st.session_state.job_kind
+    st.session_state.job_id = None
+    st.session_state.job_kind = None
+    
+    if kind == "page":
+        # On failure the page keeps its evidence-based explanations
+        if job is not None and job.status == "done":
+            st.session_state.page_explanations[job.result["page"]] = job.result["explanations"]
+        return
+    
+    if kind == "explanations":
+        # On failure the cards keep their evidence-based explanations
+        if job is not None and job.status == "done":
+            st.session_state.result_entry = job.result
+            st.session_state.result_set_id = uuid.uuid4().hex
+            if st.session_state.result_id:
+                try:
+                    get_snapshot_store().update_entry(st.session_state.result_id, job.result)
+                except sqlite3.Error as e:
+                    logger.warning("result snapshot not updated", exc_info=e)
+        return
+    
+    if job is None:
+        # The worker restarted or the job expired before this session came back for it
+        entry = make_result_entry([], [], messages=[("error", "The AI Career Counselor did not finish. Please try again.")])
+    elif job.status == "failed":
+        entry = make_result_entry([], [], messages=[("error", f"Error: {str(job.error)}")])
+    else:
+        entry = job.result
+    st.session_state.result_entry = entry
+    finish_results()
+
+# Progress of the session's background job. Polls every JOB_POLL_SECONDS without
+# rerunning the rest of the page and reruns the app once the job is finished.
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_status():
+    job = get_job_runner().get(st.session_state.job_id)
+    if job is None or job.done:
+        adopt_job(job)
+        st.rerun()
+    
+    # Past the latency budget: show the manual matches now and upgrade them in place later
+    if st.session_state.job_kind == "matching" and not st.session_state.manual_first and SLO_SECONDS > 0 and time.time() - job.created_at > SLO_SECONDS:
+        st.session_state.manual_first = True
+        st.rerun()
+    
+    messages = progress_messages.get(job.stage, progress_messages["analyzing"])
+    st.progress(job.progress)
+    st.markdown(f"<div style='text-align: center; font-style: italic;'>{messages[int(job.id[:8], 16) % len(messages)]}</div>", unsafe_allow_html=True)
+
+# Persist the finished result set and put its id in the URL, so a reload or a
+# shared link shows step 4 again without any OpenAI calls
+def save_result_snapshot():
+    try:
+        result_id = get_snapshot_store().save(
+            (st.session_state.selected_interests, st.session_state.current_skills, st.session_state.selected_sdgs),
+            catalog_version,
+            st.session_state.manual_results,
+            st.session_state.result_entry,
+            st.session_state.tenant
+        )
+    except sqlite3.Error as e:
+        logger.warning("result snapshot not saved", exc_info=e)
+        st.warning(f"Could not save your results for later: {str(e)}")
+        return
+    st.session_state.result_id = result_id
+    st.query_params["result"] = result_id
+
+# Load a stored result set into this session and go straight to step 4. The
+# stored matches refer to careers by catalog row and id, so a result set from
+# another catalog version or tenant is not shown as stored: its profile is
+# scored again against this session's catalog, like a fresh step 3.
+def restore_result_snapshot(result_id):
+    try:
+        snapshot = get_snapshot_store().load(result_id)
+    except sqlite3.Error:
+        snapshot = None
+    if snapshot is None:
+        return False
+    
+    st.session_state.selected_interests = snapshot["interests"]
+    st.session_state.current_skills = snapshot["skills"]
+    st.session_state.selected_sdgs = snapshot["sdgs"]
+    # Rows saved before the tenant column was added only have the version to go by
+    same_tenant = snapshot["tenant"] in (None, st.session_state.tenant)
+    if snapshot["catalog_version"] != catalog_version or not same_tenant:
+        logger.info("result snapshot rescored", extra={
+            "result_id": result_id,
+            "catalog_version": snapshot["catalog_version"],
+            "tenant": snapshot["tenant"]
+        })
+        # Not restored again on the next rerun; finishing step 3 saves a new snapshot
+        st.session_state.result_id = result_id
+        rescore_results()
+        return True
+    st.session_state.manual_results = snapshot["manual_results"]
+    st.session_state.results_version = catalog_version
+    
+    entry = snapshot["entry"]
+    key = None
+    if entry and not entry.get("reused"):
+        key = current_profile_key()
+        if entry.get("degraded"):
+            key = f"{key}:{entry['degraded']}"
+    if key is not None and entry["judge_matches"]:
+        # Share the entry with sessions that compute the same profile later
+        result_cache = get_result_cache()
+        if not result_cache.contains(key):
+            result_cache.put(key, catalog_version, entry)
+    st.session_state.result_entry = entry
+    st.session_state.result_key = key
+    st.session_state.judge_enrichment_pending = needs_enrichment(entry)
+    st.session_state.result_set_id = uuid.uuid4().hex
+    st.session_state.result_id = result_id
+    st.session_state.job_id = None
+    st.session_state.job_kind = None
+    reset_more_matches()
+    st.session_state.step = 4
+    return True
+
+# Run step 3 again for the session's profile, against the current catalog
+def rescore_results():
+    discard_speculation()
+    st.session_state.step = 3
+    go_to_next_step()
+
 def restart():
+    discard_speculation()
     st.session_state.step = 1
     st.session_state.selected_interests = []
     st.session_state.current_skills = []
     st.session_state.selected_sdgs = []
-    st.session_state.manual_career_matches = []
-    st.session_state.ai_career_matches = []
-    st.session_state.judge_career_matches = []
+    st.session_state.manual_results = []
+    st.session_state.results_version = None
+    st.session_state.result_entry = None
+    st.session_state.result_key = None
+    st.session_state.judge_enrichment_pending = False
+    st.session_state.result_set_id = None
+    st.session_state.result_id = None
+    st.session_state.job_id = None
+    st.session_state.job_kind = None
+    st.session_state.manual_first = False
+    st.session_state.speculations = 0
+    reset_more_matches()
+    st.query_params.pop("result", None)
     st.session_state.active_tab = "judge"
 
+# A ?result=<id> link (or a reload of the results page) rehydrates step 4 directly
+requested_result = st.query_params.get("result")
+if requested_result and requested_result != st.session_state.result_id:
+    if not restore_result_snapshot(requested_result):
+        st.warning("These results are no longer available. Please make your selections again.")
+        st.query_params.pop("result", None)
+
+# The session's results name careers by id, which a reloaded catalog may give to
+# other careers (or none): score the profile again rather than show them mixed up
+if st.session_state.step == 4 and st.session_state.results_version not in (None, catalog_version):
+    logger.info("results rescored", extra={
+        "catalog_version": catalog_version,
+        "previous_version": st.session_state.results_version
+    })
+    rescore_results()
+
+# Process-wide cache warmer; warms once at deploy and again whenever the catalog is swapped
+@st.cache_resource
+def get_cache_warmer():
+    warmer = CacheWarmer(
+        make_openai_client,
+        get_result_cache(),
+        get_snapshot_store(),
+        PIPELINE_MODE,
+        tenant_prompt_version(TENANT),
+        sdg_names_by_id,
+        TENANT,
+        top_n=WARM_TOP_N,
+        concurrency=WARM_CONCURRENCY,
+        profiles_file=WARM_PROFILES_FILE
+    )
+    # Only the configured tenant is warmed
+    try:
+        manager = get_tenant_catalogs().get(TENANT)
+    except TenantError:
+        return warmer
+    manager.add_listener(lambda old, new: warmer.start(new.catalog))
+    if manager.current() is not None:
+        warmer.start(manager.current().catalog)
+    return warmer
+
+if st.session_state.has_api_key and WARM_TOP_N > 0:
+    get_cache_warmer()
+
 # Sidebar with info about the app
+set_stage("sidebar")
 with st.sidebar:
     st.title("Career Discovery Platform")
     st.write("Find your ideal career path based on your interests, skills, and values.")
@@ -895,41 +1359,59 @@ with st.sidebar:
     # Add a debug section to check CSV loading
     st.markdown("---")
     if st.checkbox("Show CSV Debug Info"):
-        import os
         current_dir = os.getcwd()
-        
         st.write("### CSV File Debug")
-        csv_filename = "lucidus_career_mapping_all_125_corrected.csv"
+        catalog_manager = get_catalog_manager()
+        csv_filename = catalog_manager.csv_path
+        snapshot = catalog_manager.current()
         
-        if os.path.exists(csv_filename):
-            st.success(f"✅ CSV file '{csv_filename}' exists")
+        tenant_catalogs = get_tenant_catalogs()
+        st.write(f"Tenant: {st.session_state.tenant}")
+        loaded = tenant_catalogs.loaded()
+        loaded_mb = sum(size for _, size in loaded) / (1024 * 1024)
+        st.write(f"Tenants loaded: {len(loaded)} ({loaded_mb:.1f} of {CATALOG_MEMORY_MB:.0f} MB, {tenant_catalogs.stats['evictions']} evictions)")
+        reuse_stats = get_similar_index().summary()
+        st.write(f"Approximate reuse: {reuse_stats['hits']} of {reuse_stats['lookups']} lookups ({reuse_stats['hit_rate']:.0%}), {reuse_stats['entries']} profiles indexed")
+        for band, totals in reuse_stats["agreement"].items():
+            st.write(f"- similarity {band:.1f}+: {totals['samples']} compared ({totals['reused']} reused), overlap {totals['overlap']:.0%}, same top career {totals['top1']:.0%}")
+        if PROFILE_RATE > 0:
+            profiler_stats = get_profiler().stats
+            st.write(f"Profiler: {profiler_stats['profiles']} runs sampled, {profiler_stats['written']} written to {PROFILE_DIR}, {profiler_stats['pruned']} pruned")
+        if ANALYTICS:
+            analytics_stats = get_analytics().stats
+            st.write(f"Analytics: {analytics_stats['recorded']} events recorded here, {analytics_stats['applied']} aggregated, {analytics_stats['flushes']} flushes")
+            if analytics_stats["last_error"]:
+                st.error(f"Analytics could not be persisted: {analytics_stats['last_error']}")
+        
+        if snapshot is not None:
+            st.success(f"✅ CSV file '{csv_filename}' loaded")
             
             # Show file size
-            file_size = os.path.getsize(csv_filename)
-            st.write(f"File size: {file_size} bytes")
+            st.write(f"File size: {snapshot.csv_size} bytes")
+            loaded_at = time.strftime("%H:%M:%S", time.localtime(snapshot.loaded_at))
+            st.write(f"Catalog version: {snapshot.version} (loaded at {loaded_at}, {catalog_manager.reload_count} loads)")
+            if catalog_manager.last_error is not None:
+                st.error(f"Latest CSV edit was rejected: {str(catalog_manager.last_error)}")
             
-            # Try to read it
-            try:
-                temp_df = pd.read_csv(csv_filename)
-                st.write(f"Careers in CSV: {len(temp_df)}")
-                st.write(f"Columns: {', '.join(temp_df.columns.tolist())}")
-                
-                # Show first few careers
-                st.write("Sample careers:")
-                for i, career in enumerate(temp_df["career"].head(5).tolist()):
-                    st.write(f"{i+1}. {career}")
-                
-                # Check for specific career
-                search_career = "Conservation Drone Operator"
-                if search_career in temp_df["career"].values:
-                    st.success(f"'{search_career}' found in CSV!")
-                else:
-                    st.error(f"'{search_career}' NOT found in CSV.")
-                
-            except Exception as e:
-                st.error(f"Error reading CSV: {str(e)}")
+            # Use what was recorded when the catalog was compiled instead of re-reading the CSV
+            snapshot_catalog = snapshot.catalog
+            st.write(f"Careers in CSV: {snapshot_catalog.meta.get('rows', len(snapshot_catalog))}")
+            if snapshot_catalog.meta.get("columns"):
+                st.write(f"Columns: {', '.join(snapshot_catalog.meta['columns'])}")
+            
+            # Show first few careers
+            st.write("Sample careers:")
+            for i in range(min(5, len(snapshot_catalog))):
+                st.write(f"{i+1}. {snapshot_catalog.title(i)}")
+            
+            # Check for specific career
+            search_career = "Conservation Drone Operator"
+            if snapshot_catalog.index_of_title(search_career) is not None:
+                st.success(f"'{search_career}' found in CSV!")
+            else:
+                st.error(f"'{search_career}' NOT found in CSV.")
         else:
-            st.error(f"❌ CSV file '{csv_filename}' not found")
+            st.error(f"❌ CSV file '{csv_filename}' not loaded: {str(catalog_manager.last_error)}")
             
             # List all files in directory
             files = os.listdir(current_dir)
@@ -950,6 +1432,7 @@ with st.sidebar:
                 st.write(f"... and {len(files)-10} more files")
 
 # Header
+set_stage("header")
 st.title("Career Discovery Platform")
 st.write("Find careers that match your interests, skills, and values using our expert AI Career Counselor")
 
@@ -986,54 +1469,178 @@ with col4:
 
 st.markdown("<hr>", unsafe_allow_html=True)
 
+# Steps 1-3 render their selection grids, summaries and navigation as fragments,
+# so a toggle only re-executes the fragment it belongs to instead of the whole
+# script. The toggle handlers run as on_click callbacks, so the fragment shows
+# the new state in a single pass; navigation still reruns the full app.
+@st.fragment
+def interest_selection():
+    for category, interests in interest_categories.items():
+        with st.expander(f"{category}"):
+            col1, col2 = st.columns(2)
+
+            half_length = len(interests) // 2 + len(interests) % 2
+
+            for i, interest in enumerate(interests[:half_length]):
+                with col1:
+                    selected = interest in st.session_state.selected_interests
+                    st.button(
+                        f"{'✓ ' if selected else ''}{interest}",
+                        key=f"int_{interest}",
+                        type="primary" if selected else "secondary",
+                        use_container_width=True,
+                        on_click=handle_interest_select,
+                        args=(interest,)
+                    )
+
+            for i, interest in enumerate(interests[half_length:]):
+                with col2:
+                    selected = interest in st.session_state.selected_interests
+                    st.button(
+                        f"{'✓ ' if selected else ''}{interest}",
+                        key=f"int_{interest}",
+                        type="primary" if selected else "secondary",
+                        use_container_width=True,
+                        on_click=handle_interest_select,
+                        args=(interest,)
+                    )
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.write(f"Selected: {len(st.session_state.selected_interests)}/3")
+        if st.session_state.selected_interests:
+            st.write("Your selections:")
+            for interest in st.session_state.selected_interests:
+                st.markdown(f"- {interest}")
+    with col2:
+        if st.button("Next: Skills", disabled=len(st.session_state.selected_interests) != 3, type="primary", use_container_width=True):
+            go_to_next_step()
+            st.rerun()
+
+    render_live_preview()
+
+
+@st.fragment
+def skill_selection():
+    # Current skills selection
+    st.markdown("### Select 3 skills you're good at:")
+    for category, skills in skill_categories.items():
+        with st.expander(f"{category}"):
+            col1, col2 = st.columns(2)
+
+            half_length = len(skills) // 2 + len(skills) % 2
+
+            for i, skill in enumerate(skills[:half_length]):
+                with col1:
+                    selected = skill in st.session_state.current_skills
+                    st.button(
+                        f"{'✓ ' if selected else ''}{skill}",
+                        key=f"current_{skill}",
+                        type="primary" if selected else "secondary",
+                        use_container_width=True,
+                        on_click=handle_current_skill_select,
+                        args=(skill,)
+                    )
+
+            for i, skill in enumerate(skills[half_length:]):
+                with col2:
+                    selected = skill in st.session_state.current_skills
+                    st.button(
+                        f"{'✓ ' if selected else ''}{skill}",
+                        key=f"current_{skill}",
+                        type="primary" if selected else "secondary",
+                        use_container_width=True,
+                        on_click=handle_current_skill_select,
+                        args=(skill,)
+                    )
+
+    st.write(f"Selected: {len(st.session_state.current_skills)}/3")
+    if st.session_state.current_skills:
+        st.write("Your current skills:")
+        for skill in st.session_state.current_skills:
+            st.markdown(f"- {skill}")
+
+    render_live_preview()
+
+    st.markdown("---")
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        if st.button("Back", use_container_width=True):
+            st.session_state.step = 1
+            st.rerun()
+    with col2:
+        if st.button(
+            "Next: Values",
+            disabled=len(st.session_state.current_skills) != 3,
+            type="primary",
+            use_container_width=True
+        ):
+            go_to_next_step()
+            st.rerun()
+
+
+@st.fragment
+def sdg_selection():
+    # Create 3 columns and divide SDGs among them
+    col1, col2, col3 = st.columns(3)
+    columns = [col1, col2, col3]
+
+    sdgs_per_column = len(sdgs) // 3 + (1 if len(sdgs) % 3 > 0 else 0)
+
+    for i, sdg in enumerate(sdgs):
+        col_index = i // sdgs_per_column
+        with columns[col_index]:
+            selected = sdg["id"] in st.session_state.selected_sdgs
+            st.button(
+                f"{sdg['id']}. {'✓ ' if selected else ''}{sdg['name']}",
+                key=f"sdg_{sdg['id']}",
+                type="primary" if selected else "secondary",
+                use_container_width=True,
+                on_click=handle_sdg_select,
+                args=(sdg["id"],)
+            )
+
+    st.markdown("---")
+    st.write(f"Selected: {len(st.session_state.selected_sdgs)}/3")
+    if st.session_state.selected_sdgs:
+        st.write("Your values:")
+        for sdg_id in st.session_state.selected_sdgs:
+            st.markdown(f"- SDG {sdg_id}: {sdg_names_by_id[sdg_id]}")
+
+    render_live_preview()
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        if st.button("Back", use_container_width=True):
+            discard_speculation()
+            st.session_state.step = 2
+            st.rerun()
+    with col2:
+        if st.session_state.has_api_key:
+            button_text = "Find Your Ideal Careers"
+        else:
+            button_text = "Generate Career Matches"
+
+        if st.button(
+            button_text,
+            disabled=len(st.session_state.selected_sdgs) == 0,
+            type="primary",
+            use_container_width=True
+        ):
+            go_to_next_step()
+            st.rerun()
+
+
+set_stage(f"step{st.session_state.step}")
+
 # Step 1: Interests
 if st.session_state.step == 1:
     with st.container():
         st.markdown('<div class="step-container">', unsafe_allow_html=True)
         st.markdown('<h2 class="step-header" style="background-color: #e3f2fd; color: #1565c0;">Step 1: Select 3 Interests</h2>', unsafe_allow_html=True)
         st.write("Choose three subjects that you enjoy the most in school.")
-        
-        for category, interests in interest_categories.items():
-            with st.expander(f"{category}"):
-                col1, col2 = st.columns(2)
-                
-                half_length = len(interests) // 2 + len(interests) % 2
-                
-                for i, interest in enumerate(interests[:half_length]):
-                    with col1:
-                        selected = interest in st.session_state.selected_interests
-                        if st.button(
-                            f"{'✓ ' if selected else ''}{interest}",
-                            key=f"int_{interest}",
-                            type="primary" if selected else "secondary",
-                            use_container_width=True
-                        ):
-                            handle_interest_select(interest)
-                            st.rerun()
-                
-                for i, interest in enumerate(interests[half_length:]):
-                    with col2:
-                        selected = interest in st.session_state.selected_interests
-                        if st.button(
-                            f"{'✓ ' if selected else ''}{interest}",
-                            key=f"int_{interest}",
-                            type="primary" if selected else "secondary",
-                            use_container_width=True
-                        ):
-                            handle_interest_select(interest)
-                            st.rerun()
-        
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            st.write(f"Selected: {len(st.session_state.selected_interests)}/3")
-            if st.session_state.selected_interests:
-                st.write("Your selections:")
-                for interest in st.session_state.selected_interests:
-                    st.markdown(f"- {interest}")
-        with col2:
-            if st.button("Next: Skills", disabled=len(st.session_state.selected_interests) != 3, type="primary", use_container_width=True):
-                go_to_next_step()
-                st.rerun()
+        interest_selection()
         st.markdown('</div>', unsafe_allow_html=True)
 
 # Step 2: Skills
@@ -1041,61 +1648,7 @@ elif st.session_state.step == 2:
     with st.container():
         st.markdown('<div class="step-container">', unsafe_allow_html=True)
         st.markdown('<h2 class="step-header" style="background-color: #e8f5e9; color: #2e7d32;">Step 2: Select Your Skills</h2>', unsafe_allow_html=True)
-        
-        # Current skills selection
-        st.markdown("### Select 3 skills you're good at:")
-        for category, skills in skill_categories.items():
-            with st.expander(f"{category}"):
-                col1, col2 = st.columns(2)
-                
-                half_length = len(skills) // 2 + len(skills) % 2
-                
-                for i, skill in enumerate(skills[:half_length]):
-                    with col1:
-                        selected = skill in st.session_state.current_skills
-                        if st.button(
-                            f"{'✓ ' if selected else ''}{skill}",
-                            key=f"current_{skill}",
-                            type="primary" if selected else "secondary",
-                            use_container_width=True
-                        ):
-                            handle_current_skill_select(skill)
-                            st.rerun()
-                
-                for i, skill in enumerate(skills[half_length:]):
-                    with col2:
-                        selected = skill in st.session_state.current_skills
-                        if st.button(
-                            f"{'✓ ' if selected else ''}{skill}",
-                            key=f"current_{skill}",
-                            type="primary" if selected else "secondary",
-                            use_container_width=True
-                        ):
-                            handle_current_skill_select(skill)
-                            st.rerun()
-        
-        st.write(f"Selected: {len(st.session_state.current_skills)}/3")
-        if st.session_state.current_skills:
-            st.write("Your current skills:")
-            for skill in st.session_state.current_skills:
-                st.markdown(f"- {skill}")
-        
-        st.markdown("---")
-          
-        col1, col2 = st.columns([1, 3])
-        with col1:
-            if st.button("Back", use_container_width=True):
-                st.session_state.step = 1
-                st.rerun()
-        with col2:
-            if st.button(
-                "Next: Values",
-                disabled=len(st.session_state.current_skills) != 3,
-                type="primary",
-                use_container_width=True
-            ):
-                go_to_next_step()
-                st.rerun()
+        skill_selection()
         st.markdown('</div>', unsafe_allow_html=True)
 
 # Step 3: SDG Values
@@ -1104,53 +1657,7 @@ elif st.session_state.step == 3:
         st.markdown('<div class="step-container">', unsafe_allow_html=True)
         st.markdown('<h2 class="step-header" style="background-color: #ede7f6; color: #5e35b1;">Step 3: Select Your Values</h2>', unsafe_allow_html=True)
         st.write("Choose up to 3 UN Sustainable Development Goals that you value most.")
-        
-        # Create 3 columns and divide SDGs among them
-        col1, col2, col3 = st.columns(3)
-        columns = [col1, col2, col3]
-        
-        sdgs_per_column = len(sdgs) // 3 + (1 if len(sdgs) % 3 > 0 else 0)
-        
-        for i, sdg in enumerate(sdgs):
-            col_index = i // sdgs_per_column
-            with columns[col_index]:
-                selected = sdg["id"] in st.session_state.selected_sdgs
-                if st.button(
-                    f"{sdg['id']}. {'✓ ' if selected else ''}{sdg['name']}",
-                    key=f"sdg_{sdg['id']}",
-                    type="primary" if selected else "secondary",
-                    use_container_width=True
-                ):
-                    handle_sdg_select(sdg["id"])
-                    st.rerun()
-        
-        st.markdown("---")
-        st.write(f"Selected: {len(st.session_state.selected_sdgs)}/3")
-        if st.session_state.selected_sdgs:
-            st.write("Your values:")
-            sdg_names = get_sdg_names(st.session_state.selected_sdgs)
-            for i, name in enumerate(sdg_names):
-                st.markdown(f"- SDG {st.session_state.selected_sdgs[i]}: {name}")
-        
-        col1, col2 = st.columns([1, 3])
-        with col1:
-            if st.button("Back", use_container_width=True):
-                st.session_state.step = 2
-                st.rerun()
-        with col2:
-            if st.session_state.has_api_key:
-                button_text = "Find Your Ideal Careers"
-            else:
-                button_text = "Generate Career Matches"
-                
-            if st.button(
-                button_text,
-                disabled=len(st.session_state.selected_sdgs) == 0,
-                type="primary",
-                use_container_width=True
-            ):
-                go_to_next_step()
-                st.rerun()
+        sdg_selection()
         st.markdown('</div>', unsafe_allow_html=True)
 
 # Step 4: Results - Only show AI Judge results
@@ -1159,31 +1666,41 @@ elif st.session_state.step == 4:
         st.markdown('<div class="step-container">', unsafe_allow_html=True)
         st.markdown('<h2 class="step-header" style="background-color: #e1f5fe; color: #0277bd;">Your Ideal Career Matches</h2>', unsafe_allow_html=True)
         
+        # Fusion mode: start the job writing the AI Judge explanations, once per result set
+        if st.session_state.judge_enrichment_pending and st.session_state.job_id is None:
+            st.session_state.judge_enrichment_pending = False
+            start_job("explanations", submit_enrichment_job(st.session_state.result_key))
+        # Explanations for the "Show more matches" pages the student has opened
+        if st.session_state.pending_pages and st.session_state.job_id is None and get_judge_matches():
+            start_job("page", submit_page_job(st.session_state.pending_pages.pop(0)))
+        
+        # Notices from the AI pipeline, e.g. a failed OpenAI request
+        if st.session_state.result_entry and st.session_state.job_kind != "matching":
+            for level, text in st.session_state.result_entry.get("messages", []):
+                if level == "error":
+                    st.error(text)
+                else:
+                    st.warning(text)
+        
         # Only show AI Judge results if available
-        if st.session_state.has_api_key and st.session_state.judge_career_matches:
+        judge_matches = get_judge_matches()
+        manual_matches = [] if st.session_state.has_api_key and judge_matches else get_manual_matches()
+        if st.session_state.job_kind == "matching" and not st.session_state.manual_first:
+            # The AI pipeline is still running in the background
+            st.markdown("### Finding your ideal career matches...")
+            job_status()
+        elif st.session_state.has_api_key and judge_matches:
             st.markdown("### AI Career Counselor Recommendations")
             st.write("Based on your unique profile, our AI Career Counselor has identified these ideal career matches for you.")
             
             # Display top match with special emphasis
-            top_match = st.session_state.judge_career_matches[0]
+            top_match = judge_matches[0]
+            top_html = get_card_html("judge", 0, top_match)
             
             st.markdown("## 🏆 Top Career Match")
             
             # Create the main card with enhanced info
-            st.markdown(f"""
-            <div class="career-card top-match">
-                <div class="career-header">
-                    <h3 style="margin: 0;">{top_match['title']} <span style="float:right; font-size:0.9rem;">Match Score: {top_match['match_score']}%</span></h3>
-                </div>
-                <div class="career-content">
-                    <p>{top_match['description']}</p>
-                    <p><strong>Expert Analysis:</strong> {top_match['explanation']}</p>
-                    <div class="verdict-card">
-                        <p><strong>Why This Stands Out:</strong> {top_match['analysis']}</p>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(top_html["card"], unsafe_allow_html=True)
             
             # Display matching elements
             col1, col2 = st.columns(2)
@@ -1191,81 +1708,54 @@ elif st.session_state.step == 4:
             with col1:
                 # Display interests
                 st.markdown("<strong style='color: #1565c0;'>Matching Interests:</strong>", unsafe_allow_html=True)
-                interests_html = " ".join([f"<span class='interest-tag'>{interest}</span>" 
-                                       for interest in top_match['matching_interests']])
-                st.markdown(f"<div>{interests_html}</div>", unsafe_allow_html=True)
+                st.markdown(top_html["interests"], unsafe_allow_html=True)
                 
                 # Current skills
                 st.markdown("<strong style='color: #2e7d32;'>Current Skills:</strong>", unsafe_allow_html=True)
-                current_skills_html = " ".join([f"<span class='skill-tag'>{skill}</span>" 
-                                             for skill in top_match['matching_skills']['current']])
-                st.markdown(f"<div>{current_skills_html}</div>", unsafe_allow_html=True)
+                st.markdown(top_html["skills"], unsafe_allow_html=True)
             
             with col2:
                 # Display SDGs
                 st.markdown("<strong style='color: #5e35b1;'>Matching SDGs:</strong>", unsafe_allow_html=True)
-                sdgs_html = " ".join([f"<span class='sdg-tag'>{sdg}</span>" 
-                                   for sdg in top_match['matching_sdgs']])
-                st.markdown(f"<div>{sdgs_html}</div>", unsafe_allow_html=True)
+                st.markdown(top_html["sdgs"], unsafe_allow_html=True)
                 
           
             # Other matches
             st.markdown("## Other Strong Career Matches")
             
             # Create rows with 2 cards per row
-            other_matches = st.session_state.judge_career_matches[1:]
+            other_matches = judge_matches[1:]
             
             for i in range(0, len(other_matches), 2):
                 cols = st.columns(2)
                 for j in range(2):
                     if i + j < len(other_matches):
-                        career = other_matches[i + j]
+                        card_html = get_card_html("judge", i + j + 1, other_matches[i + j])
                         with cols[j]:
                             # Display title and description with match score
-                            st.markdown(f"""
-                            <div style="border: 1px solid #ddd; border-radius: 0.5rem; margin-bottom: 1rem; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
-                                <div style="background-color: #1976d2; color: white; padding: 0.7rem; border-radius: 0.5rem 0.5rem 0 0;">
-                                    <h4 style="margin: 0; font-size: 1.1rem;">{career['title']} <span style="float:right; font-size:0.8rem;">Match: {career['match_score']}%</span></h4>
-                                </div>
-                                <div style="padding: 0.7rem;">
-                                    <p style="font-size: 0.9rem;">{career['description']}</p>
-                                    <p style="font-size: 0.9rem;"><strong>Why This Fits You:</strong> {career['explanation']}</p>
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
+                            st.markdown(card_html["card"], unsafe_allow_html=True)
                             
                             # Display tags for interests, skills, and SDGs
-                            st.markdown(f"""
-                            <div style="display: flex; flex-wrap: wrap; gap: 0.5rem; margin-bottom: 1rem;">
-                                <span class="interest-tag">{len(career['matching_interests'])} Interests</span>
-                                <span class="skill-tag">{len(career['matching_skills']['current'])} Skills</span>
-                                <span class="sdg-tag">{len(career['matching_sdgs'])} SDGs</span>
-                            </div>
-                            """, unsafe_allow_html=True)
+                            st.markdown(card_html["counts"], unsafe_allow_html=True)
+            
+            render_more_matches("judge")
         
         # If we don't have AI Judge results but have manual results, show those instead
-        elif st.session_state.manual_career_matches:
+        elif manual_matches:
             st.markdown("### Career Match Results")
             st.write("Based on your selections, we've found these career matches for you.")
+            if st.session_state.job_kind == "matching":
+                # Manual matches first; the AI Career Counselor's picks replace them when ready
+                st.info("Our AI Career Counselor is still refining these matches. They will update here automatically.")
+                job_status()
             
             # Display top match
-            top_match = st.session_state.manual_career_matches[0]
+            top_match = manual_matches[0]
+            top_html = get_card_html("manual", 0, top_match)
             st.markdown("## 🏆 Top Career Match")
             
             # Create card for top match
-            st.markdown(
-                f"""
-                <div style="border: 2px solid #1976d2; border-radius: 0.5rem; margin-bottom: 2rem;">
-                    <div style="background-color: #1976d2; color: white; padding: 1rem; border-radius: 0.5rem 0.5rem 0 0;">
-                        <h3 style="margin: 0;">{top_match['title']} <span style="float:right; font-size:0.9rem;">Match Score: {top_match['match_score']}%</span></h3>
-                    </div>
-                    <div style="padding: 1rem;">
-                        <p>{top_match['description']}</p>
-                    </div>
-                </div>
-                """, 
-                unsafe_allow_html=True
-            )
+            st.markdown(top_html["card"], unsafe_allow_html=True)
             
             # Display matching elements for top match
             col1, col2 = st.columns(2)
@@ -1273,48 +1763,35 @@ elif st.session_state.step == 4:
             with col1:
                 # Display interests
                 st.markdown("<strong style='color: #1565c0;'>Matching Interests:</strong>", unsafe_allow_html=True)
-                interests_html = " ".join([f"<span class='interest-tag'>{interest}</span>" 
-                                       for interest in top_match['match_details']['interest_matches']])
-                st.markdown(f"<div>{interests_html}</div>", unsafe_allow_html=True)
+                st.markdown(top_html["interests"], unsafe_allow_html=True)
                 
                 # Display skills
                 st.markdown("<strong style='color: #2e7d32;'>Matching Skills:</strong>", unsafe_allow_html=True)
                 
                 # Current skills
-                current_skills_html = " ".join([f"<span class='skill-tag'>{skill}</span>" 
-                                             for skill in top_match['match_details']['skill_matches']['current']])
-                st.markdown(f"<div>{current_skills_html}</div>", unsafe_allow_html=True)
+                st.markdown(top_html["skills"], unsafe_allow_html=True)
                 
             with col2:
                 # Display SDGs
                 st.markdown("<strong style='color: #5e35b1;'>Matching SDGs:</strong>", unsafe_allow_html=True)
-                sdgs_html = " ".join([f"<span class='sdg-tag'>SDG {sdg_id}: {[s['name'] for s in sdgs if s['id'] == sdg_id][0]}</span>" 
-                                   for sdg_id in top_match['match_details']['sdg_matches']])
-                st.markdown(f"<div>{sdgs_html}</div>", unsafe_allow_html=True)
+                st.markdown(top_html["sdgs"], unsafe_allow_html=True)
             
             # Display other matches in a grid
             st.markdown("## Other Matches")
             
             # Create rows with 2 cards per row
-            other_matches = st.session_state.manual_career_matches[1:]
+            other_matches = manual_matches[1:]
             
             for i in range(0, len(other_matches), 2):
                 cols = st.columns(2)
                 for j in range(2):
                     if i + j < len(other_matches):
-                        career = other_matches[i + j]
+                        card_html = get_card_html("manual", i + j + 1, other_matches[i + j])
                         with cols[j]:
                             # Display title and description with match score
-                            st.markdown(f"""
-                            <div style="border: 1px solid #ddd; border-radius: 0.5rem; margin-bottom: 1rem; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
-                                <div style="background-color: #1976d2; color: white; padding: 0.7rem; border-radius: 0.5rem 0.5rem 0 0;">
-                                    <h4 style="margin: 0; font-size: 1.1rem;">{career['title']} <span style="float:right; font-size:0.8rem;">Match: {career['match_score']}%</span></h4>
-                                </div>
-                                <div style="padding: 0.7rem;">
-                                    <p style="font-size: 0.9rem;">{career['description']}</p>
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
+                            st.markdown(card_html["card"], unsafe_allow_html=True)
+            
+            render_more_matches("manual")
         else:
             if st.session_state.has_api_key:
                 st.warning("No career matches found. Please try again with different selections.")
@@ -1326,7 +1803,15 @@ elif st.session_state.step == 4:
             st.rerun()
                 
         st.markdown('</div>', unsafe_allow_html=True)
+        
+        # Fusion mode: the cards above are already on screen while the AI Judge writes
+        # its explanations in the background
+        if st.session_state.job_kind in ("explanations", "page"):
+            job_status()
 
 # Footer
 st.markdown("---")
 st.markdown("Career Discovery Platform &copy; 2025 | Helping you find your ideal career path")
+
+if rerun_profile is not None:
+    rerun_profile.stop()
@@ -0,0 +1,145 @@
+# Benchmark of the pipeline modes against the OpenAI API: end-to-end latency of
+# each mode and how much the final lists agree with the two-call flow.
+#
+#   OPENAI_API_KEY=... python bench_pipeline_modes.py --profiles 20 > bench_output.txt
+import argparse
+import json
+import random
+import statistics
+import time
+
+import pandas as pd
+from openai import OpenAI
+
+from catalog import CSV_FILENAME, INTEREST_CATEGORIES, SDGS, SKILL_CATEGORIES, CompactCatalog, parse_career_rows
+from fusion import fuse_career_matches
+from llm import (
+    MAX_CAREERS_PER_REQUEST,
+    ai_career_matches,
+    combined_career_matches,
+    judge_career_matches,
+    shortlist_candidates
+)
+from matching import match_careers_compact, score_profile
+
+MODES = ["two_call", "combined", "fusion"]
+
+
+# Random profiles drawn from the same lists the app offers
+def random_profiles(count, seed):
+    rng = random.Random(seed)
+    interests = [i for items in INTEREST_CATEGORIES.values() for i in items]
+    skills = [s for items in SKILL_CATEGORIES.values() for s in items]
+    sdg_ids = [sdg["id"] for sdg in SDGS]
+    return [
+        (rng.sample(interests, 3), rng.sample(skills, 3), rng.sample(sdg_ids, rng.randint(1, 3)))
+        for _ in range(count)
+    ]
+
+
+def load_profiles(path):
+    profiles = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                profiles.append((item["interests"], item["skills"], item["sdgs"]))
+    return profiles
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def run_mode(mode, client, catalog, sdg_names, profile):
+    interests, skills, sdg_ids = profile
+    manual_matches = match_careers_compact(catalog, interests, skills, sdg_ids)
+    stages = {}
+
+    start = time.perf_counter()
+    if mode == "combined":
+        shortlist = shortlist_candidates(catalog, manual_matches, score_profile(catalog, interests, skills, sdg_ids))
+        final = combined_career_matches(client, manual_matches, shortlist, interests, skills, sdg_ids, sdg_names)
+        stages["combined"] = time.perf_counter() - start
+    else:
+        career_data = catalog.id_titles(MAX_CAREERS_PER_REQUEST)
+        ai_matches = ai_career_matches(client, interests, skills, sdg_ids, sdg_names, career_data)
+        stages["ai"] = time.perf_counter() - start
+        judge_start = time.perf_counter()
+        if mode == "two_call":
+            final = judge_career_matches(client, manual_matches, ai_matches, interests, skills, sdg_ids, sdg_names)
+            stages["judge"] = time.perf_counter() - judge_start
+        else:
+            final = fuse_career_matches(manual_matches, ai_matches, catalog, interests, skills, sdg_ids, sdg_names)
+            stages["fusion"] = time.perf_counter() - judge_start
+    total = time.perf_counter() - start
+    return [m.get("id") for m in final], total, stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare latency and agreement of the pipeline modes")
+    parser.add_argument("--profiles", type=int, default=10, help="number of random profiles")
+    parser.add_argument("--profiles-file", help="JSON lines file with interests/skills/sdgs per line")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma separated modes to run")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--csv", default=CSV_FILENAME)
+    args = parser.parse_args()
+
+    modes = [m for m in args.modes.split(",") if m]
+    catalog = CompactCatalog.from_records(parse_career_rows(pd.read_csv(args.csv)))
+    sdg_names = {sdg["id"]: sdg["name"] for sdg in SDGS}
+    profiles = load_profiles(args.profiles_file) if args.profiles_file else random_profiles(args.profiles, args.seed)
+    client = OpenAI()
+
+    latencies = {mode: [] for mode in modes}
+    stage_latencies = {mode: {} for mode in modes}
+    errors = {mode: 0 for mode in modes}
+    finals = []
+
+    for index, profile in enumerate(profiles):
+        # Alternate the order so neither mode always runs on a warm connection
+        order = modes if index % 2 == 0 else list(reversed(modes))
+        results = {}
+        for mode in order:
+            try:
+                ids, total, stages = run_mode(mode, client, catalog, sdg_names, profile)
+            except Exception as e:
+                errors[mode] += 1
+                print(f"profile {index + 1} {mode}: error {e}")
+                continue
+            results[mode] = ids
+            latencies[mode].append(total)
+            for stage, seconds in stages.items():
+                stage_latencies[mode].setdefault(stage, []).append(seconds)
+            print(f"profile {index + 1} {mode}: {total:.2f}s {ids}")
+        finals.append(results)
+
+    print()
+    print(f"{'mode':<10} {'runs':>5} {'errors':>6} {'mean':>7} {'p50':>7} {'p95':>7}  stages (p50)")
+    for mode in modes:
+        values = latencies[mode]
+        stages = ", ".join(f"{stage} {percentile(v, 50):.2f}s" for stage, v in stage_latencies[mode].items())
+        mean = statistics.mean(values) if values else 0.0
+        print(f"{mode:<10} {len(values):>5} {errors[mode]:>6} {mean:>6.2f}s {percentile(values, 50):>6.2f}s {percentile(values, 95):>6.2f}s  {stages}")
+
+    # Agreement of every other mode with the existing two-call flow
+    if "two_call" in modes:
+        print()
+        print(f"{'mode':<10} {'pairs':>5} {'overlap@6':>10} {'top-1':>7}")
+        for mode in modes:
+            if mode == "two_call":
+                continue
+            pairs = [r for r in finals if "two_call" in r and mode in r and r["two_call"] and r[mode]]
+            if not pairs:
+                continue
+            overlap = statistics.mean(len(set(r["two_call"]) & set(r[mode])) / len(r["two_call"]) for r in pairs)
+            top1 = statistics.mean(1.0 if r["two_call"][0] == r[mode][0] else 0.0 for r in pairs)
+            print(f"{mode:<10} {len(pairs):>5} {overlap:>10.2f} {top1:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# HTML for the step 4 result cards and tag chips. Every function here is pure,
+# so the app can build a card once per result set and reuse the strings on
+# every rerun.
+from catalog import INTEREST_CATEGORIES, SDG_BADGES, SKILL_CATEGORIES
+
+# Chip HTML for every tag the app offers, built once
+INTEREST_CHIPS = {
+    interest: f"<span class='interest-tag'>{interest}</span>"
+    for interests in INTEREST_CATEGORIES.values() for interest in interests
+}
+SKILL_CHIPS = {
+    skill: f"<span class='skill-tag'>{skill}</span>"
+    for skills in SKILL_CATEGORIES.values() for skill in skills
+}
+
+
+# One row of chips; tags outside the table (e.g. written by the AI) are rendered on the fly
+def tag_chips(tags, table, css_class):
+    return " ".join([table.get(tag) or f"<span class='{css_class}'>{tag}</span>" for tag in tags])
+
+
+def sdg_chips(sdg_ids):
+    return " ".join([SDG_BADGES.get(sdg_id) or f"<span class='sdg-tag'>SDG {sdg_id}</span>" for sdg_id in sdg_ids])
+
+
+# Card for an AI Judge (or fused) match
+def judge_card_html(match, top=False):
+    if top:
+        return {
+            "card": f"""
+            <div class="career-card top-match">
+                <div class="career-header">
+                    <h3 style="margin: 0;">{match['title']} <span style="float:right; font-size:0.9rem;">Match Score: {match['match_score']}%</span></h3>
+                </div>
+                <div class="career-content">
+                    <p>{match['description']}</p>
+                    <p><strong>Expert Analysis:</strong> {match['explanation']}</p>
+                    <div class="verdict-card">
+                        <p><strong>Why This Stands Out:</strong> {match['analysis']}</p>
+                    </div>
+                </div>
+            </div>
+            """,
+            "interests": f"<div>{tag_chips(match['matching_interests'], INTEREST_CHIPS, 'interest-tag')}</div>",
+            "skills": f"<div>{tag_chips(match['matching_skills']['current'], SKILL_CHIPS, 'skill-tag')}</div>",
+            # The judge already writes these as "SDG n: Name"
+            "sdgs": f"<div>{tag_chips(match['matching_sdgs'], {}, 'sdg-tag')}</div>"
+        }
+
+    return {
+        "card": f"""
+        <div style="border: 1px solid #ddd; border-radius: 0.5rem; margin-bottom: 1rem; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
+            <div style="background-color: #1976d2; color: white; padding: 0.7rem; border-radius: 0.5rem 0.5rem 0 0;">
+                <h4 style="margin: 0; font-size: 1.1rem;">{match['title']} <span style="float:right; font-size:0.8rem;">Match: {match['match_score']}%</span></h4>
+            </div>
+            <div style="padding: 0.7rem;">
+                <p style="font-size: 0.9rem;">{match['description']}</p>
+                <p style="font-size: 0.9rem;"><strong>Why This Fits You:</strong> {match['explanation']}</p>
+            </div>
+        </div>
+        """,
+        "counts": f"""
+        <div style="display: flex; flex-wrap: wrap; gap: 0.5rem; margin-bottom: 1rem;">
+            <span class="interest-tag">{len(match['matching_interests'])} Interests</span>
+            <span class="skill-tag">{len(match['matching_skills']['current'])} Skills</span>
+            <span class="sdg-tag">{len(match['matching_sdgs'])} SDGs</span>
+        </div>
+        """
+    }
+
+
+# Card for a manual match
+def manual_card_html(match, top=False):
+    if top:
+        details = match["match_details"]
+        return {
+            "card": f"""
+            <div style="border: 2px solid #1976d2; border-radius: 0.5rem; margin-bottom: 2rem;">
+                <div style="background-color: #1976d2; color: white; padding: 1rem; border-radius: 0.5rem 0.5rem 0 0;">
+                    <h3 style="margin: 0;">{match['title']} <span style="float:right; font-size:0.9rem;">Match Score: {match['match_score']}%</span></h3>
+                </div>
+                <div style="padding: 1rem;">
+                    <p>{match['description']}</p>
+                </div>
+            </div>
+            """,
+            "interests": f"<div>{tag_chips(details['interest_matches'], INTEREST_CHIPS, 'interest-tag')}</div>",
+            "skills": f"<div>{tag_chips(details['skill_matches']['current'], SKILL_CHIPS, 'skill-tag')}</div>",
+            "sdgs": f"<div>{sdg_chips(details['sdg_matches'])}</div>"
+        }
+
+    return {
+        "card": f"""
+        <div style="border: 1px solid #ddd; border-radius: 0.5rem; margin-bottom: 1rem; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
+            <div style="background-color: #1976d2; color: white; padding: 0.7rem; border-radius: 0.5rem 0.5rem 0 0;">
+                <h4 style="margin: 0; font-size: 1.1rem;">{match['title']} <span style="float:right; font-size:0.8rem;">Match: {match['match_score']}%</span></h4>
+            </div>
+            <div style="padding: 0.7rem;">
+                <p style="font-size: 0.9rem;">{match['description']}</p>
+            </div>
+        </div>
+        """
+    }
@@ -0,0 +1,525 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+CSV_FILENAME = "lucidus_career_mapping_all_125_corrected.csv"
+REQUIRED_COLUMNS = ["career", "subjects", "skill_tags", "sdg_tags"]
+
+
+# Convert the catalog DataFrame to career records
+def parse_career_rows(df):
+    careers = []
+    for _, row in df.iterrows():
+        career_title = row["career"]
+
+        # Use career title as description if none provided
+        description = f"A professional role in {career_title}."
+
+        # Parse interests (subjects)
+        interests = []
+        if pd.notna(row["subjects"]) and row["subjects"]:
+            interests = [s.strip() for s in row["subjects"].split(",")]
+
+        # Parse skills
+        skills = []
+        if pd.notna(row["skill_tags"]) and row["skill_tags"]:
+            skills = [s.strip() for s in row["skill_tags"].split(",")]
+
+        # Parse SDGs
+        sdgs = []
+        if pd.notna(row["sdg_tags"]) and row["sdg_tags"]:
+            # Try to extract numbers from the SDG tags
+            for sdg_tag in row["sdg_tags"].split(","):
+                sdg_tag = sdg_tag.strip()
+                # Extract digits, handling formats like "SDG 1" or just "1"
+                digits = ''.join(c for c in sdg_tag if c.isdigit())
+                if digits and int(digits) >= 1 and int(digits) <= 17:
+                    sdgs.append(int(digits))
+
+        career = {
+            "id": len(careers) + 1,  # Generate sequential IDs
+            "title": career_title,
+            "description": description,
+            "interests": interests,
+            "skills": skills,
+            "sdgs": sdgs
+        }
+        careers.append(career)
+    return careers
+
+
+# Interests data structured by category
+INTEREST_CATEGORIES = {
+    "Humanities & Social Sciences": [
+        "English Literature / Language Arts",
+        "World Languages (e.g., French, Spanish, Mandarin, Hindi)",
+        "History",
+        "Geography",
+        "Global Politics / Civics",
+        "Philosophy",
+        "Psychology",
+        "Social & Cultural Anthropology",
+        "Economics",
+        "Business Studies / Entrepreneurship",
+        "Ethics / TOK (Theory of Knowledge)"
+    ],
+    "Sciences": [
+        "Biology",
+        "Chemistry",
+        "Physics",
+        "Environmental Systems & Societies / Environmental Science",
+        "General Science / Integrated Science",
+        "Sports, Exercise & Health Science",
+        "Food Science / Food Technology"
+    ],
+    "Math & Technology": [
+        "Mathematics",
+        "Computer Science / Programming",
+        "Design & Technology / Engineering"
+    ],
+    "Arts & Creativity": [
+        "Visual Arts (drawing, painting, sculpture)",
+        "Graphic Design / Digital Media",
+        "Film / Media Studies",
+        "Drama / Theatre",
+        "Music",
+        "Dance"
+    ],
+    "Applied & Vocational": [
+        "Architecture / Interior Design",
+        "Product Design / Industrial Design",
+        "Health Science / Pre-Med",
+        "Agriculture / Sustainable Farming",
+        "Hospitality / Culinary Arts",
+        "Engineering (General or Applied)"
+    ],
+    "Lifestyle & Physical Education": [
+        "Physical Education / Sports Science",
+        "Coaching & Athletics"
+    ]
+}
+
+
+# Skills data structured by category
+SKILL_CATEGORIES = {
+    "Thinking & Solving": [
+        "Creative thinking",
+        "Problem solving",
+        "Strategic thinking",
+        "Data analysis",
+        "Decision-making"
+    ],
+    "People & Communication": [
+        "Teamwork",
+        "Leading others",
+        "Explaining ideas",
+        "Listening well",
+        "Resolving conflict"
+    ],
+    "Hands-On": [
+        "Building or fixing",
+        "Cooking or crafting",
+        "Working outdoors",
+        "Using tools/machines"
+    ],
+    "Digital Skills": [
+        "Coding",
+        "Designing digitally",
+        "Editing videos",
+        "Working with data",
+        "Troubleshooting tech"
+    ],
+    "Creative Skills": [
+        "Drawing or painting",
+        "Writing or storytelling",
+        "Performing",
+        "Music or audio",
+        "Photography or video"
+    ],
+    "Purpose & Values": [
+        "Helping people",
+        "Supporting the planet",
+        "Standing up for causes",
+        "Understanding cultures",
+        "Working with animals"
+    ]
+}
+
+
+# SDGs data
+SDGS = [
+    {"id": 1, "name": "No Poverty"},
+    {"id": 2, "name": "Zero Hunger"},
+    {"id": 3, "name": "Good Health & Well-Being"},
+    {"id": 4, "name": "Quality Education"},
+    {"id": 5, "name": "Gender Equality"},
+    {"id": 6, "name": "Clean Water & Sanitation"},
+    {"id": 7, "name": "Affordable & Clean Energy"},
+    {"id": 8, "name": "Decent Work & Economic Growth"},
+    {"id": 9, "name": "Industry, Innovation & Infrastructure"},
+    {"id": 10, "name": "Reduced Inequalities"},
+    {"id": 11, "name": "Sustainable Cities & Communities"},
+    {"id": 12, "name": "Responsible Consumption & Production"},
+    {"id": 13, "name": "Climate Action"},
+    {"id": 14, "name": "Life Below Water"},
+    {"id": 15, "name": "Life on Land"},
+    {"id": 16, "name": "Peace, Justice & Strong Institutions"},
+    {"id": 17, "name": "Partnerships for the Goals"}
+]
+
+# SDG lookup tables, built once instead of scanning SDGS on every lookup
+SDG_NAMES = {sdg["id"]: sdg["name"] for sdg in SDGS}
+SDG_BADGES = {sdg_id: f"<span class='sdg-tag'>SDG {sdg_id}: {name}</span>" for sdg_id, name in SDG_NAMES.items()}
+
+
+# Minimal set of careers that lets the app function when the CSV is missing
+FALLBACK_CAREERS = [
+    {
+        "id": 1,
+        "title": "Microfinance Specialist",
+        "description": "Designs small loans and savings programs to support underserved communities.",
+        "interests": ["Economics", "Business Studies / Entrepreneurship", "Global Politics / Civics"],
+        "skills": ["Strategic thinking", "Data analysis", "Helping people", "Understanding cultures"],
+        "sdgs": [1, 8, 10]
+    },
+    # Additional fallback careers would be here
+    {
+        "id": 28,
+        "title": "UX Designer",
+        "description": "Designs interfaces that make tech easy, ethical, and human-centered.",
+        "interests": ["Psychology", "Graphic Design / Digital Media", "Computer Science / Programming"],
+        "skills": ["Creative thinking", "Designing digitally", "Listening well", "Problem solving"],
+        "sdgs": [9, 10, 4]
+    }
+]
+
+
+# Placeholder description used for careers without one
+def default_description(career_title):
+    return f"A professional role in {career_title}."
+
+
+# Offline enrichment (see enrich_catalog.py): generated descriptions, and
+# optionally tags normalized to the app's vocabularies, kept in a JSON lines file
+# next to the CSV and compiled into the catalog. Bump the version when the
+# enrichment prompt changes so every career is regenerated.
+ENRICHMENT_VERSION = "1"
+
+
+def enrichment_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".enriched.jsonl"
+
+
+# Hash of everything an enrichment is generated from; editing a career's title
+# or tags gives it a new hash, so its old enrichment is no longer applied
+def career_content_hash(career):
+    payload = json.dumps(
+        {
+            "version": ENRICHMENT_VERSION,
+            "title": career["title"],
+            "interests": career["interests"],
+            "skills": career["skills"],
+            "sdgs": career["sdgs"]
+        },
+        sort_keys=True
+    ).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
+
+
+# Enrichment records by content hash; later lines win
+def load_enrichments(path):
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn last line of an interrupted run
+                continue
+            if record.get("hash"):
+                records[record["hash"]] = record
+    return records
+
+
+# Copy enrichments onto the careers whose content they were generated from
+def apply_enrichments(careers, enrichments):
+    applied = 0
+    for career in careers:
+        record = enrichments.get(career_content_hash(career))
+        if record is None:
+            continue
+        if record.get("description"):
+            career["description"] = record["description"]
+        if record.get("interests"):
+            career["interests"] = record["interests"]
+        if record.get("skills"):
+            career["skills"] = record["skills"]
+        applied += 1
+    return applied
+
+
+# String table: every string UTF-8 encoded back to back, plus offsets
+def pack_strings(strings):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return data, offsets
+
+
+# Ragged lists in CSR form: values back to back, plus offsets per row
+def pack_lists(lists, dtype):
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(items) for items in lists], dtype=np.int64)
+    values = np.fromiter((v for items in lists for v in items), dtype=dtype, count=int(offsets[-1]))
+    return values, offsets
+
+
+# Inverted postings from CSR rows: for every tag id, the rows that carry it (each row once)
+def build_postings(values, offsets, vocab_size):
+    row_count = len(offsets) - 1
+    rows = np.repeat(np.arange(row_count, dtype=np.int64), np.diff(offsets))
+    keys = np.unique(values.astype(np.int64) * max(row_count, 1) + rows)
+    tags = keys // max(row_count, 1)
+    post_rows = (keys % max(row_count, 1)).astype(np.int32)
+    post_offsets = np.searchsorted(tags, np.arange(vocab_size + 1)).astype(np.int64)
+    return post_rows, post_offsets
+
+
+def _intern(lists):
+    vocab = {}
+    ids = [[vocab.setdefault(item, len(vocab)) for item in items] for items in lists]
+    return list(vocab), ids
+
+
+# Highest SDG id; SDG postings are indexed by the SDG id itself
+MAX_SDG_ID = 17
+
+
+# Career catalog compiled into flat NumPy arrays. Interests and skills are
+# interned into small vocabularies and stored per career in CSR form, with
+# inverted postings for scoring, so the per-career cost is a few integers
+# instead of a dict of lists of strings. Full career dicts are only
+# materialized by career() for the results that are actually displayed.
+class CompactCatalog:
+    def __init__(self, arrays, version=None, meta=None):
+        self.arrays = arrays
+        # Free-form facts about the source file, e.g. its columns and row count
+        self.meta = meta or {}
+        self.interest_vocab = self._unpack("interest_vocab")
+        self.skill_vocab = self._unpack("skill_vocab")
+        self.interest_lookup = {tag: i for i, tag in enumerate(self.interest_vocab)}
+        self.skill_lookup = {tag: i for i, tag in enumerate(self.skill_vocab)}
+        # Ids in ascending order, gathered once so id lookups are a plain binary search
+        self.sorted_ids = self.arrays["ids"][self.arrays["id_order"]]
+        self.version = version or self._content_hash()
+
+    @classmethod
+    def from_records(cls, careers):
+        arrays = {}
+        arrays["ids"] = np.array([career["id"] for career in careers], dtype=np.int64)
+        arrays["id_order"] = np.argsort(arrays["ids"], kind="stable").astype(np.int32)
+
+        titles = [career["title"] for career in careers]
+        arrays["title_data"], arrays["title_offsets"] = pack_strings(titles)
+        arrays["title_order"] = np.array(sorted(range(len(titles)), key=lambda i: titles[i]), dtype=np.int32)
+
+        # Placeholder descriptions are rebuilt from the title instead of stored
+        descriptions = [
+            "" if career["description"] == default_description(career["title"]) else career["description"]
+            for career in careers
+        ]
+        arrays["description_data"], arrays["description_offsets"] = pack_strings(descriptions)
+
+        interest_vocab, interest_ids = _intern([career["interests"] for career in careers])
+        skill_vocab, skill_ids = _intern([career["skills"] for career in careers])
+        arrays["interest_vocab_data"], arrays["interest_vocab_offsets"] = pack_strings(interest_vocab)
+        arrays["skill_vocab_data"], arrays["skill_vocab_offsets"] = pack_strings(skill_vocab)
+
+        arrays["interest_ids"], arrays["interest_offsets"] = pack_lists(interest_ids, np.int32)
+        arrays["skill_ids"], arrays["skill_offsets"] = pack_lists(skill_ids, np.int32)
+        arrays["sdg_ids"], arrays["sdg_offsets"] = pack_lists([career["sdgs"] for career in careers], np.int8)
+
+        arrays["interest_post_rows"], arrays["interest_post_offsets"] = build_postings(
+            arrays["interest_ids"], arrays["interest_offsets"], len(interest_vocab))
+        arrays["skill_post_rows"], arrays["skill_post_offsets"] = build_postings(
+            arrays["skill_ids"], arrays["skill_offsets"], len(skill_vocab))
+        arrays["sdg_post_rows"], arrays["sdg_post_offsets"] = build_postings(
+            arrays["sdg_ids"], arrays["sdg_offsets"], MAX_SDG_ID + 1)
+        return cls(arrays)
+
+    def __len__(self):
+        return len(self.arrays["ids"])
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def _content_hash(self):
+        digest = hashlib.sha1()
+        for name in sorted(self.arrays):
+            array = self.arrays[name]
+            digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode("utf-8"))
+            digest.update(np.ascontiguousarray(array).data)
+        return digest.hexdigest()[:16]
+
+    def _string(self, prefix, i):
+        offsets = self.arrays[f"{prefix}_offsets"]
+        return bytes(self.arrays[f"{prefix}_data"][offsets[i]:offsets[i + 1]]).decode("utf-8")
+
+    def _unpack(self, prefix):
+        count = len(self.arrays[f"{prefix}_offsets"]) - 1
+        return [self._string(prefix, i) for i in range(count)]
+
+    def _row(self, name, i):
+        offsets = self.arrays[f"{name}_offsets"]
+        return self.arrays[f"{name}_ids"][offsets[i]:offsets[i + 1]]
+
+    def title(self, i):
+        return self._string("title", i)
+
+    def description(self, i):
+        return self._string("description", i) or default_description(self.title(i))
+
+    def career_id(self, i):
+        return int(self.arrays["ids"][i])
+
+    # Rows of the careers carrying one tag id ("interest", "skill" or "sdg")
+    def postings(self, kind, tag_id):
+        offsets = self.arrays[f"{kind}_post_offsets"]
+        return self.arrays[f"{kind}_post_rows"][offsets[tag_id]:offsets[tag_id + 1]]
+
+    # Career record in the same shape as the parsed CSV rows
+    def career(self, i):
+        return {
+            "id": self.career_id(i),
+            "title": self.title(i),
+            "description": self.description(i),
+            "interests": [self.interest_vocab[t] for t in self._row("interest", i)],
+            "skills": [self.skill_vocab[t] for t in self._row("skill", i)],
+            "sdgs": [int(s) for s in self._row("sdg", i)]
+        }
+
+    def index_of_id(self, career_id):
+        try:
+            career_id = int(career_id)
+        except (TypeError, ValueError):
+            return None
+        pos = int(np.searchsorted(self.sorted_ids, career_id))
+        if pos < len(self.sorted_ids) and self.sorted_ids[pos] == career_id:
+            return int(self.arrays["id_order"][pos])
+        return None
+
+    def index_of_title(self, title):
+        order = self.arrays["title_order"]
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.title(order[mid]) < title:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and self.title(order[lo]) == title:
+            return int(order[lo])
+        return None
+
+    def get_by_id(self, career_id):
+        i = self.index_of_id(career_id)
+        return None if i is None else self.career(i)
+
+    def get_by_title(self, title):
+        i = self.index_of_title(title) if isinstance(title, str) else None
+        return None if i is None else self.career(i)
+
+    # Id and title of the first careers, as sent to the AI stage
+    def id_titles(self, limit=None):
+        count = len(self) if limit is None else min(limit, len(self))
+        return [{"id": self.career_id(i), "title": self.title(i)} for i in range(count)]
+
+
+# Compiled catalog file: magic, header length, JSON header describing every
+# array, then the raw array data aligned so each array can be memory-mapped
+STORE_MAGIC = b"LUCIDUS-CATALOG-1\n"
+STORE_ALIGNMENT = 64
+
+# Where compiled catalogs are kept; every worker on the host maps the same files
+DEFAULT_STORE_DIR = os.path.join(tempfile.gettempdir(), "lucidus-catalog")
+
+
+def _aligned(offset):
+    return (offset + STORE_ALIGNMENT - 1) // STORE_ALIGNMENT * STORE_ALIGNMENT
+
+
+# Write a compiled catalog to path atomically, so readers only ever see a complete file
+def write_catalog_file(catalog, path):
+    entries = {}
+    offset = 0
+    for name in sorted(catalog.arrays):
+        array = np.ascontiguousarray(catalog.arrays[name])
+        offset = _aligned(offset)
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    header = json.dumps({"version": catalog.version, "meta": catalog.meta, "arrays": entries}).encode("utf-8")
+    data_start = _aligned(len(STORE_MAGIC) + 8 + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(STORE_MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for name in sorted(catalog.arrays):
+                array = np.ascontiguousarray(catalog.arrays[name])
+                f.write(b"\0" * (data_start + entries[name]["offset"] - f.tell()))
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Open a compiled catalog file with every array memory-mapped read-only. All
+# processes that open the same file share its pages through the OS page cache.
+def open_catalog_file(path):
+    with open(path, "rb") as f:
+        if f.read(len(STORE_MAGIC)) != STORE_MAGIC:
+            raise ValueError(f"{path} is not a compiled catalog file")
+        header_length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+    data_start = _aligned(len(STORE_MAGIC) + 8 + header_length)
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        shape = tuple(entry["shape"])
+        dtype = np.dtype(entry["dtype"])
+        if int(np.prod(shape)) == 0:
+            # Zero-length arrays cannot be memory-mapped
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=data_start + entry["offset"], shape=shape)
+    return CompactCatalog(arrays, version=header["version"], meta=header.get("meta"))
+
+
+# Compiled file for one CSV, named after the CSV (and enrichment) content so edits get a new file
+def catalog_store_path(csv_path, store_dir):
+    digest = hashlib.sha1(STORE_MAGIC)
+    with open(csv_path, "rb") as f:
+        digest.update(f.read())
+    if os.path.exists(enrichment_path(csv_path)):
+        with open(enrichment_path(csv_path), "rb") as f:
+            digest.update(f.read())
+    digest = digest.hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(store_dir, f"{name}-{digest}.catalog")
@@ -0,0 +1,189 @@
+import glob
+import os
+import threading
+import time
+import traceback
+
+import pandas as pd
+
+from catalog import (
+    REQUIRED_COLUMNS,
+    CompactCatalog,
+    apply_enrichments,
+    catalog_store_path,
+    enrichment_path,
+    load_enrichments,
+    open_catalog_file,
+    parse_career_rows,
+    write_catalog_file
+)
+from logs import get_logger
+
+logger = get_logger("catalog")
+
+
+# Raised when a CSV cannot be turned into a usable catalog
+class CatalogError(Exception):
+    pass
+
+
+# One immutable, versioned catalog. Requests hold on to the snapshot they
+# started with, so a swap never changes the catalog under a running request.
+class CatalogSnapshot:
+    def __init__(self, catalog, csv_path, csv_size, csv_mtime, store_path):
+        self.catalog = catalog
+        self.version = catalog.version
+        self.csv_path = csv_path
+        self.csv_size = csv_size
+        self.csv_mtime = csv_mtime
+        self.store_path = store_path
+        self.loaded_at = time.time()
+
+
+# Check a parsed catalog before it is allowed to replace the current one
+def validate_careers(careers):
+    if not careers:
+        raise CatalogError("No career data was loaded from the CSV. Please check your CSV file.")
+    for career in careers:
+        if not isinstance(career["title"], str) or not career["title"].strip():
+            raise CatalogError(f"Career {career['id']} has no title. Please check your CSV file.")
+
+
+# Read, validate and compile a CSV into a snapshot. Reuses the compiled file
+# if another worker on the host already built it for the same CSV content.
+def build_snapshot(csv_path, store_dir):
+    stat = os.stat(csv_path)
+    store_path = catalog_store_path(csv_path, store_dir)
+
+    if not os.path.exists(store_path):
+        df = pd.read_csv(csv_path)
+
+        # Check if required columns exist
+        for col in REQUIRED_COLUMNS:
+            if col not in df.columns:
+                raise CatalogError(f"Required column '{col}' not found in CSV file. Please check your CSV format.")
+
+        careers = parse_career_rows(df)
+        validate_careers(careers)
+
+        # Descriptions (and tags) generated offline by enrich_catalog.py
+        enriched = apply_enrichments(careers, load_enrichments(enrichment_path(csv_path)))
+
+        catalog = CompactCatalog.from_records(careers)
+        catalog.meta = {"columns": df.columns.tolist(), "rows": len(df), "enriched": enriched}
+        write_catalog_file(catalog, store_path)
+
+    return CatalogSnapshot(open_catalog_file(store_path), csv_path, stat.st_size, stat.st_mtime, store_path)
+
+
+# Keeps the current catalog snapshot for one CSV and hot-reloads it. A daemon
+# thread polls the file; when it changes (and has stopped changing), a new
+# snapshot is built and validated in the background and then swapped in with
+# a single reference assignment. A broken edit leaves the old snapshot live.
+class CatalogManager:
+    def __init__(self, csv_path, store_dir, poll_interval=5.0, settle_seconds=0.5, keep_files=3):
+        self.csv_path = csv_path
+        self.store_dir = store_dir
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.keep_files = keep_files
+        self.last_error = None
+        self.last_traceback = None
+        self.reload_count = 0
+        self._snapshot = None
+        self._signature = None
+        self._listeners = []
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # The snapshot new requests should use, or None if nothing has loaded yet
+    def current(self):
+        return self._snapshot
+
+    # Call fn(old_snapshot, new_snapshot) after every swap
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.csv_path)
+        except OSError:
+            return None
+        # A newly published enrichment file also triggers a reload
+        try:
+            enrichment = os.stat(enrichment_path(self.csv_path))
+            enrichment = (enrichment.st_mtime_ns, enrichment.st_size)
+        except OSError:
+            enrichment = None
+        return stat.st_mtime_ns, stat.st_size, enrichment
+
+    # Build a new snapshot now and swap it in if it is valid
+    def reload(self):
+        with self._reload_lock:
+            signature = self._file_signature()
+            try:
+                snapshot = build_snapshot(self.csv_path, self.store_dir)
+            except Exception as e:
+                self.last_error = e
+                self.last_traceback = traceback.format_exc()
+                self._signature = signature
+                logger.warning("catalog not loaded", exc_info=e, extra={"csv": self.csv_path})
+                return False
+
+            old = self._snapshot
+            self._signature = signature
+            self.last_error = None
+            self.last_traceback = None
+            if old is not None and old.version == snapshot.version:
+                return False
+
+            self._snapshot = snapshot
+            self.reload_count += 1
+            logger.info("catalog loaded", extra={
+                "csv": self.csv_path,
+                "version": snapshot.version,
+                "previous_version": old.version if old is not None else None,
+                "careers": len(snapshot.catalog)
+            })
+            for listener in list(self._listeners):
+                try:
+                    listener(old, snapshot)
+                except Exception:
+                    # One failing listener must not keep the others from hearing about the swap
+                    logger.exception("catalog listener failed", extra={"csv": self.csv_path, "version": snapshot.version})
+            self._prune_store()
+            return True
+
+    # Remove compiled files of older versions of this CSV. Processes that still
+    # have one mapped keep their pages until they let go of the snapshot.
+    def _prune_store(self):
+        name = os.path.splitext(os.path.basename(self.csv_path))[0]
+        files = sorted(glob.glob(os.path.join(self.store_dir, f"{name}-*.catalog")), key=os.path.getmtime, reverse=True)
+        for path in files[self.keep_files:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # Load the first snapshot and start watching the file
+    def start(self):
+        self.reload()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="catalog-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            signature = self._file_signature()
+            if signature is None or signature == self._signature:
+                continue
+            # Give the editor time to finish writing before reading the file
+            time.sleep(self.settle_seconds)
+            if self._file_signature() != signature:
+                continue
+            self.reload()
@@ -0,0 +1,193 @@
+# Golden equivalence check of the manual matching engines. Every engine must
+# return exactly what the reference match_careers returns: the same careers
+# in the same order (ties broken by catalog order), the same scores,
+# match_score and match_details. The zero-score careers that pad a short list
+# are random by design, so for them only the count and the fact that they
+# match nothing are checked. The check runs on the real catalog and on
+# synthetic ones, and reports the speed of each engine next to the reference.
+#
+#   python check_matching.py --profiles 200 --sizes 2000,50000
+#   python check_matching.py --exhaustive --sizes 2000
+#
+# Exits non-zero on any difference, so a new engine can be gated on it.
+import argparse
+import itertools
+import random
+import time
+
+import pandas as pd
+
+from catalog import CSV_FILENAME, INTEREST_CATEGORIES, SDGS, SKILL_CATEGORIES, CompactCatalog, parse_career_rows
+from matching import IncrementalScorer, PartitionedMatcher, match_careers, match_careers_compact
+
+INTERESTS = [i for items in INTEREST_CATEGORIES.values() for i in items]
+SKILLS = [s for items in SKILL_CATEGORIES.values() for s in items]
+SDG_IDS = [sdg["id"] for sdg in SDGS]
+
+
+# Careers with tags drawn from the app's lists, a few tags the app does not
+# offer, duplicated tags and many identical careers, so ties are common
+def synthetic_records(size, seed):
+    rng = random.Random(seed)
+    interests = INTERESTS + ["Unlisted subject"]
+    skills = SKILLS + ["Unlisted skill"]
+    records = []
+    for n in range(size):
+        if records and rng.random() < 0.1:
+            career = dict(rng.choice(records))
+        else:
+            career = {
+                "interests": rng.sample(interests, rng.randint(0, 5)),
+                "skills": rng.sample(skills, rng.randint(0, 5)),
+                "sdgs": rng.sample(SDG_IDS, rng.randint(0, 4))
+            }
+            if career["interests"] and rng.random() < 0.05:
+                career["interests"].append(career["interests"][0])
+        career.update({"id": n + 1, "title": f"Career {n + 1}", "description": f"A professional role in Career {n + 1}."})
+        records.append(career)
+    return records
+
+
+def random_profile(rng):
+    return (
+        rng.sample(INTERESTS, rng.randint(0, 3)) if rng.random() < 0.1 else rng.sample(INTERESTS, 3),
+        rng.sample(SKILLS, rng.randint(0, 3)) if rng.random() < 0.1 else rng.sample(SKILLS, 3),
+        rng.sample(SDG_IDS, rng.randint(1, 3))
+    )
+
+
+# Every interest triple, every skill triple and every SDG selection, one
+# dimension at a time with the other two drawn at random
+def exhaustive_profiles(seed):
+    rng = random.Random(seed)
+    for interests in itertools.combinations(INTERESTS, 3):
+        yield list(interests), rng.sample(SKILLS, 3), rng.sample(SDG_IDS, rng.randint(1, 3))
+    for skills in itertools.combinations(SKILLS, 3):
+        yield rng.sample(INTERESTS, 3), list(skills), rng.sample(SDG_IDS, rng.randint(1, 3))
+    for count in (1, 2, 3):
+        for sdg_ids in itertools.combinations(SDG_IDS, count):
+            yield rng.sample(INTERESTS, 3), rng.sample(SKILLS, 3), list(sdg_ids)
+
+
+def golden(match):
+    return (match["id"], match["title"], match["score"], match["match_score"], match["match_details"])
+
+
+# Differences between a reference result and an engine's result; positives_only
+# is for engines that leave out the zero-score padding
+def diff_results(expected, actual, catalog_size, k, positives_only=False):
+    expected_top = [golden(m) for m in expected if m["score"] > 0]
+    actual_top = [golden(m) for m in actual if m["score"] > 0]
+    if expected_top != actual_top:
+        for position, (want, got) in enumerate(itertools.zip_longest(expected_top, actual_top)):
+            if want != got:
+                return [f"position {position}: expected {want}, got {got}"]
+    if positives_only:
+        return [] if len(actual) == len(actual_top) else [f"{len(actual) - len(actual_top)} zero-score careers returned"]
+
+    problems = []
+    padding = [m for m in actual if m["score"] <= 0]
+    if len(actual) != min(k, catalog_size):
+        problems.append(f"{len(actual)} careers returned, expected {min(k, catalog_size)}")
+    if len({m["id"] for m in actual}) != len(actual):
+        problems.append("a career is returned twice")
+    for m in padding:
+        details = m["match_details"]
+        if m["score"] != 0 or details["interest_matches"] or details["skill_matches"]["current"] or details["sdg_matches"]:
+            problems.append(f"padding career {m['id']} has score {m['score']} and details {details}")
+    return problems
+
+
+# Engines under test: name -> fn(profile) returning (matches, profile as the engine saw it)
+def make_engines(catalog, k, workers):
+    partitioned = PartitionedMatcher(workers=workers, min_rows=0)
+    scorer = IncrementalScorer(catalog)
+
+    def incremental(profile):
+        # The scorer carries over from the previous profile, like a student toggling
+        scorer.sync(catalog, *profile)
+        seen = (list(scorer.selected["interest"]), list(scorer.selected["skill"]), list(scorer.selected["sdg"]))
+        return scorer.top_matches(catalog, k=k), seen
+
+    return {
+        "compact": lambda profile: (match_careers_compact(catalog, *profile, k=k), profile),
+        "partitioned": lambda profile: (partitioned.match(catalog, *profile, k=k), profile),
+        "incremental": incremental
+    }
+
+
+def check_catalog(name, records, profiles, k, workers, max_reports):
+    catalog = CompactCatalog.from_records(records)
+    engines = make_engines(catalog, k, workers)
+    timings = {"reference": 0.0, **{engine: 0.0 for engine in engines}}
+    failures = {engine: 0 for engine in engines}
+    reports = []
+    count = 0
+
+    for profile in profiles:
+        count += 1
+        start = time.perf_counter()
+        expected = match_careers(records, *profile, k=k)
+        timings["reference"] += time.perf_counter() - start
+
+        for engine, run in engines.items():
+            start = time.perf_counter()
+            actual, seen = run(profile)
+            timings[engine] += time.perf_counter() - start
+            # Match details follow the selection order the engine holds
+            want = expected if seen == profile else match_careers(records, *seen, k=k)
+            problems = diff_results(want, actual, len(records), k, positives_only=engine == "incremental")
+            if problems:
+                failures[engine] += 1
+                if len(reports) < max_reports:
+                    reports.append(f"  {engine} on {seen}: {'; '.join(problems)}")
+
+    print(f"\n== {name}: {len(records)} careers, {count} profiles")
+    print(f"{'engine':<12} {'failures':>8} {'ms/query':>9} {'speedup':>8}")
+    reference_ms = timings["reference"] / max(count, 1) * 1000
+    print(f"{'reference':<12} {'-':>8} {reference_ms:>9.3f} {'1.0x':>8}")
+    for engine in engines:
+        ms = timings[engine] / max(count, 1) * 1000
+        speedup = reference_ms / ms if ms > 0 else float("inf")
+        print(f"{engine:<12} {failures[engine]:>8} {ms:>9.3f} {speedup:>7.1f}x")
+    for report in reports:
+        print(report)
+    return sum(failures.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the manual matching engines against the reference implementation")
+    parser.add_argument("--profiles", type=int, default=200, help="random profiles per catalog")
+    parser.add_argument("--exhaustive", action="store_true", help="every interest triple, skill triple and SDG selection instead")
+    parser.add_argument("--sizes", default="2000,50000", help="sizes of the synthetic catalogs (empty for none)")
+    parser.add_argument("--csv", default=CSV_FILENAME, help="real catalog to check as well (empty for none)")
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=4, help="threads for the partitioned engine")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--max-reports", type=int, default=10, help="differences printed per catalog")
+    args = parser.parse_args()
+
+    catalogs = []
+    if args.csv:
+        catalogs.append((args.csv, parse_career_rows(pd.read_csv(args.csv))))
+    for size in [int(size) for size in args.sizes.split(",") if size]:
+        catalogs.append((f"synthetic-{size}", synthetic_records(size, args.seed + size)))
+
+    failures = 0
+    for name, records in catalogs:
+        if args.exhaustive:
+            profiles = exhaustive_profiles(args.seed)
+        else:
+            rng = random.Random(args.seed)
+            profiles = [random_profile(rng) for _ in range(args.profiles)]
+        failures += check_catalog(name, records, profiles, args.k, args.workers, args.max_reports)
+
+    print()
+    if failures:
+        print(f"FAIL: {failures} results differ from the reference")
+        raise SystemExit(1)
+    print("All engines match the reference")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# Offline enrichment of the career catalog: generates a description (and, with
+# --normalize-tags, tags mapped onto the app's labels) for every career once,
+# outside the request path. Results go to a JSON lines file next to the CSV,
+# which the app compiles into the catalog and hot-reloads when it changes.
+#
+#   OPENAI_API_KEY=... python enrich_catalog.py --concurrency 4
+#
+# Careers are identified by a hash of their content, so re-running only
+# generates what is missing or changed. Progress is appended to a .partial file
+# as it happens; an interrupted run resumes from it, and the enrichment file is
+# only replaced (atomically) once the run finishes.
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+from openai import OpenAI
+
+from catalog import (
+    CSV_FILENAME,
+    INTEREST_CATEGORIES,
+    SKILL_CATEGORIES,
+    career_content_hash,
+    enrichment_path,
+    load_enrichments,
+    parse_career_rows
+)
+from llm import ENRICHMENT_MODEL, career_description
+
+
+# Generate one career's enrichment, retrying with backoff on API errors
+def enrich_career(client, career, model, normalize_tags, retries):
+    interest_labels = [i for items in INTEREST_CATEGORIES.values() for i in items] if normalize_tags else None
+    skill_labels = [s for items in SKILL_CATEGORIES.values() for s in items] if normalize_tags else None
+
+    for attempt in range(retries + 1):
+        try:
+            response = career_description(client, career, interest_labels, skill_labels, model=model)
+            break
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(2 ** attempt)
+
+    record = {
+        "hash": career_content_hash(career),
+        "title": career["title"],
+        "description": str(response.get("description", "")).strip(),
+        "model": model,
+        "created_at": time.time()
+    }
+    if normalize_tags:
+        # Keep only labels the app actually offers
+        record["interests"] = [i for i in response.get("interests", []) if i in interest_labels]
+        record["skills"] = [s for s in response.get("skills", []) if s in skill_labels]
+    return record
+
+
+# Replace the enrichment file with the current careers' records in one step
+def publish(path, careers, records):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            written = set()
+            for career in careers:
+                content_hash = career_content_hash(career)
+                if content_hash in records and content_hash not in written:
+                    f.write(json.dumps(records[content_hash]) + "\n")
+                    written.add(content_hash)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(written)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate career descriptions for the catalog")
+    parser.add_argument("--csv", default=CSV_FILENAME)
+    parser.add_argument("--output", help="enrichment file (default: next to the CSV)")
+    parser.add_argument("--model", default=ENRICHMENT_MODEL)
+    parser.add_argument("--concurrency", type=int, default=4, help="OpenAI requests in flight at once")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--limit", type=int, help="only enrich this many careers in this run")
+    parser.add_argument("--normalize-tags", action="store_true", help="also map tags onto the app's labels")
+    args = parser.parse_args()
+
+    output = args.output or enrichment_path(args.csv)
+    partial = output + ".partial"
+    careers = parse_career_rows(pd.read_csv(args.csv))
+
+    # Everything already generated, including the progress of an interrupted run
+    records = load_enrichments(output)
+    records.update(load_enrichments(partial))
+
+    todo = []
+    seen = set()
+    for career in careers:
+        content_hash = career_content_hash(career)
+        if content_hash in records or content_hash in seen:
+            continue
+        seen.add(content_hash)
+        todo.append(career)
+    if args.limit is not None:
+        todo = todo[:args.limit]
+    print(f"{len(careers)} careers, {len(careers) - len(todo)} already enriched, {len(todo)} to generate")
+
+    client = OpenAI()
+    failures = 0
+    with open(partial, "a", encoding="utf-8") as progress, ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = {
+            executor.submit(enrich_career, client, career, args.model, args.normalize_tags, args.retries): career
+            for career in todo
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            career = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"[{done}/{len(todo)}] {career['title']}: error {e}")
+                continue
+            records[record["hash"]] = record
+            progress.write(json.dumps(record) + "\n")
+            progress.flush()
+            print(f"[{done}/{len(todo)}] {career['title']}")
+
+    written = publish(output, careers, records)
+    if failures == 0:
+        os.remove(partial)
+    print(f"Wrote {written} enrichments to {output} ({failures} failed; re-run to retry them)")
+
+
+if __name__ == "__main__":
+    main()
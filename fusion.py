@@ -0,0 +1,208 @@
+# Local rank fusion of the manual and AI career rankings. Produces the final
+# list in the same shape as the AI Judge output so the results view does not
+# care which one it is showing.
+
+from catalog import default_description
+from matching import INTEREST_POINTS, SDG_POINTS, SKILL_POINTS
+
+# Reciprocal rank fusion constant; small because both lists are only 6 long
+RRF_K = 10
+
+# Relative weight of each ranking and of the tag-overlap evidence
+MANUAL_WEIGHT = 1.0
+AI_WEIGHT = 1.0
+EVIDENCE_WEIGHT = 1.0
+
+
+# Find the catalog record for an AI match, which may only have a reliable title
+def _lookup_career(match, catalog):
+    career = catalog.get_by_id(match.get("id"))
+    if career is None or career["title"] != match.get("title", career["title"]):
+        career = catalog.get_by_title(match.get("title")) or career
+    return career
+
+
+# Take career descriptions from the catalog, where enrich_catalog.py has
+# generated them offline. A career the catalog only has the title placeholder
+# for keeps the description the judge wrote for it, if any.
+def fill_descriptions(matches, catalog):
+    filled = []
+    for match in matches:
+        match = dict(match)
+        career = _lookup_career(match, catalog)
+        if career is not None and (career["description"] != default_description(career["title"]) or not match.get("description")):
+            match["description"] = career["description"]
+        elif not match.get("description"):
+            match["description"] = default_description(match.get("title", ""))
+        filled.append(match)
+    return filled
+
+
+# Tag overlap between the profile and a catalog career, in manual match_details format
+def compute_match_details(career, interests, skills, sdg_ids):
+    return {
+        "interest_matches": [i for i in interests if i in career["interests"]],
+        "skill_matches": {
+            "current": [s for s in skills if s in career["skills"]]
+        },
+        "sdg_matches": [s for s in sdg_ids if s in career["sdgs"]]
+    }
+
+
+def _evidence_fraction(match_details, interests, skills, sdg_ids):
+    best = INTEREST_POINTS * len(interests) + SKILL_POINTS * len(skills) + SDG_POINTS * len(sdg_ids)
+    if best == 0:
+        return 0.0
+    points = (
+        INTEREST_POINTS * len(match_details["interest_matches"])
+        + SKILL_POINTS * len(match_details["skill_matches"]["current"])
+        + SDG_POINTS * len(match_details["sdg_matches"])
+    )
+    return points / best
+
+
+def _join(items):
+    items = list(items)
+    if len(items) <= 1:
+        return "".join(items)
+    return ", ".join(items[:-1]) + " and " + items[-1]
+
+
+# Short explanation built only from the tag overlap
+def evidence_explanation(title, match_details, sdg_names):
+    parts = []
+    if match_details["interest_matches"]:
+        parts.append(f"connects with your interest in {_join(match_details['interest_matches'])}")
+    if match_details["skill_matches"]["current"]:
+        parts.append(f"draws on your {_join(match_details['skill_matches']['current'])} skills")
+    if match_details["sdg_matches"]:
+        goals = [f"SDG {sdg_id}: {sdg_names.get(sdg_id, '')}" for sdg_id in match_details["sdg_matches"]]
+        parts.append(f"contributes to {_join(goals)}")
+    if not parts:
+        return f"{title} is a broader option suggested by your overall profile."
+    return f"{title} {_join(parts)}."
+
+
+def _analysis(in_manual, in_ai):
+    if in_manual and in_ai:
+        return "Handpicked by our matching algorithm and confirmed by AI analysis of your profile."
+    if in_manual:
+        return "Handpicked by our matching algorithm based on your selections, then weighed against AI analysis."
+    return "Surfaced by AI analysis of your profile as a strong fit beyond the direct tag matches."
+
+
+# Fuse the manual and AI rankings into the final top-k list
+def fuse_career_matches(manual_matches, ai_matches, catalog, interests, skills, sdg_ids, sdg_names, k=6):
+    candidates = {}
+
+    def candidate(career):
+        entry = candidates.get(career["id"])
+        if entry is None:
+            entry = {"career": career, "manual_rank": None, "ai_rank": None, "ai_match": None, "match_details": None}
+            candidates[career["id"]] = entry
+        return entry
+
+    for rank, match in enumerate(manual_matches, start=1):
+        career = catalog.get_by_id(match["id"]) or match
+        entry = candidate(career)
+        if entry["manual_rank"] is None:
+            entry["manual_rank"] = rank
+            entry["match_details"] = match.get("match_details")
+
+    for rank, match in enumerate(ai_matches, start=1):
+        career = _lookup_career(match, catalog)
+        if career is None:
+            # The model invented a career that is not in the catalog
+            continue
+        entry = candidate(career)
+        if entry["ai_rank"] is None:
+            entry["ai_rank"] = rank
+            entry["ai_match"] = match
+
+    best_possible = (MANUAL_WEIGHT + AI_WEIGHT + EVIDENCE_WEIGHT) / (RRF_K + 1)
+    scored = []
+    for order, entry in enumerate(candidates.values()):
+        if entry["match_details"] is None:
+            entry["match_details"] = compute_match_details(entry["career"], interests, skills, sdg_ids)
+        evidence = _evidence_fraction(entry["match_details"], interests, skills, sdg_ids)
+
+        fused = EVIDENCE_WEIGHT * evidence / (RRF_K + 1)
+        if entry["manual_rank"] is not None:
+            fused += MANUAL_WEIGHT / (RRF_K + entry["manual_rank"])
+        if entry["ai_rank"] is not None:
+            fused += AI_WEIGHT / (RRF_K + entry["ai_rank"])
+        scored.append((fused, order, entry))
+
+    # Ties keep the manual list first, then the AI list
+    scored.sort(key=lambda item: (-item[0], item[1]))
+
+    results = []
+    previous_score = 101
+    for fused, _, entry in scored[:k]:
+        career = entry["career"]
+        details = entry["match_details"]
+
+        # Unique, descending match scores like the judge returns
+        match_score = max(1, min(int(round(100 * fused / best_possible)), previous_score - 1))
+        previous_score = match_score
+
+        ai_match = entry["ai_match"]
+        if ai_match and ai_match.get("explanation"):
+            explanation = ai_match["explanation"]
+        else:
+            explanation = evidence_explanation(career["title"], details, sdg_names)
+
+        results.append({
+            "id": career["id"],
+            "title": career["title"],
+            "description": career.get("description", ""),
+            "match_score": match_score,
+            "explanation": explanation,
+            "analysis": _analysis(entry["manual_rank"] is not None, ai_match is not None),
+            "matching_interests": details["interest_matches"],
+            "matching_skills": {"current": details["skill_matches"]["current"]},
+            "matching_sdgs": [f"SDG {sdg_id}: {sdg_names.get(sdg_id, '')}" for sdg_id in details["sdg_matches"]]
+        })
+    return results
+
+
+# Manually ranked careers in the judge's format, keeping their order and match
+# scores, with explanations built only from the tag overlap
+def evidence_matches(manual_matches, sdg_names):
+    results = []
+    for match in manual_matches:
+        details = match["match_details"]
+        results.append({
+            "id": match["id"],
+            "title": match["title"],
+            "description": match.get("description", ""),
+            "match_score": match["match_score"],
+            "explanation": evidence_explanation(match["title"], details, sdg_names),
+            "analysis": _analysis(True, False),
+            "matching_interests": details["interest_matches"],
+            "matching_skills": {"current": details["skill_matches"]["current"]},
+            "matching_sdgs": [f"SDG {sdg_id}: {sdg_names.get(sdg_id, '')}" for sdg_id in details["sdg_matches"]]
+        })
+    return results
+
+
+# Copy judge-written explanation/analysis text onto the fused list without touching its order
+def merge_explanations(fused_matches, explanations):
+    by_id = {}
+    for item in explanations:
+        try:
+            by_id[int(item.get("id"))] = item
+        except (TypeError, ValueError):
+            continue
+
+    merged = []
+    for match in fused_matches:
+        match = dict(match)
+        item = by_id.get(match["id"])
+        if item:
+            if item.get("explanation"):
+                match["explanation"] = item["explanation"]
+            if item.get("analysis"):
+                match["analysis"] = item["analysis"]
+        merged.append(match)
+    return merged
@@ -0,0 +1,120 @@
+import contextvars
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from logs import get_logger
+
+logger = get_logger("jobs")
+
+
+# One background computation. The worker thread updates stage/progress while it
+# runs; the UI only ever reads them.
+class Job:
+    def __init__(self, key):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = "queued"
+        self.stage = "queued"
+        self.progress = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        # Callers waiting for this job; a queued job is only cancelled once none are left
+        self.subscribers = 1
+        self.future = None
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def report(self, stage, progress):
+        self.stage = stage
+        self.progress = progress
+
+
+# Process-wide pool that runs the slow pipeline stages off the Streamlit script
+# thread. Jobs are looked up by id from any session; a job submitted while
+# another with the same key is still running is not started again, the caller
+# just gets the running one. Finished jobs are kept for keep_seconds so a
+# polling session can pick up the result. A job runs in a copy of the submitting
+# context, so its log lines carry the correlation id of the request that started it.
+class JobRunner:
+    def __init__(self, max_workers=8, keep_seconds=600):
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lucidus-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active = {}
+        self.stats = {"submitted": 0, "coalesced": 0, "failed": 0, "cancelled": 0}
+
+    # Run fn(job) in the background and return the job id
+    def submit(self, key, fn):
+        with self._lock:
+            self._prune()
+            running = self._active.get(key)
+            if running is not None:
+                running.subscribers += 1
+                self.stats["coalesced"] += 1
+                return running.id
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self.stats["submitted"] += 1
+            job.future = self._executor.submit(contextvars.copy_context().run, self._run, job, fn)
+        return job.id
+
+    # Withdraw interest in a job. A job that has not started yet is dropped once
+    # nobody is waiting for it; a running one is left to finish, since its result
+    # still goes into the cache.
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return False
+            job.subscribers -= 1
+            if job.subscribers > 0 or job.status != "queued" or not job.future.cancel():
+                return False
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            if self._active.get(job.key) is job:
+                del self._active[job.key]
+            self.stats["cancelled"] += 1
+            return True
+
+    def _run(self, job, fn):
+        with self._lock:
+            job.status = "running"
+        logger.debug("job started", extra={"job_key": job.key, "queued_seconds": round(time.time() - job.created_at, 3)})
+        try:
+            job.result = fn(job)
+            job.status = "done"
+        except Exception as e:
+            job.error = e
+            job.status = "failed"
+            with self._lock:
+                self.stats["failed"] += 1
+            logger.warning("job failed", exc_info=e, extra={"job_key": job.key})
+        finally:
+            job.finished_at = time.time()
+            if job.status == "done":
+                logger.debug("job finished", extra={"job_key": job.key, "seconds": round(job.finished_at - job.created_at, 3)})
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_seconds
+        stale = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in stale:
+            del self._jobs[job_id]
+
+    def pending(self):
+        with self._lock:
+            return len(self._active)
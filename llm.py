@@ -0,0 +1,343 @@
+import json
+
+from matching import top_k_indices
+from profiler import stage
+
+# Models used by each stage of the matching pipeline
+AI_MATCH_MODEL = "gpt-4o-mini"
+JUDGE_MODEL = "gpt-4.1-mini"
+COMBINED_MODEL = "gpt-4.1-mini"
+# Model for the offline catalog enrichment
+ENRICHMENT_MODEL = "gpt-4o-mini"
+
+# Most careers that fit into a single AI matching request
+MAX_CAREERS_PER_REQUEST = 100
+
+
+# Format interests, skills, and SDGs for the prompts
+def format_profile(interests, skills, sdg_ids, sdg_names):
+    interests_str = ", ".join(interests)
+    current_skills_str = ", ".join(skills)
+    sdgs_str = ", ".join([f"SDG {sdg_id}: {sdg_names[sdg_id]}" for sdg_id in sdg_ids])
+    return interests_str, current_skills_str, sdgs_str
+
+
+# The manual matches as the judge prompts show them: enough to identify each
+# career and its rank, without the tag lists and match details
+def prompt_matches(matches):
+    return [{"id": m["id"], "title": m["title"], "match_score": m.get("match_score")} for m in matches]
+
+
+# Extra line of the judge output format asking for a description, for catalogs
+# whose careers have no generated description (see enrich_catalog.py)
+def description_field(describe):
+    return """
+              "description": "Career description",""" if describe else ""
+
+
+# Send one JSON-mode chat completion and parse the response
+def request_json(client, model, system_prompt, user_prompt, temperature):
+    with stage("openai"):
+        completion = client.chat.completions.create(
+            model=model,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temperature
+        )
+    with stage("json"):
+        return json.loads(completion.choices[0].message.content)
+
+
+# Careers the AI stage may choose from: the manual matches first, then the
+# highest manual scores of the rest of the catalog (scores has one per row)
+def shortlist_candidates(catalog, manual_matches, scores, size=MAX_CAREERS_PER_REQUEST):
+    ranked = [
+        {"id": catalog.career_id(i), "title": catalog.title(i)}
+        for i in top_k_indices(scores, size + len(manual_matches))
+    ]
+    shortlist = []
+    seen = set()
+    for career in list(manual_matches) + ranked:
+        if career["id"] in seen:
+            continue
+        seen.add(career["id"])
+        # Only use career title for AI matching
+        shortlist.append({"id": career["id"], "title": career["title"]})
+        if len(shortlist) >= size:
+            break
+    return shortlist
+
+
+# AI-based career matching
+def ai_career_matches(client, interests, skills, sdg_ids, sdg_names, career_data, model=AI_MATCH_MODEL):
+    interests_str, current_skills_str, sdgs_str = format_profile(interests, skills, sdg_ids, sdg_names)
+    career_data_json = json.dumps(career_data)
+
+    # Construct the prompt for OpenAI
+    system_prompt = f"""You are a career counselor AI that helps students find the best career matches based on their interests, skills, and values.
+
+        You'll be given:
+        1. A student's interests, skills, and values (UN SDGs they care about)
+        2. A list of potential careers (only career titles)
+
+        Your task is to:
+        1. Analyze the student's profile
+        2. Find the 6 best career matches from the provided list
+        3. Return a JSON response with these matches, including explanations for why each match is good
+
+        For each career match, include:
+        - Career title
+        - Detailed explanation of why this is a good match based on interests, skills, and SDGs
+        - Key interests, skills, and SDGs that align with this career
+        - A "match_score" between 1-100 indicating how good the match is (highest score first)
+        """
+
+    user_prompt = f"""
+        Here is the student's profile:
+
+        Interests: {interests_str}
+        Current Skills: {current_skills_str}
+        Values (SDGs): {sdgs_str}
+
+        Here are the available careers to match from:
+        {career_data_json}
+
+        Return a JSON object with exactly 6 career matches in this format:
+        {{
+          "career_matches": [
+            {{
+              "id": career_id,
+              "title": "Career Title",
+              "description": "A professional role in this field.",
+              "match_score": score_between_1_and_100,
+              "explanation": "Detailed explanation of why this is a good match",
+              "matching_interests": ["interest1", "interest2", "interest3"],
+              "matching_skills": {{"current": ["skill1", "skill2", "skill3"]}},
+              "matching_sdgs": ["SDG1: Name", "SDG2: Name", "SDG3: Name"]
+            }},
+            ...
+          ]
+        }}
+
+        Ensure each career has a different match_score and sort by match_score in descending order.
+        """
+
+    parsed_response = request_json(client, model, system_prompt, user_prompt, temperature=0.5)
+    return parsed_response["career_matches"]
+
+
+# AI Judge to evaluate and combine both methods
+def judge_career_matches(client, manual_matches, ai_matches, interests, skills, sdg_ids, sdg_names, model=JUDGE_MODEL, describe=False):
+    interests_str, current_skills_str, sdgs_str = format_profile(interests, skills, sdg_ids, sdg_names)
+
+    # Prepare manual and AI matches for the prompt
+    manual_matches_json = json.dumps(prompt_matches(manual_matches))
+    ai_matches_json = json.dumps(ai_matches)
+
+    # Construct the prompt for OpenAI Judge
+    system_prompt = f"""You are an expert AI career counselor who evaluates career recommendations.
+
+        You'll be given:
+        1. A student's profile (interests, skills, and values)
+        2. Two sets of career recommendations:
+           - One set from a manual algorithm that uses weighted scoring
+           - One set from an AI system that uses more advanced matching
+
+        Your task is to:
+        1. Don't look at their scores but look at their matches and come with a more accurate response - ACT LIKE AN EXPERIENCED CAREER COUNSELLOR 
+        2. Analyze both sets of recommendations and suggest why you picking one over the other
+        3. Create a refined set of 6 career suggestions that represents the best matches by combining insights from both methods
+        4. Provide a brief explanation of why each career made your final list
+        5. Assign a match score to each career (1-100) and sort by descending score
+
+        Your response should be more accurate than either method alone by leveraging the strengths of both approaches.
+        """
+
+    user_prompt = f"""
+        Here is the student's profile:
+
+        Interests: {interests_str}
+        Current Skills: {current_skills_str}
+        Values (SDGs): {sdgs_str}
+
+        Here are the career matches from the manual algorithm:
+        {manual_matches_json}
+
+        Here are the career matches from the AI algorithm:
+        {ai_matches_json}
+
+        Provide your expert judgment on the best 6 career matches in this JSON format:
+        {{
+          "career_matches": [
+            {{
+              "id": career_id,
+              "title": "Career Title",{description_field(describe)}
+              "match_score": score_between_1_and_100,
+              "explanation": "Your expert reasoning on why this is a good match",
+              "analysis": "Brief comparison of how this career was ranked in both systems, dont show the score but explain it was handpicked and then AI analysed",
+              "matching_interests": ["interest1", "interest2", "interes3"],
+              "matching_skills": {{"current": ["skill1", "skill2", "skill3"]}},
+              "matching_sdgs": ["SDG1: Name", "SDG2: Name", "SDG3: Name"]
+            }},
+            ...
+          ]
+        }}
+
+        Make sure each career has a unique match score and sort them by match_score in descending order.
+        """
+
+    parsed_response = request_json(client, model, system_prompt, user_prompt, temperature=0.3)
+    return parsed_response["career_matches"]
+
+
+# AI Judge as an enrichment step: the ranking is already fixed by local fusion,
+# the judge only writes the explanation and analysis text for each card
+def judge_explanations(client, fused_matches, manual_matches, ai_matches, interests, skills, sdg_ids, sdg_names, model=JUDGE_MODEL):
+    interests_str, current_skills_str, sdgs_str = format_profile(interests, skills, sdg_ids, sdg_names)
+
+    final_list = [{"id": m["id"], "title": m["title"], "matching_interests": m["matching_interests"],
+                   "matching_skills": m["matching_skills"], "matching_sdgs": m["matching_sdgs"]}
+                  for m in fused_matches]
+
+    system_prompt = f"""You are an expert AI career counselor explaining a final list of career recommendations.
+        
+        The final list and its order have already been decided by combining a manual weighted-scoring algorithm
+        with an AI matching system. Do not add, remove or reorder careers.
+        
+        For each career, write:
+        1. An "explanation" of why this career suits the student - ACT LIKE AN EXPERIENCED CAREER COUNSELLOR
+        2. An "analysis" briefly describing how the career was handpicked and then AI analysed, without mentioning scores
+        """
+
+    user_prompt = f"""
+        Here is the student's profile:
+        
+        Interests: {interests_str}
+        Current Skills: {current_skills_str}
+        Values (SDGs): {sdgs_str}
+        
+        Here is the final list of careers:
+        {json.dumps(final_list)}
+        
+        Here are the career matches from the manual algorithm:
+        {json.dumps([{"id": m["id"], "title": m["title"]} for m in manual_matches])}
+        
+        Here are the career matches from the AI algorithm:
+        {json.dumps([{"id": m.get("id"), "title": m.get("title")} for m in ai_matches])}
+        
+        Return a JSON object in this format:
+        {{
+          "explanations": [
+            {{
+              "id": career_id,
+              "explanation": "Your expert reasoning on why this is a good match",
+              "analysis": "Brief comparison of how this career was handpicked and then AI analysed"
+            }},
+            ...
+          ]
+        }}
+        """
+
+    parsed_response = request_json(client, model, system_prompt, user_prompt, temperature=0.3)
+    return parsed_response.get("explanations", [])
+
+
+# Combined match + judge in a single request: the model sees the manual top matches
+# and the candidate shortlist at once and returns the final judged list directly
+def combined_career_matches(client, manual_matches, shortlist, interests, skills, sdg_ids, sdg_names, model=COMBINED_MODEL, describe=False):
+    interests_str, current_skills_str, sdgs_str = format_profile(interests, skills, sdg_ids, sdg_names)
+
+    # Prepare manual matches and the shortlist for the prompt
+    manual_matches_json = json.dumps(prompt_matches(manual_matches))
+    shortlist_json = json.dumps(shortlist)
+
+    system_prompt = f"""You are an expert AI career counselor who finds and evaluates career recommendations.
+
+        You'll be given:
+        1. A student's profile (interests, skills, and values)
+        2. The top career matches from a manual algorithm that uses weighted scoring
+        3. A shortlist of candidate careers (only career titles)
+
+        Your task is to:
+        1. Analyze the student's profile and find the best career matches from the shortlist
+        2. Weigh your own matches against the manual algorithm's matches - ACT LIKE AN EXPERIENCED CAREER COUNSELLOR
+        3. Create a final set of 6 career suggestions that represents the best matches by combining insights from both
+        4. Provide a brief explanation of why each career made your final list
+        5. Assign a match score to each career (1-100) and sort by descending score
+        """
+
+    user_prompt = f"""
+        Here is the student's profile:
+
+        Interests: {interests_str}
+        Current Skills: {current_skills_str}
+        Values (SDGs): {sdgs_str}
+
+        Here are the career matches from the manual algorithm:
+        {manual_matches_json}
+
+        Here is the shortlist of candidate careers:
+        {shortlist_json}
+
+        Provide your expert judgment on the best 6 career matches in this JSON format:
+        {{
+          "career_matches": [
+            {{
+              "id": career_id,
+              "title": "Career Title",{description_field(describe)}
+              "match_score": score_between_1_and_100,
+              "explanation": "Your expert reasoning on why this is a good match",
+              "analysis": "Brief comparison of how this career compares with the manual algorithm's picks, dont show the score but explain it was handpicked and then AI analysed",
+              "matching_interests": ["interest1", "interest2", "interes3"],
+              "matching_skills": {{"current": ["skill1", "skill2", "skill3"]}},
+              "matching_sdgs": ["SDG1: Name", "SDG2: Name", "SDG3: Name"]
+            }},
+            ...
+          ]
+        }}
+
+        Only choose careers from the manual matches or the shortlist, make sure each career has a unique
+        match score and sort them by match_score in descending order.
+        """
+
+    parsed_response = request_json(client, model, system_prompt, user_prompt, temperature=0.3)
+    return parsed_response["career_matches"]
+
+
+# Offline enrichment of one catalog career: a short description, and optionally
+# its tags mapped onto the app's interest and skill labels
+def career_description(client, career, interest_labels=None, skill_labels=None, model=ENRICHMENT_MODEL):
+    system_prompt = """You are a career counselor writing a career catalog for high school students.
+
+        For each career you are given, write a description of one or two sentences that explains what
+        people in this career do, in plain language a 15-year-old understands. Do not mention salaries."""
+
+    normalize = interest_labels is not None and skill_labels is not None
+    tag_instructions = ""
+    tag_fields = ""
+    if normalize:
+        tag_instructions = f"""
+        Also map the career's subjects and skills onto these labels, using only labels from the lists
+        and only the ones that genuinely apply:
+        Subject labels: {json.dumps(interest_labels)}
+        Skill labels: {json.dumps(skill_labels)}
+        """
+        tag_fields = """,
+          "interests": ["subject label", ...],
+          "skills": ["skill label", ...]"""
+
+    user_prompt = f"""
+        Career: {career["title"]}
+        Related school subjects: {", ".join(career["interests"])}
+        Skills: {", ".join(career["skills"])}
+        {tag_instructions}
+        Return a JSON object in this format:
+        {{
+          "description": "Career description"{tag_fields}
+        }}
+        """
+
+    return request_json(client, model, system_prompt, user_prompt, temperature=0.4)
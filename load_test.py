@@ -0,0 +1,455 @@
+# Offline load test of one app worker: N simulated students click through steps
+# 1-4 (toggles, navigation, results page) in Streamlit's AppTest harness, all in
+# this process so they share the worker's caches and job pool, while a stub
+# OpenAI-compatible server answers the LLM requests with realistic latency.
+# Concurrency is ramped level by level to find where the worker saturates.
+#
+# AppTest keeps one process-wide runtime, so script runs are serialised with a
+# lock. A real worker runs its script threads under one GIL as well, so this
+# is close to how reruns contend there; the wait for the lock is counted in the
+# rerun durations. Background jobs, OpenAI requests and think time overlap freely.
+#
+#   python load_test.py --levels 1,2,4,8,16 --llm-latency 2.5
+#   python load_test.py --levels 1,4,16 --require-concurrency 8 --json report.json
+#
+# Reports per-step p50/p95/p99, script rerun durations, worker CPU and peak RSS
+# per level, and where each session's results came from. With --require-concurrency it exits non-zero when the worker
+# saturates below that many concurrent students, so a release can be gated on it.
+import argparse
+import json
+import os
+import random
+import re
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit.logger
+
+from catalog import INTEREST_CATEGORIES, SDGS, SKILL_CATEGORIES
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+SCRIPT_LOCK = threading.Lock()
+STEPS = ["interests", "skills", "values", "results", "render"]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+# --- Stub LLM backend --------------------------------------------------------
+
+CAREER_PATTERN = re.compile(r'\{"id": (\d+), "title": "((?:[^"\\]|\\.)*)"')
+
+
+# Answer a chat completion the way the prompts in llm.py ask for, using the
+# careers listed in the prompt
+def stub_answer(system_prompt, user_prompt):
+    if "Career:" in user_prompt and "description" in system_prompt:
+        return {"description": "A professional role in this field.", "interests": [], "skills": []}
+
+    careers = []
+    seen = set()
+    for career_id, title in CAREER_PATTERN.findall(user_prompt):
+        if career_id not in seen:
+            seen.add(career_id)
+            careers.append((int(career_id), json.loads(f'"{title}"')))
+    careers = careers[:6]
+
+    if "explaining a final list" in system_prompt:
+        return {"explanations": [
+            {"id": career_id, "explanation": "A strong fit for this profile.", "analysis": "Handpicked, then AI analysed."}
+            for career_id, _ in careers
+        ]}
+    return {"career_matches": [
+        {
+            "id": career_id,
+            "title": title,
+            "match_score": 95 - 5 * rank,
+            "explanation": "A strong fit for this profile.",
+            "analysis": "Handpicked, then AI analysed.",
+            "matching_interests": [],
+            "matching_skills": {"current": []},
+            "matching_sdgs": []
+        }
+        for rank, (career_id, title) in enumerate(careers)
+    ]}
+
+
+def make_stub_handler(latency, jitter, seed):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            messages = body.get("messages", [])
+            system_prompt = messages[0]["content"] if messages else ""
+            user_prompt = messages[-1]["content"] if messages else ""
+            with lock:
+                # Log-normal around the median, like real API latencies
+                delay = latency * rng.lognormvariate(0, jitter) if latency > 0 else 0
+            time.sleep(delay)
+
+            payload = json.dumps({
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps(stub_answer(system_prompt, user_prompt))},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def serve_stub(port, latency, jitter, seed):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_stub_handler(latency, jitter, seed))
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Run the stub in its own process so its CPU is not counted against the worker
+def start_stub(latency, jitter, seed):
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), "--serve-stub",
+        "--port", str(port), "--llm-latency", str(latency), "--llm-jitter", str(jitter), "--seed", str(seed)
+    ])
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, f"http://127.0.0.1:{port}/v1"
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("stub LLM server did not start")
+
+
+# --- Simulated sessions ------------------------------------------------------
+
+def random_profile(rng):
+    interests = [i for items in INTEREST_CATEGORIES.values() for i in items]
+    skills = [s for items in SKILL_CATEGORIES.values() for s in items]
+    sdg_ids = [sdg["id"] for sdg in SDGS]
+    return rng.sample(interests, 3), rng.sample(skills, 3), rng.sample(sdg_ids, rng.randint(1, 3))
+
+
+# Worker CPU seconds and current RSS in MB
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RssSampler:
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# One student from the landing page to the rendered results. Returns the seconds
+# spent in each step, the duration of every script rerun and the source of the results.
+def run_session(secrets, profile, think, timeout, rng):
+    from streamlit.testing.v1 import AppTest
+
+    with SCRIPT_LOCK:
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    for name, value in secrets.items():
+        at.secrets[name] = value
+    reruns = []
+
+    def rerun(element=None):
+        started = time.perf_counter()
+        with SCRIPT_LOCK:
+            if element is None:
+                at.run()
+            else:
+                element.click().run()
+        reruns.append(time.perf_counter() - started)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+
+    def click_label(label):
+        for button in at.button:
+            if button.label == label:
+                return rerun(button)
+        raise RuntimeError(f"no button {label!r} on step {at.session_state['step']}")
+
+    def pause():
+        if think > 0:
+            time.sleep(think * rng.uniform(0.5, 1.5))
+
+    interests, skills, sdg_ids = profile
+    steps = {}
+    rerun()
+
+    started = time.perf_counter()
+    for interest in interests:
+        rerun(at.button(key=f"int_{interest}"))
+        pause()
+    click_label("Next: Skills")
+    steps["interests"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for skill in skills:
+        rerun(at.button(key=f"current_{skill}"))
+        pause()
+    click_label("Next: Values")
+    steps["skills"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for sdg_id in sdg_ids:
+        rerun(at.button(key=f"sdg_{sdg_id}"))
+        pause()
+    steps["values"] = time.perf_counter() - started
+
+    # Time to results: from the click until step 4 shows the finished results
+    started = time.perf_counter()
+    click_label("Find Your Ideal Careers")
+    poll = float(secrets.get("JOB_POLL_SECONDS", 1.0))
+    deadline = time.time() + timeout
+    while at.session_state["step"] != 4 or at.session_state["job_id"] is not None:
+        if time.time() > deadline:
+            raise RuntimeError("results did not arrive in time")
+        time.sleep(poll)
+        rerun()
+    steps["results"] = time.perf_counter() - started
+
+    entry = at.session_state["result_entry"]
+    if not entry or not entry["judge_matches"]:
+        raise RuntimeError("no AI results: " + "; ".join(text for _, text in (entry or {}).get("messages", [])))
+
+    # One more rerun of the finished results page, as when the student scrolls or switches tabs
+    started = time.perf_counter()
+    rerun()
+    steps["render"] = time.perf_counter() - started
+    return steps, reruns, at.session_state["result_source"]
+
+
+def run_level(concurrency, sessions, secrets, think, timeout, rng):
+    profiles = [random_profile(rng) for _ in range(sessions)]
+    seeds = [rng.random() for _ in range(sessions)]
+    steps = {name: [] for name in STEPS}
+    reruns = []
+    errors = []
+    sources = {}
+
+    def one(i):
+        return run_session(secrets, profiles[i], think, timeout, random.Random(seeds[i]))
+
+    cpu_before = cpu_seconds()
+    started = time.perf_counter()
+    with RssSampler() as rss, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(one, i) for i in range(sessions)]:
+            try:
+                session_steps, session_reruns, source = future.result()
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            sources[source] = sources.get(source, 0) + 1
+            for name, seconds in session_steps.items():
+                steps[name].append(seconds)
+            reruns.extend(session_reruns)
+    wall = time.perf_counter() - started
+    cpu = cpu_seconds() - cpu_before
+
+    completed = sessions - len(errors)
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "completed": completed,
+        "errors": len(errors),
+        "first_errors": errors[:3],
+        "wall_seconds": wall,
+        "throughput": completed / wall if wall > 0 else 0.0,
+        "cpu_cores": cpu / wall if wall > 0 else 0.0,
+        "peak_rss_mb": rss.peak,
+        "sources": sources,
+        "steps": {
+            name: {"p50": percentile(values, 50), "p95": percentile(values, 95), "p99": percentile(values, 99)}
+            for name, values in steps.items()
+        },
+        "reruns": {
+            "count": len(reruns),
+            "p50": percentile(reruns, 50),
+            "p95": percentile(reruns, 95),
+            "p99": percentile(reruns, 99)
+        }
+    }
+
+
+# The highest level before throughput stops growing (less than min_gain better than
+# the level below), the time to results breaks the SLO, or sessions start failing
+def saturation_point(levels, slo_seconds, min_gain):
+    best = None
+    for level in levels:
+        if level["errors"] or (slo_seconds > 0 and level["steps"]["results"]["p95"] > slo_seconds):
+            return best, level["concurrency"]
+        if best is not None and level["throughput"] < best["throughput"] * (1 + min_gain):
+            return best, level["concurrency"]
+        best = level
+    return best, None
+
+
+def print_level(level):
+    print(f"\n== {level['concurrency']} concurrent students: {level['completed']}/{level['sessions']} completed"
+          f" in {level['wall_seconds']:.1f}s, {level['throughput']:.2f} sessions/s,"
+          f" {level['cpu_cores']:.2f} CPU cores, peak RSS {level['peak_rss_mb']:.0f} MB")
+    for name in STEPS:
+        stats = level["steps"][name]
+        print(f"  {name:<10} p50 {stats['p50']:7.3f}s  p95 {stats['p95']:7.3f}s  p99 {stats['p99']:7.3f}s")
+    reruns = level["reruns"]
+    print(f"  {'reruns':<10} p50 {reruns['p50']:7.3f}s  p95 {reruns['p95']:7.3f}s  p99 {reruns['p99']:7.3f}s  ({reruns['count']} reruns)")
+    print(f"  {'sources':<10} " + ", ".join(f"{source} {count}" for source, count in sorted(level["sources"].items())))
+    for error in level["first_errors"]:
+        print(f"  error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of one app worker")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="concurrent students per level")
+    parser.add_argument("--sessions-per-student", type=int, default=3, help="sessions per concurrent student at each level")
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="median stub LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.35, help="log-normal sigma of the stub latency")
+    parser.add_argument("--think", type=float, default=0.3, help="mean pause between clicks in seconds")
+    parser.add_argument("--slo", type=float, default=12.0, help="p95 time to results that counts as saturated (0 turns it off)")
+    parser.add_argument("--min-gain", type=float, default=0.1, help="throughput gain per level below which the worker counts as saturated")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--mode", default=None, help="PIPELINE_MODE for the app")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="extra app setting")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--require-concurrency", type=int, help="exit 1 if the worker saturates below this many students")
+    parser.add_argument("--serve-stub", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_stub:
+        serve_stub(args.port, args.llm_latency, args.llm_jitter, args.seed)
+        return
+
+    # AppTest runs without a server, so Streamlit warns about it on every rerun
+    streamlit.logger.set_log_level("error")
+    stub, base_url = start_stub(args.llm_latency, args.llm_jitter, args.seed)
+    db_dir = tempfile.mkdtemp(prefix="lucidus-load-")
+    secrets = {
+        "OPENAI_API_KEY": "sk-load-test",
+        "OPENAI_BASE_URL": base_url,
+        # A private result and catalog store, and no cache warming, approximate reuse or
+        # speculative prefetch, so a session only skips the pipeline when a profile
+        # repeats exactly (the report counts results by source). --set turns them back on.
+        "SNAPSHOT_DB": os.path.join(db_dir, "results.sqlite3"),
+        "CATALOG_STORE_DIR": os.path.join(db_dir, "catalogs"),
+        "WARM_TOP_N": 0,
+        "REUSE_THRESHOLD": 0,
+        "PREFETCH_LIMIT": 0,
+        # Synthetic sessions are still recorded (that cost is part of a run), but not into the host's dashboard
+        "ANALYTICS_DIR": os.path.join(db_dir, "analytics")
+    }
+    if args.mode:
+        secrets["PIPELINE_MODE"] = args.mode
+    for item in args.set:
+        name, value = item.split("=", 1)
+        secrets[name] = value
+
+    rng = random.Random(args.seed)
+    levels = []
+    try:
+        for concurrency in [int(level) for level in args.levels.split(",")]:
+            level = run_level(concurrency, concurrency * args.sessions_per_student, secrets, args.think, args.timeout, rng)
+            levels.append(level)
+            print_level(level)
+            sys.stdout.flush()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    best, saturated_at = saturation_point(levels, args.slo, args.min_gain)
+    print()
+    if saturated_at is None:
+        print(f"Not saturated up to {levels[-1]['concurrency']} concurrent students")
+    elif best is None:
+        print(f"Saturated at the first level ({saturated_at} concurrent students)")
+    else:
+        print(f"Saturation point: {best['concurrency']} concurrent students"
+              f" ({best['throughput']:.2f} sessions/s); {saturated_at} is past it")
+
+    report = {
+        "settings": {name: value for name, value in secrets.items() if name != "OPENAI_API_KEY"},
+        "llm_latency": args.llm_latency,
+        "think": args.think,
+        "slo": args.slo,
+        "levels": levels,
+        "saturation": best["concurrency"] if best else 0,
+        "saturated": saturated_at is not None
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.require_concurrency is not None:
+        capacity = levels[-1]["concurrency"] if saturated_at is None else (best["concurrency"] if best else 0)
+        if capacity < args.require_concurrency:
+            print(f"FAIL: worker handles {capacity} concurrent students, {args.require_concurrency} required")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+# Every logger of the app lives under this one, e.g. "lucidus.app", "lucidus.jobs"
+ROOT_LOGGER = "lucidus"
+
+# Id of the request (script run, or the job it started) a log line belongs to.
+# Context variables follow the code into jobs, since JobRunner runs them in a
+# copy of the submitting context.
+correlation_id = contextvars.ContextVar("correlation_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed with extra= and is a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "correlation_id"}
+
+
+def get_logger(name):
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+# Adds the current correlation id to each record. Runs in the logging thread's
+# context, i.e. before the record is queued.
+class CorrelationFilter(logging.Filter):
+    def filter(self, record):
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+def record_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+# One JSON object per line, with the extra= fields at the top level
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        line = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "correlation_id": getattr(record, "correlation_id", "-"),
+            "message": record.getMessage()
+        }
+        line.update(record_fields(record))
+        if record.exc_text:
+            line["exception"] = record.exc_text
+        return json.dumps(line, default=str)
+
+
+# The same information for reading in a terminal
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        stamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+        fields = " ".join(f"{key}={value}" for key, value in record_fields(record).items())
+        line = f"{stamp} {record.levelname:<7} {record.name} [{getattr(record, 'correlation_id', '-')}] {record.getMessage()}"
+        if fields:
+            line += f" {fields}"
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+# Queues a picklable copy of the record: message arguments merged and the
+# traceback rendered to text, but the fields kept apart for the formatters
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# Route the app's loggers through a queue: the logging call only enqueues the
+# record, and a listener thread formats and writes it, so a slow stderr or log
+# collector never holds up a script run. Call once per process; returns the listener.
+def setup_logging(level="INFO", fmt="json", stream=None):
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        if isinstance(handler, StructuredQueueHandler):
+            logger.removeHandler(handler)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+
+    handler = StructuredQueueHandler(records)
+    handler.addFilter(CorrelationFilter())
+    logger.addHandler(handler)
+    logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    # The app's lines are not repeated by whatever the host configured on the root logger
+    logger.propagate = False
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,320 @@
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+# Points per matching tag
+INTEREST_POINTS = 3
+SKILL_POINTS = 2
+SDG_POINTS = 3
+
+# Catalogs with fewer rows than this are scored on the calling thread; below it
+# the pool hand-off costs more than the scoring
+PARTITION_MIN_ROWS = 200000
+
+
+# Manual career matching algorithm over career dicts: weighted tag overlap, top k
+# by score. This is the reference implementation; the app uses match_careers_compact.
+def match_careers(careers, interests, skills, sdg_ids, k=6):
+    # Score each career based on matches
+    scored_careers = []
+
+    for career in careers:
+        score = 0
+        match_details = {
+            "interest_matches": [],
+            "skill_matches": {
+                "current": []
+            },
+            "sdg_matches": []
+        }
+
+        # Score for matching interests (highest weight)
+        for interest in interests:
+            if interest in career["interests"]:
+                score += 3
+                match_details["interest_matches"].append(interest)
+
+        # Score for matching current skills
+        for skill in skills:
+            if skill in career["skills"]:
+                score += 2
+                match_details["skill_matches"]["current"].append(skill)
+
+        # Score for matching SDGs (high weight - values are important)
+        for sdg_id in sdg_ids:
+            if sdg_id in career["sdgs"]:
+                score += 3
+                match_details["sdg_matches"].append(sdg_id)
+
+        career_with_score = career.copy()
+        career_with_score["score"] = score
+        career_with_score["match_details"] = match_details
+        # Calculate match percentage (max score would be 3*3 + 3*2 + 3*1 + 3*3 = 27)
+        career_with_score["match_score"] = int((score / 27) * 100)
+        scored_careers.append(career_with_score)
+
+    # First check if we have any matches with score > 0
+    matches_with_score = [c for c in scored_careers if c["score"] > 0]
+
+    # If we have fewer than k matches with score > 0, include some with score = 0
+    if len(matches_with_score) < k:
+        # Add careers with score 0 until we have k or run out of careers
+        zero_score_careers = [c for c in scored_careers if c["score"] == 0]
+        additional_needed = min(k - len(matches_with_score), len(zero_score_careers))
+
+        # Take a random selection of zero-score careers
+        random.shuffle(zero_score_careers)
+        matches_with_score.extend(zero_score_careers[:additional_needed])
+
+    # Sort by score and take top k
+    return sorted(
+        matches_with_score,
+        key=lambda x: x["score"],
+        reverse=True
+    )[:k]
+
+
+# (posting list, points) for every selected tag the catalog knows
+def profile_postings(catalog, interests, skills, sdg_ids):
+    postings = []
+    for interest in interests:
+        tag_id = catalog.interest_lookup.get(interest)
+        if tag_id is not None:
+            postings.append((catalog.postings("interest", tag_id), INTEREST_POINTS))
+    for skill in skills:
+        tag_id = catalog.skill_lookup.get(skill)
+        if tag_id is not None:
+            postings.append((catalog.postings("skill", tag_id), SKILL_POINTS))
+    for sdg_id in sdg_ids:
+        if 0 <= sdg_id < len(catalog.arrays["sdg_post_offsets"]) - 1:
+            postings.append((catalog.postings("sdg", sdg_id), SDG_POINTS))
+    return postings
+
+
+# Score every career of a CompactCatalog at once by adding each selected tag's
+# points to the rows in its posting list
+def score_profile(catalog, interests, skills, sdg_ids):
+    scores = np.zeros(len(catalog), dtype=np.int32)
+    for rows, points in profile_postings(catalog, interests, skills, sdg_ids):
+        scores[rows] += points
+    return scores
+
+
+# Indices of the k highest scores, ties broken by catalog order
+def top_k_indices(scores, k):
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[:k - len(above)]
+    candidates = np.concatenate([above, ties])
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+# Build the scored career dict the results view expects for one catalog row
+def scored_career(catalog, i, score, interests, skills, sdg_ids):
+    career = catalog.career(i)
+    career["score"] = int(score)
+    career["match_details"] = {
+        "interest_matches": [interest for interest in interests if interest in career["interests"]],
+        "skill_matches": {
+            "current": [skill for skill in skills if skill in career["skills"]]
+        },
+        "sdg_matches": [sdg_id for sdg_id in sdg_ids if sdg_id in career["sdgs"]]
+    }
+    # Calculate match percentage (max score would be 3*3 + 3*2 + 3*1 + 3*3 = 27)
+    career["match_score"] = int((score / 27) * 100)
+    return career
+
+
+# Manual career matching over a CompactCatalog. Returns the same list as
+# match_careers, but only the top k careers are ever turned into dicts.
+def match_careers_compact(catalog, interests, skills, sdg_ids, k=6):
+    scores = score_profile(catalog, interests, skills, sdg_ids)
+    top = top_k_indices(scores, k)
+    top = [int(i) for i in top if scores[i] > 0]
+
+    # Fewer than k careers match at all, so pad with a random selection of zero-score careers
+    if len(top) < k:
+        zero_score_rows = np.flatnonzero(scores == 0).tolist()
+        additional_needed = min(k - len(top), len(zero_score_rows))
+        random.shuffle(zero_score_rows)
+        top.extend(zero_score_rows[:additional_needed])
+
+    return [scored_career(catalog, i, scores[i], interests, skills, sdg_ids) for i in top]
+
+
+# Row ranges of roughly equal size covering n rows
+def shard_bounds(n, shards):
+    edges = np.linspace(0, n, shards + 1).astype(np.int64)
+    return [(int(lo), int(hi)) for lo, hi in zip(edges[:-1], edges[1:]) if hi > lo]
+
+
+# Top k positive scores within rows lo..hi. Posting lists are sorted by row, so
+# each one is cut down to the shard with a binary search.
+def score_shard(postings, lo, hi, k):
+    scores = np.zeros(hi - lo, dtype=np.int32)
+    for rows, points in postings:
+        start, end = np.searchsorted(rows, (lo, hi))
+        scores[rows[start:end] - lo] += points
+    top = top_k_indices(scores, k)
+    top = top[scores[top] > 0]
+    return top + lo, scores[top]
+
+
+# Merge per-shard top k lists into the global top k, ties broken by catalog order
+def merge_top_k(parts, k):
+    rows = np.concatenate([part_rows for part_rows, _ in parts])
+    scores = np.concatenate([part_scores for _, part_scores in parts])
+    order = np.lexsort((rows, -scores))[:k]
+    return rows[order], scores[order]
+
+
+# Manual matching for large catalogs: the memory-mapped catalog is scored in row
+# shards on a thread pool (NumPy releases the GIL for the scatter-add and the
+# partition), and the per-shard top k lists are merged. Catalogs below min_rows
+# go through match_careers_compact on the calling thread. Results are the same
+# either way, apart from which zero-score careers pad a short list.
+class PartitionedMatcher:
+    def __init__(self, workers=None, min_rows=PARTITION_MIN_ROWS):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self._executor = None
+        if self.workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="lucidus-score")
+
+    def match(self, catalog, interests, skills, sdg_ids, k=6):
+        if self._executor is None or len(catalog) < self.min_rows:
+            return match_careers_compact(catalog, interests, skills, sdg_ids, k)
+
+        postings = profile_postings(catalog, interests, skills, sdg_ids)
+        futures = [
+            self._executor.submit(score_shard, postings, lo, hi, k)
+            for lo, hi in shard_bounds(len(catalog), self.workers)
+        ]
+        rows, scores = merge_top_k([future.result() for future in futures], k)
+        top = [int(i) for i in rows]
+
+        # Pad with random zero-score careers like match_careers_compact, without
+        # materialising the full score vector: anything not in the short list scores 0
+        if len(top) < k:
+            taken = set(top)
+            additional_needed = min(k - len(top), len(catalog) - len(taken))
+            while additional_needed > 0:
+                i = random.randrange(len(catalog))
+                if i not in taken:
+                    taken.add(i)
+                    top.append(i)
+                    additional_needed -= 1
+        score_of = dict(zip(top, scores.tolist()))
+        return [scored_career(catalog, i, score_of.get(i, 0), interests, skills, sdg_ids) for i in top]
+
+
+# Position in the manual ranking (score descending, catalog order for ties) for
+# paging past the first results. Only the last (score, row) handed out is kept;
+# each page is selected from the session's retained score vector, so nothing
+# is rescored. Careers that are already on screen are skipped, and only careers
+# with a positive score are ever returned.
+class RankingCursor:
+    def __init__(self, exclude_ids=()):
+        self.exclude_ids = set(exclude_ids)
+        self.last = None
+        self.exhausted = False
+
+    # Rows of the next size careers in ranking order
+    def next_page(self, catalog, scores, size):
+        rows = []
+        while len(rows) < size and not self.exhausted:
+            remaining = scores > 0
+            if self.last is not None:
+                # Rows up to the last one must score lower, rows after it no higher
+                score, row = self.last
+                remaining[:row + 1] &= scores[:row + 1] < score
+                remaining[row + 1:] &= scores[row + 1:] <= score
+            candidates = np.flatnonzero(remaining)
+            if len(candidates) == 0:
+                self.exhausted = True
+                break
+            for i in candidates[top_k_indices(scores[candidates], size - len(rows))]:
+                i = int(i)
+                self.last = (int(scores[i]), i)
+                if catalog.career_id(i) not in self.exclude_ids:
+                    rows.append(i)
+        return rows
+
+
+# Compact form of a match list for session state: (career id, score) pairs
+def compact_matches(matches):
+    return [(int(match["id"]), int(match["score"])) for match in matches]
+
+
+# Turn compact (career id, score) pairs back into the scored career dicts the
+# results view expects. Careers no longer in the catalog are skipped.
+def resolve_matches(catalog, records, interests, skills, sdg_ids):
+    matches = []
+    for career_id, score in records:
+        i = catalog.index_of_id(career_id)
+        if i is not None:
+            matches.append(scored_career(catalog, i, score, interests, skills, sdg_ids))
+    return matches
+
+
+# Per-session score vector kept up to date one toggle at a time. Selecting or
+# deselecting a tag only adds or subtracts its points along that tag's posting
+# list, so a live preview never rescores the whole catalog.
+class IncrementalScorer:
+    POINTS = {"interest": INTEREST_POINTS, "skill": SKILL_POINTS, "sdg": SDG_POINTS}
+
+    def __init__(self, catalog):
+        self.reset(catalog)
+
+    # Start over from an empty profile on the given catalog
+    def reset(self, catalog):
+        self.catalog_version = catalog.version
+        # Max score is 3*3 + 3*2 + 3*3, so int16 leaves plenty of headroom
+        self.scores = np.zeros(len(catalog), dtype=np.int16)
+        self.selected = {"interest": [], "skill": [], "sdg": []}
+
+    def _rows(self, catalog, kind, tag):
+        if kind == "interest":
+            tag_id = catalog.interest_lookup.get(tag)
+        elif kind == "skill":
+            tag_id = catalog.skill_lookup.get(tag)
+        else:
+            tag_id = tag if 0 <= tag < len(catalog.arrays["sdg_post_offsets"]) - 1 else None
+        return None if tag_id is None else catalog.postings(kind, tag_id)
+
+    # Add or remove one tag ("interest", "skill" or "sdg") from the profile
+    def toggle(self, catalog, kind, tag):
+        if tag in self.selected[kind]:
+            self.selected[kind].remove(tag)
+            sign = -1
+        else:
+            self.selected[kind].append(tag)
+            sign = 1
+        rows = self._rows(catalog, kind, tag)
+        if rows is not None:
+            self.scores[rows] += sign * self.POINTS[kind]
+
+    # Bring the scores in line with the given selections by toggling only the differences
+    def sync(self, catalog, interests, skills, sdg_ids):
+        if catalog.version != self.catalog_version or len(self.scores) != len(catalog):
+            self.reset(catalog)
+        for kind, wanted in (("interest", interests), ("skill", skills), ("sdg", sdg_ids)):
+            for tag in [t for t in self.selected[kind] if t not in wanted]:
+                self.toggle(catalog, kind, tag)
+            for tag in [t for t in wanted if t not in self.selected[kind]]:
+                self.toggle(catalog, kind, tag)
+
+    # Best careers so far; careers without any matching tag are left out
+    def top_matches(self, catalog, k=5):
+        top = [int(i) for i in top_k_indices(self.scores, k) if self.scores[i] > 0]
+        return [
+            scored_career(catalog, i, self.scores[i], self.selected["interest"], self.selected["skill"], self.selected["sdg"])
+            for i in top
+        ]
@@ -0,0 +1,99 @@
+import streamlit as st
+import pandas as pd
+import time
+from analytics import DEFAULT_ANALYTICS_DIR, LATENCY_BUCKETS, load_snapshot
+from catalog import SDGS
+
+st.set_page_config(
+    page_title="Career Discovery Analytics",
+    page_icon="📊",
+    layout="wide"
+)
+
+def get_setting(name, default):
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        return default
+
+# Same directory the app writes its analytics to
+ANALYTICS_DIR = get_setting("ANALYTICS_DIR", DEFAULT_ANALYTICS_DIR)
+# How long the page keeps the persisted aggregates before reading them again
+REFRESH_SECONDS = 30
+
+sdg_names_by_id = {str(sdg["id"]): f"SDG {sdg['id']}: {sdg['name']}" for sdg in SDGS}
+
+# The aggregates as last persisted by the app workers; the raw event log is never read here
+@st.cache_data(ttl=REFRESH_SECONDS)
+def load_aggregates():
+    aggregates, _ = load_snapshot(ANALYTICS_DIR)
+    return aggregates
+
+# "interest:History" -> "History", "sdg:4" -> "SDG 4: Quality Education"
+def tag_label(tag):
+    kind, value = tag.split(":", 1)
+    return sdg_names_by_id.get(value, value) if kind == "sdg" else value
+
+def counts_table(items, label, value="Results"):
+    return pd.DataFrame(items, columns=[label, value]).set_index(label)
+
+st.title("Career Discovery Analytics")
+aggregates = load_aggregates()
+if aggregates is None or aggregates.events == 0:
+    st.info("No results have been recorded yet. Analytics appear here once students complete step 3.")
+    st.stop()
+
+since = time.strftime("%Y-%m-%d", time.localtime(aggregates.first_ts))
+cols = st.columns(4)
+cols[0].metric("Completed results", aggregates.events)
+cols[1].metric("With errors", aggregates.errors)
+cols[2].metric("Schools / regions", len(aggregates.counts["tenant"]))
+cols[3].metric("Since", since)
+
+trending_tab, careers_tab, tags_tab, latency_tab = st.tabs(["Trending", "Careers", "Interests, skills & SDGs", "Response times"])
+
+with trending_tab:
+    half_life_days = aggregates.half_life / 86400
+    st.caption(f"Recent results count most: a result's weight halves every {half_life_days:g} days.")
+    cols = st.columns(2)
+    with cols[0]:
+        st.markdown("#### Careers")
+        st.dataframe(counts_table(aggregates.trending_top("career", n=15), "Career", "Trend score"))
+    with cols[1]:
+        st.markdown("#### Interests, skills & SDGs")
+        trending_tags = [(tag_label(tag), score) for tag, score in aggregates.trending_top("tag", n=15)]
+        st.dataframe(counts_table(trending_tags, "Selection", "Trend score"))
+
+with careers_tab:
+    cols = st.columns(2)
+    with cols[0]:
+        st.markdown("#### Most recommended")
+        st.dataframe(counts_table(aggregates.top("career", n=25), "Career"))
+    with cols[1]:
+        st.markdown("#### Most often the top match")
+        st.dataframe(counts_table(aggregates.top("top_career", n=25), "Career"))
+
+with tags_tab:
+    cols = st.columns(3)
+    for col, (prefix, title) in zip(cols, [("interest:", "Interests"), ("skill:", "Skills"), ("sdg:", "SDGs")]):
+        with col:
+            st.markdown(f"#### {title}")
+            st.bar_chart(counts_table([(tag_label(tag), count) for tag, count in aggregates.top("tag", n=15, prefix=prefix)], title), horizontal=True, sort=False)
+
+    st.markdown("#### Selected together most often")
+    pairs = [(" + ".join(tag_label(tag) for tag in pair.split("|")), count) for pair, count in aggregates.top("pair", n=20)]
+    st.dataframe(counts_table(pairs, "Selections"))
+
+with latency_tab:
+    st.caption("Time from submitting step 3 to complete results, by where the results came from.")
+    labels = [f"≤ {bound:g}s" for bound in LATENCY_BUCKETS] + [f"> {LATENCY_BUCKETS[-1]:g}s"]
+    histogram = pd.DataFrame(
+        {source: latency["buckets"] for source, latency in sorted(aggregates.latency.items())},
+        index=pd.Index(labels, name="Response time")
+    )
+    st.bar_chart(histogram, sort=False)
+    means = [
+        (source, latency["seconds"] / max(sum(latency["buckets"]), 1), sum(latency["buckets"]))
+        for source, latency in sorted(aggregates.latency.items())
+    ]
+    st.dataframe(pd.DataFrame(means, columns=["Source", "Mean seconds", "Results"]).set_index("Source"))
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from fusion import fill_descriptions, fuse_career_matches, merge_explanations
+from llm import (
+    AI_MATCH_MODEL,
+    COMBINED_MODEL,
+    JUDGE_MODEL,
+    MAX_CAREERS_PER_REQUEST,
+    ai_career_matches,
+    combined_career_matches,
+    judge_career_matches,
+    judge_explanations,
+    shortlist_candidates
+)
+from logs import get_logger
+from matching import score_profile
+from profiler import set_stage
+from slo import stage_key
+
+logger = get_logger("pipeline")
+
+
+# Canonical form of a student profile: selection order does not change the
+# matches, so two students who picked the same things share one key
+def canonical_profile(interests, skills, sdg_ids):
+    return (
+        tuple(sorted(interests)),
+        tuple(sorted(skills)),
+        tuple(sorted(int(sdg_id) for sdg_id in sdg_ids))
+    )
+
+
+# Key identifying one AI + judge computation
+def profile_key(profile, catalog_version, prompt_version):
+    interests, skills, sdg_ids = profile
+    payload = json.dumps(
+        {
+            "interests": list(interests),
+            "skills": list(skills),
+            "sdgs": list(sdg_ids),
+            "catalog": catalog_version,
+            "prompt": prompt_version
+        },
+        sort_keys=True
+    ).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
+
+
+# Bounded, thread-safe LRU of finished pipeline results shared by all sessions.
+# Every entry remembers the catalog version it was computed against, so a
+# catalog swap only drops the entries of the old version.
+class ResultCache:
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "invalidated": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    # Whether key is cached, without counting a hit or miss or refreshing its place
+    # in the LRU order; for background checks that are not student lookups
+    def contains(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, catalog_version, value):
+        with self._lock:
+            self._entries[key] = (catalog_version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Drop every entry computed against one catalog version
+    def invalidate_catalog(self, catalog_version):
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[0] == catalog_version]
+            for key in stale:
+                del self._entries[key]
+            self.stats["invalidated"] += len(stale)
+            return len(stale)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# AI + judge output in the form stored in the result cache, the snapshot store
+# and (by reference) in session state. "messages" holds (level, text) notices
+# for the student, e.g. ("error", "Failed to parse AI response...").
+def make_result_entry(ai_matches, judge_matches, explained=False, messages=None):
+    return {
+        "ai_matches": ai_matches,
+        "judge_matches": judge_matches,
+        "explained": explained,
+        "messages": messages or []
+    }
+
+
+# Run one OpenAI stage, turning failures into a message and an empty result
+def _guarded(messages, parse_error, fn):
+    try:
+        return fn()
+    except json.JSONDecodeError as e:
+        logger.warning("unparseable OpenAI response", extra={"error": str(e)})
+        messages.append(("error", parse_error))
+    except Exception as e:
+        logger.warning("OpenAI request failed", exc_info=e)
+        messages.append(("error", f"Error connecting to OpenAI API: {str(e)}"))
+    return []
+
+
+# The step 3 pipeline after manual matching: AI matching plus the AI Judge (or
+# local fusion, or the single combined request). Runs without Streamlit, so it
+# can execute on a background thread; progress(stage, percent) is called as the
+# stages start. A route (see slo.plan_route) picks the mode, models and
+# shortlist size, and the latency of every stage is recorded on the tracker.
+def run_matching_pipeline(client, mode, catalog, manual_matches, interests, skills, sdg_ids, sdg_names,
+                          progress=None, route=None, tracker=None, scores=None):
+    messages = []
+    # Manual score of every career, to shortlist by relevance
+    if scores is None:
+        scores = score_profile(catalog, interests, skills, sdg_ids)
+    if route is not None:
+        mode = route["mode"]
+    size = route["shortlist_size"] if route else MAX_CAREERS_PER_REQUEST
+    # The judge only writes descriptions while the catalog lacks generated ones
+    describe = catalog.meta.get("enriched", 0) < len(catalog)
+
+    def report(stage, percent):
+        set_stage(stage)
+        if progress is not None:
+            progress(stage, percent)
+
+    def timed(key, fn):
+        start = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            if tracker is not None:
+                tracker.record(key, time.perf_counter() - start)
+
+    if mode == "combined":
+        # One request returns the final judged list directly
+        report("judging", 30)
+        model = route["combined_model"] if route else COMBINED_MODEL
+        shortlist = shortlist_candidates(catalog, manual_matches, scores, size)
+        judge_matches = _guarded(
+            messages,
+            "Failed to parse AI Career Counselor response. Please try again.",
+            lambda: timed(
+                stage_key("combined", model, size),
+                lambda: combined_career_matches(
+                    client, manual_matches, shortlist, interests, skills, sdg_ids, sdg_names, model=model, describe=describe
+                )
+            )
+        )
+        report("done", 100)
+        return make_result_entry([], fill_descriptions(judge_matches, catalog), messages=messages)
+
+    report("matching", 20)
+    if size < MAX_CAREERS_PER_REQUEST:
+        # Reduced to meet the latency budget: the manual matches plus the next best by manual score
+        career_data = shortlist_candidates(catalog, manual_matches, scores, size)
+    else:
+        if len(catalog) > MAX_CAREERS_PER_REQUEST:
+            messages.append(("warning", f"Large dataset detected ({len(catalog)} careers). Only the first {MAX_CAREERS_PER_REQUEST} careers were sent to the AI Career Counselor."))
+        career_data = catalog.id_titles(MAX_CAREERS_PER_REQUEST)
+    model = route["ai_model"] if route else AI_MATCH_MODEL
+    ai_matches = _guarded(
+        messages,
+        "Failed to parse AI response. Please try again.",
+        lambda: timed(
+            stage_key("ai", model, size),
+            lambda: ai_career_matches(client, interests, skills, sdg_ids, sdg_names, career_data, model=model)
+        )
+    )
+
+    judge_matches = []
+    if mode == "fusion":
+        # Rank locally; the AI Judge text is filled in after the cards are shown
+        if manual_matches or ai_matches:
+            judge_matches = fuse_career_matches(manual_matches, ai_matches, catalog, interests, skills, sdg_ids, sdg_names)
+    elif manual_matches and ai_matches:
+        # Get AI Judge matches if both other methods have results
+        report("judging", 60)
+        model = route["judge_model"] if route else JUDGE_MODEL
+        judge_matches = _guarded(
+            messages,
+            "Failed to parse AI Judge response. Please try again.",
+            lambda: timed(
+                stage_key("judge", model),
+                lambda: judge_career_matches(
+                    client, manual_matches, ai_matches, interests, skills, sdg_ids, sdg_names, model=model, describe=describe
+                )
+            )
+        )
+        judge_matches = fill_descriptions(judge_matches, catalog)
+    report("done", 100)
+    return make_result_entry(ai_matches, judge_matches, messages=messages)
+
+
+# Fusion mode: let the AI Judge write the explanation and analysis text for an
+# already ranked entry. Returns a new entry; on failure the evidence-based
+# explanations are kept.
+def enrich_explanations(client, entry, manual_matches, interests, skills, sdg_ids, sdg_names):
+    messages = list(entry.get("messages", []))
+    try:
+        explanations = judge_explanations(
+            client,
+            entry["judge_matches"],
+            manual_matches,
+            entry["ai_matches"],
+            interests,
+            skills,
+            sdg_ids,
+            sdg_names
+        )
+        judge_matches = merge_explanations(entry["judge_matches"], explanations)
+    except Exception as e:
+        messages.append(("warning", f"Could not load the AI Career Counselor explanations: {str(e)}"))
+        judge_matches = entry["judge_matches"]
+    enriched = make_result_entry(entry["ai_matches"], judge_matches, explained=True, messages=messages)
+    # A reused or degraded entry stays marked as such once explained
+    for flag in ("reused", "degraded"):
+        if entry.get(flag):
+            enriched[flag] = entry[flag]
+    return enriched
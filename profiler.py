@@ -0,0 +1,237 @@
+import glob
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+# Where profiles are written; flamegraph.pl, speedscope and inferno read the files as they are
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), "lucidus-profiles")
+PROFILE_SUFFIX = ".folded"
+# Deepest stack recorded per sample; deeper frames are cut off at the root side
+MAX_DEPTH = 128
+
+# Stage annotations of the threads being profiled: thread id -> stack of stage
+# names. Threads that are not profiled never get an entry, so annotating code
+# costs one dict lookup when profiling is off.
+_stages = {}
+
+
+# Annotate the code in a with block as a stage, e.g. "sidebar" or "openai".
+# Samples taken inside it are grouped under [stage] at the root of the profile.
+class stage:
+    __slots__ = ("name", "stages")
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = None
+
+    def __enter__(self):
+        self.stages = _stages.get(threading.get_ident())
+        if self.stages is not None:
+            self.stages.append(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        if self.stages is not None and self.stages:
+            self.stages.pop()
+        return False
+
+
+# Replace the current stage of this thread, for code that runs top to bottom
+# (like the Streamlit script) rather than inside with blocks
+def set_stage(name):
+    stages = _stages.get(threading.get_ident())
+    if stages is not None:
+        if stages:
+            stages[-1] = name
+        else:
+            stages.append(name)
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+# One sampled run of one thread. A sampler thread reads the target thread's
+# stack every interval and adds the elapsed wall time to that stack; the CPU
+# time the target used meanwhile (from its per-thread CPU clock) goes to a
+# separate CPU profile, so waiting on OpenAI shows up in the wall profile only.
+class Profile:
+    def __init__(self, profiler, kind, thread_id, root=None):
+        self.profiler = profiler
+        self.kind = kind
+        self.thread_id = thread_id
+        # Stop once this frame is no longer on the stack, e.g. the script after st.rerun()
+        self.root = root
+        self.id = uuid.uuid4().hex[:8]
+        self.started = time.time()
+        self.wall = {}
+        self.cpu = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name=f"profiler-{kind}", daemon=True)
+
+    def start(self):
+        _stages[self.thread_id] = []
+        self._thread.start()
+        return self
+
+    # End the profile; the sampler thread writes it out, the caller does not wait
+    def stop(self):
+        self._stop.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _stack(self, frame):
+        labels = []
+        reached_root = self.root is None
+        while frame is not None and len(labels) < MAX_DEPTH:
+            labels.append(frame_label(frame))
+            if frame is self.root:
+                reached_root = True
+                break
+            frame = frame.f_back
+        if not reached_root:
+            return None
+        stages = _stages.get(self.thread_id) or ()
+        return ";".join([f"[{name}]" for name in stages] + labels[::-1])
+
+    def _cpu_clock(self):
+        try:
+            return time.pthread_getcpuclockid(self.thread_id)
+        except (AttributeError, OSError):
+            return None
+
+    def _sample(self):
+        clock = self._cpu_clock()
+        deadline = time.perf_counter() + self.profiler.max_seconds
+        last_wall = time.perf_counter()
+        last_cpu = time.clock_gettime(clock) if clock is not None else 0.0
+        try:
+            while not self._stop.wait(self.profiler.interval) and time.perf_counter() < deadline:
+                frame = sys._current_frames().get(self.thread_id)
+                if frame is None:
+                    break
+                stack = self._stack(frame)
+                del frame
+                if stack is None:
+                    break
+                now = time.perf_counter()
+                self.wall[stack] = self.wall.get(stack, 0.0) + now - last_wall
+                last_wall = now
+                if clock is not None:
+                    cpu = time.clock_gettime(clock)
+                    if cpu > last_cpu:
+                        self.cpu[stack] = self.cpu.get(stack, 0.0) + cpu - last_cpu
+                    last_cpu = cpu
+                self.samples += 1
+        finally:
+            _stages.pop(self.thread_id, None)
+            self.root = None
+            self.profiler.finish(self)
+
+
+# Opt-in sampling profiler for script reruns and pipeline runs. Each run is
+# profiled with probability rate, at most max_active at a time, so at a low
+# rate only the occasional run pays for a sampler thread. Every profile is
+# written as a wall-time and a CPU-time file in collapsed-stack format (one
+# "frame;frame;frame microseconds" line per stack); the oldest files are
+# deleted once the directory holds more than max_bytes.
+class SamplingProfiler:
+    def __init__(self, directory=DEFAULT_PROFILE_DIR, rate=0.0, interval=0.005, max_bytes=50 * 1024 * 1024,
+                 max_seconds=120.0, max_active=2):
+        self.directory = directory
+        self.rate = rate
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(max_active)
+        self.stats = {"profiles": 0, "skipped": 0, "written": 0, "pruned": 0, "last_error": None}
+        if rate > 0:
+            os.makedirs(directory, exist_ok=True)
+
+    # Profile the calling thread with probability rate; returns the Profile or None
+    def maybe_start(self, kind, root=None):
+        if self.rate <= 0 or random.random() >= self.rate:
+            return None
+        thread_id = threading.get_ident()
+        if thread_id in _stages or not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats["skipped"] += 1
+            return None
+        with self._lock:
+            self.stats["profiles"] += 1
+        return Profile(self, kind, thread_id, root=root).start()
+
+    # Context manager form of maybe_start, for a run that ends with a with block
+    def sampled(self, kind):
+        profile = self.maybe_start(kind)
+        return profile if profile is not None else nullcontext()
+
+    def finish(self, profile):
+        self._slots.release()
+        if not profile.samples:
+            return
+        name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(profile.started))}-{profile.kind}-{profile.id}"
+        try:
+            for measure, stacks in (("wall", profile.wall), ("cpu", profile.cpu)):
+                write_collapsed(os.path.join(self.directory, f"{name}.{measure}{PROFILE_SUFFIX}"), stacks)
+            pruned = prune_profiles(self.directory, self.max_bytes)
+            with self._lock:
+                self.stats["written"] += 1
+                self.stats["pruned"] += pruned
+                self.stats["last_error"] = None
+        except OSError as e:
+            with self._lock:
+                self.stats["last_error"] = str(e)
+
+
+# Stacks with their weight in whole microseconds, heaviest first
+def write_collapsed(path, stacks):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            for stack, seconds in sorted(stacks.items(), key=lambda item: -item[1]):
+                micros = int(seconds * 1_000_000)
+                if micros > 0:
+                    f.write(f"{stack} {micros}\n")
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Delete the oldest profile files until the directory fits max_bytes; returns how many went
+def prune_profiles(directory, max_bytes):
+    files = []
+    for path in glob.glob(os.path.join(directory, f"*{PROFILE_SUFFIX}")):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append((stat.st_mtime, path, stat.st_size))
+    files.sort()
+    total = sum(size for _, _, size in files)
+    pruned = 0
+    for _, path, size in files:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        pruned += 1
+    return pruned
@@ -0,0 +1,152 @@
+import threading
+from collections import OrderedDict, deque
+
+from fusion import fuse_career_matches
+from matching import INTEREST_POINTS, SDG_POINTS, SKILL_POINTS
+from pipeline import make_result_entry
+
+# Same weights as the manual algorithm, so a differing interest counts for more than a differing skill
+WEIGHTS = {"interest": INTEREST_POINTS, "skill": SKILL_POINTS, "sdg": SDG_POINTS}
+
+# Shadow comparisons kept for the agreement report
+SHADOW_WINDOW = 500
+# Misses this close below the threshold are compared with the fresh result they
+# get anyway, which shows whether the threshold could be lowered
+NEAR_MISS_MARGIN = 0.2
+
+
+def profile_tokens(profile):
+    interests, skills, sdg_ids = profile
+    return (
+        {("interest", interest) for interest in interests}
+        | {("skill", skill) for skill in skills}
+        | {("sdg", int(sdg_id)) for sdg_id in sdg_ids}
+    )
+
+
+def tokens_weight(tokens):
+    return sum(WEIGHTS[kind] for kind, _ in tokens)
+
+
+# Approximate reuse of AI results. Every finished AI result is indexed by the
+# selections of its profile; a new profile looks up the cached profile with the
+# highest weighted overlap (weighted Jaccard over the selections) through an
+# inverted index, within the same scope (catalog version, tenant and pipeline
+# mode). The result is reused when the similarity reaches the threshold and the
+# careers the cached AI result was computed from cover enough of the new
+# profile's manual matches.
+class SimilarProfileIndex:
+    def __init__(self, threshold=0.8, min_coverage=0.67, max_entries=5000):
+        self.threshold = threshold
+        self.min_coverage = min_coverage
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._postings = {}
+        self._shadows = deque(maxlen=SHADOW_WINDOW)
+        self.stats = {"lookups": 0, "hits": 0, "indexed": 0}
+
+    def add(self, key, scope, profile, manual_ids, ai_matches):
+        if not ai_matches:
+            return
+        tokens = profile_tokens(profile)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {
+                "scope": scope,
+                "tokens": tokens,
+                "weight": tokens_weight(tokens),
+                "careers": set(manual_ids) | {match.get("id") for match in ai_matches},
+                "ai_matches": ai_matches
+            }
+            for token in tokens:
+                self._postings.setdefault((scope, token), set()).add(key)
+            self.stats["indexed"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for token in entry["tokens"]:
+            keys = self._postings.get((entry["scope"], token))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[(entry["scope"], token)]
+
+    # The most similar cached profile as {"similarity", "coverage", "ai_matches"},
+    # whether or not it is close enough to reuse; None if nothing overlaps at all.
+    # manual_ids are the new profile's manual matches with a positive score.
+    def nearest(self, scope, profile, manual_ids):
+        tokens = profile_tokens(profile)
+        weight = tokens_weight(tokens)
+        manual_ids = set(manual_ids)
+        with self._lock:
+            shared = {}
+            for token in tokens:
+                for key in self._postings.get((scope, token), ()):
+                    shared[key] = shared.get(key, 0) + WEIGHTS[token[0]]
+
+            best = None
+            for key, overlap in shared.items():
+                entry = self._entries[key]
+                similarity = overlap / (weight + entry["weight"] - overlap)
+                coverage = len(manual_ids & entry["careers"]) / len(manual_ids) if manual_ids else 1.0
+                if best is None or (similarity, coverage) > (best["similarity"], best["coverage"]):
+                    best = {"key": key, "similarity": similarity, "coverage": coverage, "ai_matches": entry["ai_matches"]}
+            if best is not None:
+                self._entries.move_to_end(best["key"])
+            return best
+
+    def reusable(self, match):
+        return match is not None and match["similarity"] >= self.threshold and match["coverage"] >= self.min_coverage
+
+    def near_miss(self, match):
+        return match is not None and not self.reusable(match) and match["similarity"] >= self.threshold - NEAR_MISS_MARGIN
+
+    # Count one step 3 lookup for the hit rate
+    def record_lookup(self, hit):
+        with self._lock:
+            self.stats["lookups"] += 1
+            if hit:
+                self.stats["hits"] += 1
+
+    # Compare what reuse gave (or would have given) with a fresh computation
+    def record_shadow(self, similarity, reused_ids, fresh_ids, reused):
+        if not reused_ids or not fresh_ids:
+            return
+        overlap = len(set(reused_ids) & set(fresh_ids)) / len(fresh_ids)
+        with self._lock:
+            self._shadows.append((similarity, overlap, reused_ids[0] == fresh_ids[0], reused))
+
+    # Hit rate, plus agreement with fresh results by similarity band to tune the threshold
+    def summary(self):
+        with self._lock:
+            stats = dict(self.stats)
+            shadows = list(self._shadows)
+            stats["entries"] = len(self._entries)
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        bands = {}
+        for similarity, overlap, top1, reused in shadows:
+            band = min(int(similarity * 10), 9) / 10
+            totals = bands.setdefault(band, {"samples": 0, "reused": 0, "overlap": 0.0, "top1": 0.0})
+            totals["samples"] += 1
+            totals["reused"] += int(reused)
+            totals["overlap"] += overlap
+            totals["top1"] += float(top1)
+        for totals in bands.values():
+            totals["overlap"] /= totals["samples"]
+            totals["top1"] /= totals["samples"]
+        stats["agreement"] = dict(sorted(bands.items(), reverse=True))
+        return stats
+
+
+# Result entry for a profile built from a similar profile's AI matches: the AI
+# list is fused locally with the new profile's manual matches, which also
+# rewrites the explanations from the new profile's tag overlap
+def reuse_entry(ai_matches, catalog, manual_matches, interests, skills, sdg_ids, sdg_names):
+    judge_matches = fuse_career_matches(manual_matches, ai_matches, catalog, interests, skills, sdg_ids, sdg_names)
+    entry = make_result_entry(ai_matches, judge_matches)
+    entry["reused"] = True
+    return entry
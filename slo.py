@@ -0,0 +1,108 @@
+# Latency budget for step 3. Recent stage latencies are tracked per model and
+# shortlist size, and every run picks the most polished route that is still
+# expected to finish within the SLO.
+import threading
+import time
+from collections import deque
+
+from llm import AI_MATCH_MODEL, COMBINED_MODEL, JUDGE_MODEL, MAX_CAREERS_PER_REQUEST
+
+# Samples needed before an estimate is trusted; unknown routes are assumed to be fast
+MIN_SAMPLES = 5
+WINDOW = 50
+PERCENTILE = 90
+# Samples older than this no longer count. A degraded route stops producing samples
+# for the full one, so without expiry one latency spike would degrade every session
+# until the process restarts; once the spike has aged out the full route is tried again.
+MAX_AGE_SECONDS = 300
+
+
+def stage_key(stage, model, size=None):
+    return f"{stage}:{model}" if size is None else f"{stage}:{model}:{size}"
+
+
+# Rolling window of recent latencies per stage key, shared by all sessions
+class LatencyTracker:
+    def __init__(self, window=WINDOW, max_age=MAX_AGE_SECONDS):
+        self.window = window
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def record(self, key, seconds):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = deque(maxlen=self.window)
+                self._samples[key] = samples
+            samples.append((time.monotonic(), seconds))
+
+    # High percentile of the recent latencies, or 0 while there is too little data
+    def estimate(self, key, pct=PERCENTILE):
+        cutoff = time.monotonic() - self.max_age
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                return 0.0
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+            samples = sorted(seconds for _, seconds in samples)
+        if len(samples) < MIN_SAMPLES:
+            return 0.0
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def default_route(mode):
+    return {
+        "mode": mode,
+        "ai_model": AI_MATCH_MODEL,
+        "judge_model": JUDGE_MODEL,
+        "combined_model": COMBINED_MODEL,
+        "shortlist_size": MAX_CAREERS_PER_REQUEST,
+        "manual_first": False,
+        "degraded": []
+    }
+
+
+# Expected end-to-end latency of a route
+def estimate_route(tracker, route):
+    if route["mode"] == "combined":
+        return tracker.estimate(stage_key("combined", route["combined_model"], route["shortlist_size"]))
+    seconds = tracker.estimate(stage_key("ai", route["ai_model"], route["shortlist_size"]))
+    if route["mode"] == "two_call":
+        seconds += tracker.estimate(stage_key("judge", route["judge_model"]))
+    return seconds
+
+
+# Walk down the degradation ladder until the route fits the budget: faster
+# models, a smaller shortlist, local fusion instead of the judge, and finally
+# showing the manual matches first while the AI output is on its way.
+# slo_seconds <= 0 turns the budget off.
+def plan_route(tracker, mode, slo_seconds, fast_model, small_shortlist):
+    route = default_route(mode)
+    if slo_seconds <= 0:
+        return route
+
+    steps = [
+        ("fast_model", {"ai_model": fast_model, "judge_model": fast_model, "combined_model": fast_model}),
+        ("small_shortlist", {"shortlist_size": small_shortlist}),
+        ("fusion", {"mode": "fusion"})
+    ]
+    for name, changes in steps:
+        if estimate_route(tracker, route) <= slo_seconds:
+            return route
+        if all(route[field] == value for field, value in changes.items()):
+            continue
+        route.update(changes)
+        route["degraded"].append(name)
+
+    if estimate_route(tracker, route) > slo_seconds:
+        route["manual_first"] = True
+        route["degraded"].append("manual_first")
+    return route
+
+
+# Short label of how a route differs from the full one ("" when it does not),
+# used to keep degraded results apart from full ones in the result cache
+def route_signature(route):
+    return ",".join(name for name in route["degraded"] if name != "manual_first")
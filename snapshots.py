@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+# Shared by every worker on the host, like the compiled catalog
+DEFAULT_SNAPSHOT_DB = os.path.join(tempfile.gettempdir(), "lucidus-results.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS result_snapshots (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    catalog_version TEXT,
+    profile TEXT NOT NULL,
+    manual TEXT NOT NULL,
+    entry TEXT,
+    tenant TEXT
+);
+CREATE TABLE IF NOT EXISTS cached_results (
+    key TEXT PRIMARY KEY,
+    catalog_version TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    tenant TEXT
+)
+"""
+
+# Columns added after the first release: (table, column, declaration). Databases
+# created before get them on open; their existing rows are left NULL.
+MIGRATIONS = [
+    ("cached_results", "tenant", "TEXT"),
+    ("result_snapshots", "tenant", "TEXT")
+]
+
+
+# Completed result sets persisted in SQLite, so a reload or a shared link can
+# show step 4 again without recomputing anything. One connection per process,
+# serialised with a lock; WAL mode lets other workers read while one writes.
+class SnapshotStore:
+    def __init__(self, path=DEFAULT_SNAPSHOT_DB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        for table, column, declaration in MIGRATIONS:
+            columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")]
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+        self._conn.commit()
+
+    # Store one result set and return its id
+    def save(self, profile, catalog_version, manual_results, entry, tenant):
+        result_id = uuid.uuid4().hex
+        interests, skills, sdg_ids = profile
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO result_snapshots (id, created_at, updated_at, catalog_version, profile, manual, entry, tenant)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    result_id,
+                    now,
+                    now,
+                    catalog_version,
+                    json.dumps({"interests": list(interests), "skills": list(skills), "sdgs": list(sdg_ids)}),
+                    json.dumps([list(record) for record in manual_results]),
+                    json.dumps(entry) if entry is not None else None,
+                    tenant
+                )
+            )
+            self._conn.commit()
+        return result_id
+
+    # Replace the AI output of a stored result set, e.g. once the judge explanations arrive
+    def update_entry(self, result_id, entry):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE result_snapshots SET entry = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(entry) if entry is not None else None, time.time(), result_id)
+            )
+            self._conn.commit()
+
+    def load(self, result_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT catalog_version, profile, manual, entry, created_at, tenant FROM result_snapshots WHERE id = ?",
+                (result_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        catalog_version, profile, manual, entry, created_at, tenant = row
+        profile = json.loads(profile)
+        return {
+            "id": result_id,
+            "catalog_version": catalog_version,
+            "tenant": tenant,
+            "interests": profile["interests"],
+            "skills": profile["skills"],
+            "sdgs": profile["sdgs"],
+            "manual_results": [tuple(record) for record in json.loads(manual)],
+            "entry": json.loads(entry) if entry else None,
+            "created_at": created_at
+        }
+
+    # Profiles of one tenant's most recent result sets, newest first, for its cache
+    # warmer. Rows from before the tenant column (NULL) count as the default tenant's.
+    def recent_profiles(self, tenant, limit=10000, default_tenant=False):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT profile FROM result_snapshots WHERE tenant = ? OR (? AND tenant IS NULL)"
+                " ORDER BY created_at DESC LIMIT ?",
+                (tenant, default_tenant, limit)
+            ).fetchall()
+        profiles = []
+        for (profile,) in rows:
+            profile = json.loads(profile)
+            profiles.append((profile["interests"], profile["skills"], profile["sdgs"]))
+        return profiles
+
+    # Second result-cache tier shared by every worker on the host: finished AI
+    # output by profile key (which includes the catalog version)
+    def get_result(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT entry FROM cached_results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_result(self, key, catalog_version, entry, tenant):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cached_results (key, catalog_version, entry, created_at, tenant) VALUES (?, ?, ?, ?, ?)",
+                (key, catalog_version, json.dumps(entry), time.time(), tenant)
+            )
+            self._conn.commit()
+
+    # Drop a tenant's shared results computed against any other catalog version of
+    # its own; other tenants' rows are left alone. Rows from before the tenant
+    # column (NULL) are pruned along with any tenant's.
+    def prune_results(self, catalog_version, tenant):
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM cached_results WHERE (tenant = ? OR tenant IS NULL) AND catalog_version != ?",
+                (tenant, catalog_version)
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM result_snapshots").fetchone()[0]
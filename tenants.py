@@ -0,0 +1,112 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from catalog_manager import CatalogManager
+
+# Tenant served when neither the URL nor the config names one
+DEFAULT_TENANT = "default"
+TENANT_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+# Raised for a tenant id that is malformed or has no catalog
+class TenantError(Exception):
+    pass
+
+
+class _Tenant:
+    def __init__(self, manager):
+        self.manager = manager
+        self.lock = threading.Lock()
+        self.started = False
+
+
+# Catalogs of many tenants (schools, regions), one CSV each. A tenant's
+# catalog manager is created and loaded on first use; once the loaded catalogs
+# take more than memory_budget bytes, the least recently used tenants are
+# evicted. An evicted tenant's watcher stops and its mapping is released as
+# soon as no running request holds its snapshot; the next request loads it
+# again, from the compiled file if it is still on disk. The default tenant is
+# never evicted. on_evict is called for each evicted tenant, e.g. to drop its
+# cached results along with the catalog.
+class TenantCatalogs:
+    def __init__(self, default_csv, store_dir, tenant_csvs=None, tenants_dir=None,
+                 memory_budget=512 * 1024 * 1024, poll_interval=5.0, on_load=None, on_evict=None):
+        self.default_csv = default_csv
+        self.store_dir = store_dir
+        self.tenant_csvs = dict(tenant_csvs or {})
+        self.tenants_dir = tenants_dir
+        self.memory_budget = memory_budget
+        self.poll_interval = poll_interval
+        # Called with (tenant, manager) before a tenant's first load, e.g. to add listeners
+        self.on_load = on_load
+        # Called with (tenant, manager) after a tenant is evicted
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        self._tenants = OrderedDict()
+        self.stats = {"loads": 0, "evictions": 0}
+
+    # CSV of a tenant: from the configured mapping, or <tenants_dir>/<tenant>.csv
+    def csv_path(self, tenant):
+        if tenant == DEFAULT_TENANT:
+            return self.default_csv
+        if not TENANT_PATTERN.match(tenant):
+            raise TenantError(f"'{tenant}' is not a valid school or region.")
+        if tenant in self.tenant_csvs:
+            return self.tenant_csvs[tenant]
+        if self.tenants_dir:
+            path = os.path.join(self.tenants_dir, f"{tenant}.csv")
+            if os.path.exists(path):
+                return path
+        raise TenantError(f"No career list is configured for '{tenant}'.")
+
+    # The tenant's catalog manager, loading its catalog first if needed
+    def get(self, tenant):
+        csv_path = self.csv_path(tenant)
+        with self._lock:
+            entry = self._tenants.get(tenant)
+            if entry is None:
+                entry = _Tenant(CatalogManager(csv_path, self.store_dir, poll_interval=self.poll_interval))
+                self._tenants[tenant] = entry
+            self._tenants.move_to_end(tenant)
+
+        # Only the first request for a tenant loads it; others for the same tenant wait
+        with entry.lock:
+            if not entry.started:
+                if self.on_load is not None:
+                    self.on_load(tenant, entry.manager)
+                entry.manager.start()
+                entry.started = True
+                with self._lock:
+                    self.stats["loads"] += 1
+                self._evict(keep=tenant)
+        return entry.manager
+
+    def _size(self, entry):
+        snapshot = entry.manager.current()
+        return snapshot.catalog.nbytes if snapshot is not None else 0
+
+    # Evict least recently used tenants until the loaded catalogs fit the budget
+    def _evict(self, keep):
+        evicted = []
+        with self._lock:
+            total = sum(self._size(entry) for entry in self._tenants.values())
+            for tenant in list(self._tenants):
+                if total <= self.memory_budget:
+                    break
+                if tenant in (keep, DEFAULT_TENANT) or not self._tenants[tenant].started:
+                    continue
+                entry = self._tenants.pop(tenant)
+                total -= self._size(entry)
+                evicted.append((tenant, entry))
+                self.stats["evictions"] += 1
+        for tenant, entry in evicted:
+            entry.manager.stop()
+            if self.on_evict is not None:
+                self.on_evict(tenant, entry.manager)
+
+    # Loaded tenants, least recently used first, with their catalog sizes in bytes
+    def loaded(self):
+        with self._lock:
+            return [(tenant, self._size(entry)) for tenant, entry in self._tenants.items() if entry.started]
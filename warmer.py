@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from matching import match_careers_compact
+from pipeline import canonical_profile, profile_key, run_matching_pipeline
+from tenants import DEFAULT_TENANT
+
+
+# Profiles from a JSON lines file with interests/skills/sdgs per line, in the
+# same format bench_pipeline_modes.py reads
+def load_profiles_file(path):
+    profiles = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                profiles.append((item["interests"], item["skills"], item["sdgs"]))
+    return profiles
+
+
+# The top_n most frequent profiles, counting different selection orders as one
+def top_profiles(profiles, top_n):
+    counts = Counter(canonical_profile(*profile) for profile in profiles)
+    return [profile for profile, _ in counts.most_common(top_n)]
+
+
+# Precomputes the AI + judge results of the most common profiles and loads them
+# into the result cache, so the students who pick them get an instant hit. Runs
+# in the background at deploy and again after every catalog swap; a new run
+# cancels the one before it. Results also go to the shared SQLite tier, so the
+# other workers on the host load them instead of calling OpenAI again. One
+# warmer serves one tenant and only prunes that tenant's shared results.
+class CacheWarmer:
+    def __init__(self, make_client, result_cache, store, mode, prompt_version, sdg_names, tenant,
+                 top_n=50, concurrency=2, profiles_file=None, history_limit=10000):
+        self.make_client = make_client
+        self.result_cache = result_cache
+        self.store = store
+        self.mode = mode
+        self.tenant = tenant
+        self.prompt_version = prompt_version
+        self.sdg_names = sdg_names
+        self.top_n = top_n
+        self.concurrency = concurrency
+        self.profiles_file = profiles_file
+        self.history_limit = history_limit
+        self._lock = threading.Lock()
+        self._cancel = None
+        self.stats = {"runs": 0, "computed": 0, "loaded": 0, "skipped": 0, "failed": 0, "last_run": None}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    # Supplied profiles if a file is configured, otherwise the most frequent ones from this tenant's history
+    def profiles(self):
+        if self.profiles_file:
+            return top_profiles(load_profiles_file(self.profiles_file), self.top_n)
+        history = self.store.recent_profiles(self.tenant, self.history_limit, default_tenant=self.tenant == DEFAULT_TENANT)
+        return top_profiles(history, self.top_n)
+
+    # Warm the cache for a catalog in the background
+    def start(self, catalog):
+        cancel = threading.Event()
+        with self._lock:
+            if self._cancel is not None:
+                self._cancel.set()
+            self._cancel = cancel
+        thread = threading.Thread(target=self.run, args=(catalog, cancel), name="cache-warmer", daemon=True)
+        thread.start()
+        return thread
+
+    def run(self, catalog, cancel):
+        started = time.time()
+        self.store.prune_results(catalog.version, self.tenant)
+        profiles = self.profiles()
+        client = self.make_client()
+
+        def warm(profile):
+            if cancel.is_set():
+                return
+            key = profile_key(profile, catalog.version, f"{self.prompt_version}/{self.mode}")
+            if self.result_cache.contains(key):
+                self._count("skipped")
+                return
+
+            # Another worker may have computed it already
+            entry = self.store.get_result(key)
+            if entry is not None:
+                self.result_cache.put(key, catalog.version, entry)
+                self._count("loaded")
+                return
+
+            interests, skills, sdg_ids = (list(items) for items in profile)
+            manual_matches = match_careers_compact(catalog, interests, skills, sdg_ids)
+            entry = run_matching_pipeline(client, self.mode, catalog, manual_matches, interests, skills, sdg_ids, self.sdg_names)
+            if not entry["judge_matches"] or any(level == "error" for level, _ in entry["messages"]):
+                self._count("failed")
+                return
+            self.result_cache.put(key, catalog.version, entry)
+            self.store.put_result(key, catalog.version, entry, self.tenant)
+            self._count("computed")
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="cache-warmer") as executor:
+            for future in [executor.submit(warm, profile) for profile in profiles]:
+                try:
+                    future.result()
+                except Exception:
+                    self._count("failed")
+
+        self.stats["runs"] += 1
+        self.stats["last_run"] = {"profiles": len(profiles), "seconds": time.time() - started, "cancelled": cancel.is_set()}